@@ -0,0 +1 @@
+python3 src/analysis_job_runner.py "$@"
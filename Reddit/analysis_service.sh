@@ -0,0 +1 @@
+python3 src/analysis_service.py "$@"
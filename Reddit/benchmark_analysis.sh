@@ -0,0 +1 @@
+python3 src/run_analysis_benchmarks.py "$@"
@@ -0,0 +1,159 @@
+"""
+@Author Eric Zair
+@File analysis_job_runner.py
+@Description: Runs subreddit analyses as resumable jobs. A manifest of tasks is split into work
+              units that are stored in mongo, and any amount of workers (on this machine or on
+              others pointed at the same database) claim units and store their results. When a
+              worker dies, its units are picked up by another worker once their lease runs out.
+
+              Manifest example (a json list of tasks):
+                  [{"subreddit_name": "battlestations", "sorting_type": "top",
+                    "max_number_of_submissions_to_analyze": 50}]
+
+@package docstring
+"""
+# For the command line flags of the runner.
+import argparse
+
+# For reading the manifest and running more than one worker on this machine.
+import json
+import multiprocessing
+
+from reddit_analysis.job_queue import AnalysisJobQueue, get_default_worker_id
+
+
+"""Names of the collections (in the same database as the comments) that the jobs and results
+are stored in."""
+JOBS_COLLECTION_NAME = 'analysis_jobs'
+RESULTS_COLLECTION_NAME = 'analysis_results'
+
+
+def get_argument_parser_containing_program_flag_information():
+    """Returns an argument_parser object with the flags of the runner.
+
+    Returns:\n
+        parser {argparse.ArgumentParser} -- The argument parser."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lease-seconds', type=float, default=120,
+                        help='Seconds that a claimed unit belongs to a worker without a heartbeat.')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='The amount of times a unit is tried before it is marked as failed.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help='Split the tasks of a manifest into units.')
+    submit_parser.add_argument('manifest', help='Path of a json file with a list of tasks.')
+    submit_parser.add_argument('--submissions-per-unit', type=int, default=10,
+                               help='The amount of submissions in every work unit.')
+
+    work_parser = subparsers.add_parser('work', help='Claim and run units.')
+    work_parser.add_argument('--worker-id', default=None,
+                             help='Id of the worker (a number is added for every process).')
+    work_parser.add_argument('--processes', type=int, default=1,
+                             help='The amount of worker processes started on this machine.')
+    work_parser.add_argument('--keep-polling', action='store_true',
+                             help='Keep waiting for new units instead of stopping when none are left.')
+
+    subparsers.add_parser('status', help='Show the progress and results of every task.')
+    return parser
+
+
+def get_job_queue(command_line_arguments):
+    """Return the job queue that is stored next to our reddit comments.
+
+    Arguments:\n
+        command_line_arguments {Namespace} -- The parsed flags of the runner.
+
+    Returns:\n
+        AnalysisJobQueue -- The job queue."""
+
+    # Each worker process opens its own connection, since mongo clients should not be forked.
+    from credentials.mongo_credentials import DB_COLLECTION
+
+    return AnalysisJobQueue(DB_COLLECTION.database[JOBS_COLLECTION_NAME],
+                            DB_COLLECTION.database[RESULTS_COLLECTION_NAME],
+                            lease_in_seconds=command_line_arguments.lease_seconds,
+                            max_attempts=command_line_arguments.max_attempts)
+
+
+def get_analyzer():
+    """Return a SubredditAnalyzer on our reddit comments.
+
+    Returns:\n
+        SubredditAnalyzer -- The analyzer."""
+
+    from credentials.mongo_credentials import DB_COLLECTION
+    from reddit_analysis.comment_analysis import SubredditAnalyzer
+
+    return SubredditAnalyzer(DB_COLLECTION)
+
+
+def submit_manifest(command_line_arguments):
+    """Add every task of the manifest to the job queue."""
+
+    with open(command_line_arguments.manifest) as manifest_file:
+        tasks = json.load(manifest_file)
+
+    job_queue = get_job_queue(command_line_arguments)
+    analyzer = get_analyzer()
+    for task in tasks:
+        task_id = job_queue.submit_task(task, analyzer,
+                                        submissions_per_unit=command_line_arguments.submissions_per_unit)
+        print(f"Submitted r/{task['subreddit_name']} as task {task_id}")
+
+
+def run_worker_process(command_line_arguments, worker_id):
+    """Run one worker until there are no units left."""
+
+    number_of_units_finished = get_job_queue(command_line_arguments).run_worker(
+        get_analyzer(), worker_id=worker_id, stop_when_empty=not command_line_arguments.keep_polling)
+    print(f'{worker_id}: finished {number_of_units_finished} units')
+
+
+def run_workers(command_line_arguments):
+    """Run the amount of worker processes that was asked for."""
+
+    worker_id = command_line_arguments.worker_id or get_default_worker_id()
+    if command_line_arguments.processes == 1:
+        run_worker_process(command_line_arguments, worker_id)
+        return
+
+    worker_processes = [multiprocessing.Process(target=run_worker_process,
+                                                args=(command_line_arguments, f'{worker_id}-{number}'))
+                        for number in range(command_line_arguments.processes)]
+    for worker_process in worker_processes:
+        worker_process.start()
+    for worker_process in worker_processes:
+        worker_process.join()
+
+
+def show_status(command_line_arguments):
+    """Print the progress of every task, and the result of every finished task."""
+
+    job_queue = get_job_queue(command_line_arguments)
+    task_results = {task_result['_id']: task_result for task_result in job_queue.get_task_results()}
+
+    for task_id, task_status in job_queue.get_status().items():
+        print(f"{task_id} r/{task_status['task']['subreddit_name']}: {task_status['done']} done, "
+              f"{task_status['running']} running, {task_status['pending']} pending, "
+              f"{task_status['failed']} failed")
+        if task_id in task_results:
+            print(f"    positive: {task_results[task_id]['positive']:.4f} "
+                  f"negative: {task_results[task_id]['negative']:.4f} "
+                  f"({task_results[task_id]['number_of_submissions']} submissions, "
+                  f"{task_results[task_id].get('number_of_failed_submissions', 0)} failed)")
+
+
+def main():
+    command_line_arguments = get_argument_parser_containing_program_flag_information().parse_args()
+
+    if command_line_arguments.command == 'submit':
+        submit_manifest(command_line_arguments)
+    elif command_line_arguments.command == 'work':
+        run_workers(command_line_arguments)
+    else:
+        show_status(command_line_arguments)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+@Author Eric Zair
+@File analysis_service.py
+@Description: A long running analysis service. It keeps one warm SubredditAnalyzer (with the vader
+              model and mongo connection pool already loaded) and serves analyze_submission and
+              analyze_subreddit over HTTP, on a local port or a unix socket.
+
+              Requests that are the same as one that is already running are merged, so they are
+              only analyzed once. Submission requests that come in together are batched, so all
+              of their comments are pulled with one query and scored in one pass.
+
+@package docstring
+"""
+# For the command line flags of the service.
+import argparse
+
+# For the server itself, which only uses the standard library.
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from reddit_analysis.comment_analysis import SubredditAnalyzer
+
+
+"""The paramters that each endpoint accepts, and the type that each one is converted to."""
+ENDPOINT_PARAMETERS = {
+    'analyze_submission': {'submission_id': str, 'sorting_type': str,
+                           'max_number_of_comments_to_analyze': int},
+    'analyze_subreddit': {'subreddit_name': str, 'sorting_type': str,
+                          'max_number_of_comments_to_analyze': int,
+                          'max_number_of_submissions_to_analyze': int}
+}
+
+"""The paramters that each endpoint can't be called without."""
+REQUIRED_ENDPOINT_PARAMETERS = {
+    'analyze_submission': ['submission_id'],
+    'analyze_subreddit': ['subreddit_name']
+}
+
+
+class AnalysisRequestBatcher():
+    """Runs analysis requests on one shared SubredditAnalyzer.
+
+    Identical requests that are waiting or running at the same time share one result. A dispatcher
+    thread waits a short time after the first request of a batch comes in, then handles every
+    request that came in by then together. Submission requests of the batch (with the same sorting
+    type and no comment limit) are analyzed with one analyze_submissions() call."""
+
+
+    def __init__(self, analyzer, batch_window_in_seconds=0.01, max_batch_size=256, number_of_workers=4):
+        """Constructs an AnalysisRequestBatcher object and starts its dispatcher thread.
+
+        Arguments:\n
+            analyzer {SubredditAnalyzer} -- The warm analyzer that every request is run on.
+
+        Keyword Arguments:\n
+            batch_window_in_seconds {float} -- How long we wait for more requests to batch together.
+                                               (default: {0.01})\n
+            max_batch_size {int} -- The max amount of requests in a batch. (default: {256})\n
+            number_of_workers {int} -- The amount of batches (or subreddit analyses) that can run
+                                       at the same time. (default: {4})"""
+
+        self.__analyzer = analyzer
+        self.__batch_window_in_seconds = batch_window_in_seconds
+        self.__max_batch_size = max_batch_size
+
+        """Requests that were submitted, but not yet picked up by the dispatcher."""
+        self.__request_queue = queue.Queue()
+
+        """Maps the key of every waiting or running request to its Future, for merging requests."""
+        self.__running_requests = {}
+        self.__running_requests_lock = threading.Lock()
+
+        self.__workers = ThreadPoolExecutor(max_workers=number_of_workers)
+
+        dispatcher_thread = threading.Thread(target=self.__dispatch_batches, daemon=True)
+        dispatcher_thread.start()
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __finish_request(self, request_key, result=None, error=None):
+        """(Helper method)\n
+        Give the result (or error) of a request to everyone waiting on it."""
+
+        with self.__running_requests_lock:
+            request_future = self.__running_requests.pop(request_key)
+
+        if error is not None:
+            request_future.set_exception(error)
+        else:
+            request_future.set_result(result)
+
+
+    def __run_submission_batch(self, sorting_type, request_keys):
+        """(Helper method)\n
+        Analyze every submission of a batch with one analyze_submissions() call. A request without
+        a submission id only fails itself, not the rest of the batch."""
+
+        submission_ids = {}
+        for request_key in request_keys:
+            submission_id = dict(request_key[1]).get('submission_id')
+            if submission_id is None:
+                self.__finish_request(request_key, error=ValueError('submission_id is required.'))
+            else:
+                submission_ids[request_key] = submission_id
+
+        if not submission_ids:
+            return
+
+        try:
+            analysis_results = self.__analyzer.analyze_submissions(list(submission_ids.values()),
+                                                                   sorting_type=sorting_type)
+        except Exception as error:
+            for request_key in submission_ids:
+                self.__finish_request(request_key, error=error)
+            return
+
+        for request_key, submission_id in submission_ids.items():
+            if submission_id in analysis_results:
+                self.__finish_request(request_key, analysis_results[submission_id])
+            else:
+                self.__finish_request(request_key,
+                                      error=KeyError(f'No results for submission "{submission_id}".'))
+
+
+    def __run_single_request(self, request_key):
+        """(Helper method)\n
+        Run a request that can't be batched on its own."""
+
+        method_name, method_arguments = request_key
+        try:
+            result = getattr(self.__analyzer, method_name)(**dict(method_arguments))
+        except Exception as error:
+            self.__finish_request(request_key, error=error)
+            return
+        self.__finish_request(request_key, result)
+
+
+    def __dispatch_batches(self):
+        """(Helper method)\n
+        Forever: wait for a request, collect every request that comes in during the batch window,
+        then hand the batch to the workers."""
+
+        while True:
+            request_keys = [self.__request_queue.get()]
+
+            # The window starts when the batch does, it is not restarted by every request.
+            batch_deadline = time.monotonic() + self.__batch_window_in_seconds
+            try:
+                while len(request_keys) < self.__max_batch_size:
+                    request_keys.append(self.__request_queue.get(
+                        timeout=max(0, batch_deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            # Submission requests without a comment limit are grouped by their sorting type.
+            submission_batches = {}
+            for request_key in request_keys:
+                method_name, method_arguments = request_key
+                method_arguments = dict(method_arguments)
+                if(
+                    method_name == 'analyze_submission' and \
+                    not method_arguments.get('max_number_of_comments_to_analyze')
+                ):
+                    submission_batches.setdefault(method_arguments.get('sorting_type'),
+                                                  []).append(request_key)
+                else:
+                    self.__workers.submit(self.__run_single_request, request_key)
+
+            for sorting_type, batch_request_keys in submission_batches.items():
+                self.__workers.submit(self.__run_submission_batch, sorting_type, batch_request_keys)
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def submit(self, method_name, method_arguments):
+        """Submit an analysis request. If the same request is already waiting or running, then we
+        hand back its Future instead of running it again.
+
+        Arguments:\n
+            method_name {str} -- Either 'analyze_submission' or 'analyze_subreddit'.
+            method_arguments {dict} -- The keyword arguments of the analysis method.
+
+        Returns:\n
+            Future -- Gives the result of the analysis once it is done."""
+
+        request_key = (method_name, tuple(sorted(method_arguments.items())))
+
+        with self.__running_requests_lock:
+            if request_key in self.__running_requests:
+                return self.__running_requests[request_key]
+
+            request_future = Future()
+            self.__running_requests[request_key] = request_future
+
+        self.__request_queue.put(request_key)
+        return request_future
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Handles GET /analyze_submission?submission_id=..., GET /analyze_subreddit?subreddit_name=...
+    and GET /health. Every response is json."""
+
+    """Set by run_analysis_service() before the server starts."""
+    request_batcher = None
+
+
+    def __send_json(self, status_code, response_content):
+        """(Helper method)\n
+        Send a json response."""
+
+        response_body = json.dumps(response_content).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response_body)))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        endpoint = parsed_url.path.strip('/')
+
+        if endpoint == 'health':
+            self.__send_json(200, {'status': 'ok'})
+            return
+
+        if endpoint not in ENDPOINT_PARAMETERS:
+            self.__send_json(404, {'error': f'Unknown endpoint "{endpoint}".'})
+            return
+
+        # Only the paramters that the endpoint knows about are passed on to the analyzer.
+        method_arguments = {}
+        try:
+            for parameter_name, parameter_values in parse_qs(parsed_url.query).items():
+                if parameter_name not in ENDPOINT_PARAMETERS[endpoint]:
+                    raise ValueError(f'Unknown paramter "{parameter_name}".')
+                method_arguments[parameter_name] = \
+                    ENDPOINT_PARAMETERS[endpoint][parameter_name](parameter_values[0])
+
+            for parameter_name in REQUIRED_ENDPOINT_PARAMETERS[endpoint]:
+                if parameter_name not in method_arguments:
+                    raise ValueError(f'Missing paramter "{parameter_name}".')
+
+            result = self.request_batcher.submit(endpoint, method_arguments).result()
+        except (TypeError, ValueError) as error:
+            self.__send_json(400, {'error': str(error)})
+            return
+        except Exception as error:
+            self.__send_json(500, {'error': str(error)})
+            return
+
+        self.__send_json(200, result)
+
+
+    def address_string(self):
+        # Clients of a unix socket do not have an address.
+        return self.client_address[0] if self.client_address else 'unix-socket'
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a unix socket, where every request is handled in its own thread."""
+
+    daemon_threads = True
+
+
+def get_argument_parser_containing_program_flag_information():
+    """Returns an argument_parser object with the flags of the service.
+
+    Returns:\n
+        parser {argparse.ArgumentParser} -- The argument parser."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1', help='Host that the service listens on.')
+    parser.add_argument('--port', type=int, default=8080, help='Port that the service listens on.')
+    parser.add_argument('--unix-socket', default=None,
+                        help='Listen on this unix socket path instead of a port.')
+    parser.add_argument('--batch-window', type=float, default=0.01,
+                        help='Seconds to wait for more requests to batch together.')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='The amount of batches that can be analyzed at the same time.')
+    return parser
+
+
+def run_analysis_service(mongo_reddit_collection, host='127.0.0.1', port=8080, unix_socket_path=None,
+                         batch_window_in_seconds=0.01, number_of_workers=4):
+    """Start the analysis service and serve requests until the process is stopped.
+
+    Arguments:\n
+        mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+    Keyword Arguments:\n
+        host {str} -- Host that the service listens on. (default: {'127.0.0.1'})\n
+        port {int} -- Port that the service listens on. (default: {8080})\n
+        unix_socket_path {str} -- Listen on this unix socket instead of a port. (default: {None})\n
+        batch_window_in_seconds {float} -- How long we wait for requests to batch. (default: {0.01})\n
+        number_of_workers {int} -- Batches that can be analyzed at the same time. (default: {4})"""
+
+    AnalysisRequestHandler.request_batcher = \
+        AnalysisRequestBatcher(SubredditAnalyzer(mongo_reddit_collection),
+                               batch_window_in_seconds=batch_window_in_seconds,
+                               number_of_workers=number_of_workers)
+
+    if unix_socket_path:
+        if os.path.exists(unix_socket_path):
+            os.remove(unix_socket_path)
+        server = ThreadingUnixHTTPServer(unix_socket_path, AnalysisRequestHandler)
+        print(f'Analysis service listening on unix socket {unix_socket_path}')
+    else:
+        server = ThreadingHTTPServer((host, port), AnalysisRequestHandler)
+        print(f'Analysis service listening on http://{host}:{port}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    command_line_arguments = get_argument_parser_containing_program_flag_information().parse_args()
+
+    # Opening the connection to mongo is the slow part, so it is only done when we start serving.
+    from credentials.mongo_credentials import DB_COLLECTION
+
+    run_analysis_service(DB_COLLECTION, host=command_line_arguments.host,
+                         port=command_line_arguments.port,
+                         unix_socket_path=command_line_arguments.unix_socket,
+                         batch_window_in_seconds=command_line_arguments.batch_window,
+                         number_of_workers=command_line_arguments.workers)
+
+
+if __name__ == '__main__':
+    main()
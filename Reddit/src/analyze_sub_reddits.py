@@ -26,6 +26,28 @@ def test_submission_call(analyzer):
                                        max_number_of_comments_to_analyze=0)
 
 
+# Simple example of how to get a quick estimate (with confidence intervals) for a huge subreddit.
+def test_subreddit_estimate_call(analyzer):
+    estimated_results = analyzer.estimate_subreddit_analysis_results('battlestations',
+                                                                     sorting_type='top',
+                                                                     target_margin_of_error=0.02,
+                                                                     max_seconds_to_analyze=5,
+                                                                     display_results=True)
+
+
+# Simple example of finding the terms that set each subreddit in our .sub file apart.
+def show_distinctive_subreddit_terms(path_to_sub_reddit_file='sub_reddit_list.sub', number_of_terms=10):
+    # numpy and scipy are only imported when they are actually needed.
+    from reddit_analysis.tfidf_engine import SubredditTfidfEngine
+
+    tfidf_engine = SubredditTfidfEngine(DB_COLLECTION)
+    for subreddit in open(path_to_sub_reddit_file):
+        tfidf_engine.add_subreddit(subreddit.strip().lower())
+
+    for subreddit, distinctive_terms in tfidf_engine.get_distinctive_terms(number_of_terms).items():
+        print(f"\n{subreddit}: {', '.join(term for term, score in distinctive_terms)}")
+
+
 # Simple method to show how the analyzer method can be used in different ways.
 def compare_subreddit_sorting_type_results(subreddit, number_of_comments=0,
                                            number_of_submissions=0):
@@ -77,6 +99,12 @@ def main():
     # Example of analyzing a specific submission.
     #test_submission_call(reddit_analyzer)
 
+    # Example of estimating the results of a subreddit from a random sample of its comments.
+    # test_subreddit_estimate_call(reddit_analyzer)
+
+    # Example of finding the most distinctive terms of every subreddit we collect from.
+    # show_distinctive_subreddit_terms()
+
     # Let's compare some results from a very positive reviewed subreddit.
     # compare_subreddit_sorting_type_results('battlestations', number_of_comments=10,
     #                                        number_of_submissions=10)
@@ -0,0 +1,210 @@
+"""
+@Author Eric Zair
+@File synthetic_corpus.py
+@Description: Generates a seeded, synthetic corpus of reddit comments that look like the ones that
+              reddit_post_collector.py stores (same fields, realistic comment lengths, slang, emoji,
+              and reply threads). The same seed always gives the same corpus, so benchmark results
+              can be compared between runs.
+
+@package docstring
+"""
+# Every random choice goes through a seeded random.Random, never the global one.
+import math
+import random
+import string
+
+
+"""Words that make up most of any comment."""
+COMMON_WORDS = ['the', 'a', 'i', 'you', 'it', 'is', 'that', 'this', 'to', 'and', 'of', 'in', 'for',
+                'my', 'on', 'with', 'just', 'have', 'but', 'not', 'be', 'was', 'are', 'so', 'like',
+                'what', 'if', 'all', 'they', 'one', 'would', 'get', 'do', 'can', 'me', 'at', 'people',
+                'about', 'think', 'really', 'time', 'know', 'good', 'more', 'why', 'how', 'when', 'out',
+                'setup', 'game', 'post', 'thread', 'comment', 'year', 'day', 'thing', 'way', 'back']
+
+"""Words that push the vader score of a comment up."""
+POSITIVE_WORDS = ['love', 'great', 'awesome', 'amazing', 'nice', 'beautiful', 'clean', 'perfect',
+                  'best', 'happy', 'cool', 'fantastic', 'wonderful', 'thanks', 'congrats', 'wholesome']
+
+"""Words that push the vader score of a comment down."""
+NEGATIVE_WORDS = ['hate', 'awful', 'terrible', 'worst', 'ugly', 'stupid', 'bad', 'boring', 'trash',
+                  'disgusting', 'annoying', 'sad', 'angry', 'wrong', 'broken', 'pathetic']
+
+"""Reddit slang that a normal dictionary has never heard of."""
+SLANG_WORDS = ['lol', 'lmao', 'tbh', 'imo', 'imho', 'ngl', 'fr', 'bruh', 'smh', 'tfw', 'irl', 'af',
+               'op', 'til', 'eli5', 'yeet', 'based', 'cringe', 'sus', 'rekt', 'kek', 'fml']
+
+"""Emoji that show up in comments, most of them have a vader score."""
+EMOJI = ['\U0001F602', '\U0001F60D', '\U0001F44D', '\U0001F525', '\U0001F62D', '\U0001F480',
+         '\U0001F621', '\U0001F64F', '\U0001F914', '\U00002764']
+
+"""Bot comments are the exact same text over and over again."""
+BOT_COMMENTS = ['I am a bot, and this action was performed automatically. Please contact the '
+                'moderators of this subreddit if you have any questions or concerns.',
+                'Your submission has been removed because it does not follow rule 3.']
+
+SORTING_TYPES = ['hot', 'top', 'new']
+
+
+def get_random_reddit_id(random_generator, length=7):
+    """Return a random base36 id, like the ones reddit gives to comments and submissions.
+
+    Arguments:\n
+        random_generator {random.Random} -- The seeded random generator that we use.
+
+    Keyword Arguments:\n
+        length {int} -- The amount of characters in the id. (default: {7})
+
+    Returns:\n
+        str -- The random id."""
+
+    return ''.join(random_generator.choice(string.ascii_lowercase + string.digits)
+                   for _ in range(length))
+
+
+def get_synthetic_comment_body(random_generator, positivity=0.5):
+    """Return the body of a synthetic comment. The amount of words is log-normal (most comments
+    are short, a few are very long), and some words are slang, emoji, or sentiment words.
+
+    Arguments:\n
+        random_generator {random.Random} -- The seeded random generator that we use.
+
+    Keyword Arguments:\n
+        positivity {float} -- The chance that a sentiment word is positive. (default: {0.5})
+
+    Returns:\n
+        str -- The body of the comment."""
+
+    if random_generator.random() < 0.02:
+        return random_generator.choice(BOT_COMMENTS)
+
+    # Median comment is about 16 words long, with a long tail of essays.
+    number_of_words = max(1, min(400, int(random_generator.lognormvariate(math.log(16), 0.9))))
+
+    words_in_comment = []
+    for _ in range(number_of_words):
+        word_type = random_generator.random()
+        if word_type < 0.08:
+            words_in_comment.append(random_generator.choice(POSITIVE_WORDS)
+                                    if random_generator.random() < positivity
+                                    else random_generator.choice(NEGATIVE_WORDS))
+        elif word_type < 0.14:
+            words_in_comment.append(random_generator.choice(SLANG_WORDS))
+        elif word_type < 0.17:
+            words_in_comment.append(random_generator.choice(EMOJI))
+        else:
+            words_in_comment.append(random_generator.choice(COMMON_WORDS))
+
+    # Some people shout, some people end with punctuation.
+    if random_generator.random() < 0.05:
+        words_in_comment = [word.upper() for word in words_in_comment]
+    return ' '.join(words_in_comment) + random_generator.choice(['', '', '.', '!', '?', '!!!'])
+
+
+def generate_synthetic_comments(number_of_comments, number_of_subreddits=5,
+                                comments_per_submission=50, number_of_authors=None, seed=0):
+    """Yield synthetic comment records in the same form that reddit_post_collector.py stores them.
+
+    Arguments:\n
+        number_of_comments {int} -- The amount of comments that we generate.
+
+    Keyword Arguments:\n
+        number_of_subreddits {int} -- The amount of subreddits the comments are spread over.
+                                      (default: {5})\n
+        comments_per_submission {int} -- The average amount of comments of a submission.
+                                         (default: {50})\n
+        number_of_authors {int} -- The amount of different authors. None means one author per
+                                   10 comments. (default: {None})\n
+        seed {int} -- The seed of the random generator. (default: {0})
+
+    Yields:\n
+        dict -- A comment record."""
+
+    random_generator = random.Random(seed)
+    number_of_authors = number_of_authors or max(1, number_of_comments // 10)
+
+    # Every subreddit has its own mood, so that rankings have a clear winner.
+    subreddits = [(f'synthetic_{subreddit_number}', f't5_{get_random_reddit_id(random_generator, 5)}',
+                   random_generator.uniform(0.2, 0.8))
+                  for subreddit_number in range(number_of_subreddits)]
+
+    number_of_comments_made = 0
+    while number_of_comments_made < number_of_comments:
+        subreddit_name, subreddit_id, positivity = random_generator.choice(subreddits)
+        submission_id = get_random_reddit_id(random_generator, 6)
+        submission_created_at = 1577836800 + random_generator.randrange(0, 31536000)
+        sorting_type = random_generator.choice(SORTING_TYPES)
+
+        # Comment counts of submissions are very skewed, a few submissions get most of them.
+        number_of_submission_comments = min(number_of_comments - number_of_comments_made,
+                                            max(1, int(random_generator.expovariate(
+                                                1 / comments_per_submission))))
+
+        submission_comment_ids = []
+        for _ in range(number_of_submission_comments):
+            comment_id = get_random_reddit_id(random_generator)
+
+            # About half of the comments are replies to another comment of the submission.
+            if submission_comment_ids and random_generator.random() < 0.5:
+                parent_id = f't1_{random_generator.choice(submission_comment_ids)}'
+            else:
+                parent_id = f't3_{submission_id}'
+            submission_comment_ids.append(comment_id)
+
+            # Authors follow a zipf like distribution, a few authors post a lot.
+            author_number = min(number_of_authors - 1,
+                                int(random_generator.paretovariate(1.2)) - 1)
+
+            yield {'author': f'author_{author_number}',
+                   'body': get_synthetic_comment_body(random_generator, positivity),
+                   'created_at': submission_created_at + random_generator.randrange(0, 86400),
+                   'distinguished': None,
+                   'edited': False,
+                   '_id': comment_id,
+                   'is_submitter': random_generator.random() < 0.05,
+                   'link_id': f't3_{submission_id}',
+                   'parent_id': parent_id,
+                   'replies': [],
+                   'score': int(random_generator.expovariate(0.1)) - 2,
+                   'stickied': False,
+                   'submission': submission_id,
+                   'subreddit_name': subreddit_name,
+                   'subreddit_id': subreddit_id,
+                   'sorting_type': sorting_type}
+
+        number_of_comments_made += number_of_submission_comments
+
+
+def load_synthetic_corpus(mongo_reddit_collection, number_of_comments, batch_size=1000, **kwargs):
+    """Insert a synthetic corpus into a mongo collection and create the indexes that the analysis
+    queries need. Comments whose random id was already taken are skipped.
+
+    Arguments:\n
+        mongo_reddit_collection {Collection} -- The collection that we load the corpus into.
+        number_of_comments {int} -- The amount of comments that we generate.
+
+    Keyword Arguments:\n
+        batch_size {int} -- The amount of comments inserted at a time. (default: {1000})\n
+        **kwargs -- Passed on to generate_synthetic_comments(), e.g. seed.
+
+    Returns:\n
+        int -- The amount of comments that were inserted."""
+
+    mongo_reddit_collection.create_index('submission')
+    mongo_reddit_collection.create_index('subreddit_name')
+
+    inserted_comment_ids = set()
+    comment_batch = []
+    for comment in generate_synthetic_comments(number_of_comments, **kwargs):
+        if comment['_id'] in inserted_comment_ids:
+            continue
+        inserted_comment_ids.add(comment['_id'])
+
+        comment_batch.append(comment)
+        if len(comment_batch) == batch_size:
+            mongo_reddit_collection.insert_many(comment_batch)
+            comment_batch = []
+
+    if comment_batch:
+        mongo_reddit_collection.insert_many(comment_batch)
+
+    return len(inserted_comment_ids)
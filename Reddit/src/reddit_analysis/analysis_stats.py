@@ -0,0 +1,252 @@
+"""
+@Author Eric Zair
+@File analysis_stats.py
+@Description: Contains an object, AnalysisStats, which the SubredditAnalyzer fills with the wall
+              time, cpu time, and item counts of every stage of an analysis (mongo query, cursor
+              iteration, preprocessing, vader scoring, and aggregation), in total and per
+              submission. It can also profile the analysis with cProfile and tracemalloc.
+
+@package docstring
+"""
+# For timing the stages, and for the optional profiling hooks.
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+"""The stages of an analysis, in the order that they happen. mongo_query covers sending a query
+and fetching the first batch of its results, cursor_iteration covers iterating the cursor over the
+rest of them and reading the comment bodies out of them."""
+ANALYSIS_STAGES = ['mongo_query', 'cursor_iteration', 'preprocessing', 'vader_scoring', 'aggregation']
+
+
+def measure_stage(analysis_stats, stage_name, submission_id=None):
+    """Return a context manager that measures a stage into analysis_stats, or does nothing if the
+    user did not ask for stats. This keeps the analysis code the same either way.
+
+    Arguments:\n
+        analysis_stats {AnalysisStats or None} -- The stats that we are measuring into.
+        stage_name {str} -- The name of the stage, one of ANALYSIS_STAGES.
+
+    Keyword Arguments:\n
+        submission_id {str} -- The submission that the stage is for, if any. (default: {None})
+
+    Returns:\n
+        context manager -- Measures the code run inside of it."""
+
+    if analysis_stats is None:
+        return contextlib.nullcontext()
+    return analysis_stats.measure_stage(stage_name, submission_id=submission_id)
+
+
+class AnalysisStats():
+    """Per stage wall time, cpu time, and item counts of an analysis, in total and per submission.
+
+    Pass one to an analysis method of SubredditAnalyzer (analysis_stats=AnalysisStats()) and it
+    will be filled in while the analysis runs."""
+
+
+    def __init__(self, enable_cprofile=False, enable_tracemalloc=False):
+        """Constructs an AnalysisStats object.
+
+        Keyword Arguments:\n
+            enable_cprofile {bool} -- True if the analysis should be profiled with cProfile.
+                                      This slows the analysis down a lot. (default: {False})\n
+            enable_tracemalloc {bool} -- True if the memory allocations of the analysis should be
+                                         traced with tracemalloc. (default: {False})"""
+
+        """Totals of every stage: {stage: {'wall_time', 'cpu_time', 'items', 'calls'}}."""
+        self.__stage_totals = {}
+
+        """Totals of every stage for every submission: {submission_id: {stage: {...}}}."""
+        self.__submission_stage_totals = {}
+
+        """The profiler, only when cProfile is enabled."""
+        self.__profiler = cProfile.Profile() if enable_cprofile else None
+
+        """Whether tracemalloc is on, and the snapshot of memory taken when the analysis finished."""
+        self.__enable_tracemalloc = enable_tracemalloc
+        self.__memory_snapshot = None
+        self.__peak_traced_memory = 0
+
+        """Analysis methods call each other, only the outermost one starts and stops profiling."""
+        self.__profiling_depth = 0
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __add_to_stage(self, stage_totals, stage_name, wall_time=0.0, cpu_time=0.0, items=0, calls=0):
+        """(Helper method)\n
+        Add measurements to the totals of a stage."""
+
+        if stage_name not in stage_totals:
+            stage_totals[stage_name] = {'wall_time': 0.0, 'cpu_time': 0.0, 'items': 0, 'calls': 0}
+
+        stage_totals[stage_name]['wall_time'] += wall_time
+        stage_totals[stage_name]['cpu_time'] += cpu_time
+        stage_totals[stage_name]['items'] += items
+        stage_totals[stage_name]['calls'] += calls
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    @contextlib.contextmanager
+    def measure_stage(self, stage_name, submission_id=None):
+        """Context manager that adds the wall and cpu time of the code run inside it to a stage.
+
+        Arguments:\n
+            stage_name {str} -- The name of the stage, one of ANALYSIS_STAGES.
+
+        Keyword Arguments:\n
+            submission_id {str} -- The submission that the stage is for, if any. (default: {None})"""
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        try:
+            yield self
+        finally:
+            wall_time = time.perf_counter() - start_wall_time
+            cpu_time = time.process_time() - start_cpu_time
+
+            self.__add_to_stage(self.__stage_totals, stage_name, wall_time, cpu_time, calls=1)
+            if submission_id is not None:
+                self.__add_to_stage(self.__submission_stage_totals.setdefault(submission_id, {}),
+                                    stage_name, wall_time, cpu_time, calls=1)
+
+
+    def add_item_count(self, stage_name, number_of_items, submission_id=None):
+        """Add to the amount of items (e.g. comments) that a stage handled.
+
+        Arguments:\n
+            stage_name {str} -- The name of the stage, one of ANALYSIS_STAGES.
+            number_of_items {int} -- The amount of items to add.
+
+        Keyword Arguments:\n
+            submission_id {str} -- The submission that the items are for, if any. (default: {None})"""
+
+        self.__add_to_stage(self.__stage_totals, stage_name, items=number_of_items)
+        if submission_id is not None:
+            self.__add_to_stage(self.__submission_stage_totals.setdefault(submission_id, {}),
+                                stage_name, items=number_of_items)
+
+
+    def add_stage_totals(self, stage_totals, submission_id=None):
+        """Add the totals of stages that were measured by another AnalysisStats, e.g. one that was
+        filled in an executor.
+
+        Arguments:\n
+            stage_totals {dict} -- The totals to add, as returned by get_stage_totals().
+
+        Keyword Arguments:\n
+            submission_id {str} -- The submission that the stages are for, if any. (default: {None})"""
+
+        for stage_name, totals_of_stage in stage_totals.items():
+            self.__add_to_stage(self.__stage_totals, stage_name, **totals_of_stage)
+            if submission_id is not None:
+                self.__add_to_stage(self.__submission_stage_totals.setdefault(submission_id, {}),
+                                    stage_name, **totals_of_stage)
+
+
+    def start_profiling(self):
+        """Start the enabled profilers. Nested calls are counted, so only the outermost
+        start_profiling()/stop_profiling() pair actually starts and stops them."""
+
+        self.__profiling_depth += 1
+        if self.__profiling_depth > 1:
+            return
+
+        if self.__profiler:
+            self.__profiler.enable()
+        if self.__enable_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+    def stop_profiling(self):
+        """Stop the enabled profilers (see start_profiling())."""
+
+        self.__profiling_depth -= 1
+        if self.__profiling_depth > 0:
+            return
+
+        if self.__profiler:
+            self.__profiler.disable()
+        if self.__enable_tracemalloc and tracemalloc.is_tracing():
+            self.__memory_snapshot = tracemalloc.take_snapshot()
+            self.__peak_traced_memory = max(self.__peak_traced_memory,
+                                            tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+
+    def get_stage_totals(self):
+        """Return the totals of every stage.
+
+        Returns:\n
+            dict -- {stage: {'wall_time': float, 'cpu_time': float, 'items': int, 'calls': int}}"""
+
+        return {stage_name: dict(stage_totals)
+                for stage_name, stage_totals in self.__stage_totals.items()}
+
+
+    def get_submission_stage_totals(self):
+        """Return the totals of every stage for every submission.
+
+        Returns:\n
+            dict -- {submission_id: {stage: {'wall_time', 'cpu_time', 'items', 'calls'}}}"""
+
+        return {submission_id: {stage_name: dict(stage_totals)
+                                for stage_name, stage_totals in submission_stages.items()}
+                for submission_id, submission_stages in self.__submission_stage_totals.items()}
+
+
+    def get_profile_report(self, number_of_lines=25, sort_by='cumulative'):
+        """Return the cProfile report of the analysis, or None if cProfile was not enabled.
+
+        Keyword Arguments:\n
+            number_of_lines {int} -- The amount of functions in the report. (default: {25})\n
+            sort_by {str} -- The pstats key that the functions are sorted by. (default: {'cumulative'})
+
+        Returns:\n
+            str -- The report."""
+
+        if not self.__profiler:
+            return None
+
+        report = io.StringIO()
+        pstats.Stats(self.__profiler, stream=report).sort_stats(sort_by).print_stats(number_of_lines)
+        return report.getvalue()
+
+
+    def get_memory_report(self, number_of_lines=10):
+        """Return the peak traced memory and the lines that allocated the most memory that was
+        still held when the analysis finished, or None if tracemalloc was not enabled.
+
+        Keyword Arguments:\n
+            number_of_lines {int} -- The amount of allocating lines in the report. (default: {10})
+
+        Returns:\n
+            str -- The report."""
+
+        if not self.__memory_snapshot:
+            return None
+
+        report_lines = [f'Peak traced memory: {self.__peak_traced_memory / 1024:.1f} KiB']
+        for statistic in self.__memory_snapshot.statistics('lineno')[: number_of_lines]:
+            report_lines.append(str(statistic))
+        return '\n'.join(report_lines)
+
+
+    def display(self):
+        """Print out the totals of every stage."""
+
+        print(f"\n{'Stage':<18}{'Wall (s)':>12}{'CPU (s)':>12}{'Items':>10}{'Calls':>10}")
+        for stage_name in ANALYSIS_STAGES:
+            if stage_name in self.__stage_totals:
+                stage_totals = self.__stage_totals[stage_name]
+                print(f"{stage_name:<18}{stage_totals['wall_time']:>12.4f}"
+                      f"{stage_totals['cpu_time']:>12.4f}{stage_totals['items']:>10}"
+                      f"{stage_totals['calls']:>10}")
@@ -0,0 +1,401 @@
+"""
+@Author Eric Zair
+@File async_comment_analysis.py
+@Description: Contains an object, AsyncSubredditAnalyzer, which is an asyncio version of
+              SubredditAnalyzer built on an async mongo driver (motor, or pymongo's
+              AsyncMongoClient). While the comments of one submission are preprocessed and scored
+              in an executor, the comments of the next submissions are already being pulled from
+              mongo, so neither the CPU nor mongo sits idle waiting on the other.
+
+              The results are the same as the ones of SubredditAnalyzer.
+
+@package docstring
+"""
+# For overlapping the queries of the next submissions with the scoring of the current one.
+import asyncio
+from collections import deque
+
+# Comments are preprocessed and classified exactly like SubredditAnalyzer does it.
+from .comment_analysis import get_submission_analysis_results
+from .comment_preprocessing import RedditPreprocessor
+from .resource_cache import get_sentiment_analyzer
+
+# For measuring how long each stage of an analysis takes, if the user asks for it.
+from .analysis_stats import AnalysisStats, measure_stage
+
+# For listing the submissions of a subreddit without scanning all of its comments.
+from .submission_catalog import SUBMISSION_CATALOG_COLLECTION_NAME, get_submissions_query_and_sort
+from .submission_catalog import get_backfilled_subreddit_record_id
+
+
+"""Preprocessors used for scoring, one per language and body codec, so that every executor process
+(or the threads of an executor) only builds one."""
+_scoring_preprocessors = {}
+
+
+def score_comment_records(comment_records, language='english', body_codec=None, measure_stages=False):
+    """Return the positivity and negativity of a submission, given its comment records as they are
+    stored in mongo. This is the CPU heavy part of an analysis (reading compressed bodies included),
+    which AsyncSubredditAnalyzer runs in an executor. It is a plain function, so it can be run in a
+    ProcessPoolExecutor as well, as long as no body_codec has to be sent along.
+
+    Arguments:\n
+        comment_records {list} -- The comment records (with at least their body) of a submission.
+
+    Keyword Arguments:\n
+        language {str} -- The language of the stop words that are removed. (default: {'english'})\n
+        body_codec {CommentBodyCodec} -- Decompresses comment bodies that were stored compressed.
+                                         Needed if any bodies are compressed. (default: {None})\n
+        measure_stages {bool} -- True if the stages of the scoring should be measured.
+                                 (default: {False})
+
+    Returns:\n
+        tuple -- ({'positive': float, 'negative': float}, stage totals), where the stage totals are
+                 the ones of AnalysisStats.get_stage_totals(), or None when they were not measured."""
+
+    if (language, body_codec) not in _scoring_preprocessors:
+        _scoring_preprocessors[(language, body_codec)] = \
+            RedditPreprocessor(None, language, body_codec=body_codec)
+    comment_preprocessor = _scoring_preprocessors[(language, body_codec)]
+    comment_sentiment_analyzer = get_sentiment_analyzer()
+
+    analysis_stats = AnalysisStats() if measure_stages else None
+
+    with measure_stage(analysis_stats, 'cursor_iteration'):
+        comment_bodies = [comment_preprocessor.get_comment_body(comment) for comment in comment_records]
+
+    with measure_stage(analysis_stats, 'preprocessing'):
+        preprocessed_comments = [comment_preprocessor.get_preprocessed_comment(comment_body)
+                                 for comment_body in comment_bodies]
+
+    with measure_stage(analysis_stats, 'vader_scoring'):
+        analysis_results_of_comments = [comment_sentiment_analyzer.polarity_scores(comment)
+                                        for comment in preprocessed_comments]
+
+    with measure_stage(analysis_stats, 'aggregation'):
+        analysis_results_of_submission = get_submission_analysis_results(analysis_results_of_comments)
+
+    if analysis_stats is None:
+        return analysis_results_of_submission, None
+
+    for stage_name in ['cursor_iteration', 'preprocessing', 'vader_scoring']:
+        analysis_stats.add_item_count(stage_name, len(comment_records))
+    return analysis_results_of_submission, analysis_stats.get_stage_totals()
+
+
+class AsyncSubredditAnalyzer():
+    """Given an async Mongodb collection of reddit comments, we analyze submissions and subreddits
+    with coroutines, so that the analyzer fits into async services.
+
+    e.g. AsyncSubredditAnalyzer(AsyncIOMotorClient(...)['reddit']['post_comment'])"""
+
+
+    def __init__(self, async_mongo_reddit_collection, language='english', executor=None,
+                 number_of_submissions_to_prefetch=2, body_codec=None):
+        """Constructs an AsyncSubredditAnalyzer object.
+
+        Arguments:\n
+            async_mongo_reddit_collection {AsyncIOMotorCollection} -- The collection of comments, from
+                                                                      motor or pymongo's async client.
+
+        Keyword Arguments:\n
+            language {str} -- The language of the comments. (default: {'english'})\n
+            executor {Executor} -- The executor that comments are scored in. None means the default
+                                   executor of the event loop. (default: {None})\n
+            number_of_submissions_to_prefetch {int} -- The max amount of submissions whose comments
+                                                       are pulled while a submission is scored.
+                                                       (default: {2})\n
+            body_codec {CommentBodyCodec} -- Decompresses comment bodies that were stored
+                                             compressed. Needed if any bodies are compressed.
+                                             Bodies are decompressed in the executor, so a
+                                             body_codec needs a thread executor (like the default
+                                             one), it can't be sent to a process pool.
+                                             (default: {None})
+
+        Raises:\n
+            ValueError: When number_of_submissions_to_prefetch is negative."""
+
+        if number_of_submissions_to_prefetch < 0:
+            raise ValueError('number_of_submissions_to_prefetch can not be negative.')
+
+        """Async MongoDB collection that we will be pulling our reddit data from."""
+        self.__reddit_collection = async_mongo_reddit_collection
+
+        """Language that comments are preprocessed in."""
+        self.__language = language
+
+        """Executor that comments are preprocessed and scored in."""
+        self.__executor = executor
+
+        """The max amount of submissions that are pulled ahead of the one being scored."""
+        self.__number_of_submissions_to_prefetch = number_of_submissions_to_prefetch
+
+        """Decompresses comment bodies, in the executor, while they are scored."""
+        self.__body_codec = body_codec
+
+        """There are the options that a user can use as a sorting type.
+        Anything else will trigger an error, if it is not in our set."""
+        self.__valid_sorting_types = {'new', 'top', 'hot', None}
+
+        """The ways that near duplicate comments can be handled, the same as SubredditAnalyzer."""
+        self.__valid_duplicate_handling_options = {'collapse', 'exclude', None}
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __check_analysis_paramters_are_valid_raise_exception(self, sorting_type_option,
+                                                             max_number_of_comments_option=None,
+                                                             max_number_of_submissions_option=None,
+                                                             duplicate_handling_option=None):
+        """(Helper method)\n
+        Make sure that the paramters passed to our analysis methods are valid, the same way that
+        SubredditAnalyzer checks them.
+
+        Raises:\n
+            ValueError: When sorting type is not valid.\n
+            ValueError: When max_number_of_comments_option is negative.\n
+            ValueError: When max_number_of_submissions_option is negative.\n
+            ValueError: When duplicate_handling_option is not valid."""
+
+        if sorting_type_option not in self.__valid_sorting_types:
+            raise ValueError(f"Error: sorting type must be of the following options: "
+                             f"{self.__valid_sorting_types}.")
+
+        if max_number_of_comments_option and max_number_of_comments_option < 0:
+            raise ValueError('max_number_of_comments_to_analyze must be a positivity.')
+
+        if max_number_of_submissions_option and max_number_of_submissions_option < 0:
+            raise ValueError('max_number_of_submissions_to_analyze must be a positivity.')
+
+        if duplicate_handling_option not in self.__valid_duplicate_handling_options:
+            raise ValueError(f"Error: duplicate_handling must be of the following options: "
+                             f"{self.__valid_duplicate_handling_options}.")
+
+
+    async def __get_comment_ids_to_skip(self, submission_id, duplicate_handling):
+        """(Helper method)\n
+        Return the ids of the comments of a submission that are left out as near duplicates. The
+        index is the one that NearDuplicateIndex keeps next to our comments."""
+
+        # Only needed when near duplicates are handled, like in SubredditAnalyzer.
+        from .near_duplicates import NEAR_DUPLICATE_COLLECTION_NAME, get_comment_ids_to_skip_query
+
+        signature_collection = self.__reddit_collection.database[NEAR_DUPLICATE_COLLECTION_NAME]
+        signature_records = await signature_collection.find(
+            get_comment_ids_to_skip_query([submission_id], duplicate_handling), {'_id': 1}).to_list(
+                length=None)
+        return {signature_record['_id'] for signature_record in signature_records}
+
+
+    async def __get_comment_records(self, submission_id, sorting_type, max_number_of_comments_to_analyze,
+                                    analysis_stats=None, duplicate_handling=None):
+        """(Helper method)\n
+        Return the comment records of a submission as they are stored, the bodies are read (and
+        decompressed) in the executor."""
+
+        with measure_stage(analysis_stats, 'mongo_query', submission_id):
+            comments_query = {'submission': submission_id}
+            if sorting_type:
+                comments_query['sorting_type'] = sorting_type
+
+            # Near duplicates are left out by mongo, so they never count towards the comment limit.
+            if duplicate_handling:
+                comment_ids_to_skip = await self.__get_comment_ids_to_skip(submission_id,
+                                                                           duplicate_handling)
+                if comment_ids_to_skip:
+                    comments_query['_id'] = {'$nin': list(comment_ids_to_skip)}
+
+            return await self.__reddit_collection.find(comments_query, {'body': 1}).limit(
+                max_number_of_comments_to_analyze).to_list(length=None)
+
+
+    async def __score_comment_records(self, submission_id, comment_records, analysis_stats=None):
+        """(Helper method)\n
+        Score the comment records of a submission in our executor, without blocking the event loop.
+        The stages measured in the executor are added to analysis_stats."""
+
+        analysis_results_of_submission, stage_totals = \
+            await asyncio.get_running_loop().run_in_executor(self.__executor, score_comment_records,
+                                                             comment_records, self.__language,
+                                                             self.__body_codec,
+                                                             analysis_stats is not None)
+        if analysis_stats is not None:
+            analysis_stats.add_stage_totals(stage_totals, submission_id)
+        return analysis_results_of_submission
+
+
+    async def __analyze_subreddit(self, subreddit_name, sorting_type, max_number_of_comments_to_analyze,
+                                  max_number_of_submissions_to_analyze, analysis_stats,
+                                  duplicate_handling):
+        """(Helper method)\n
+        Does the work of analyze_subreddit(), once the paramters have been checked."""
+
+        with measure_stage(analysis_stats, 'mongo_query'):
+            subreddit_submission_ids = await self.get_subreddit_submission_ids(
+                subreddit_name, sorting_type, max_number_of_submissions_to_analyze)
+
+        average_results_for_subreddit = {'positive': 0, 'negative': 0}
+
+        # Queries of the submissions after the one being scored, oldest first.
+        comment_record_tasks = deque()
+        number_of_submissions_requested = 0
+        try:
+            for submission_id in subreddit_submission_ids:
+                # The submission we score next is always requested, plus the ones we prefetch.
+                while number_of_submissions_requested < len(subreddit_submission_ids) and \
+                        len(comment_record_tasks) <= self.__number_of_submissions_to_prefetch:
+                    comment_record_tasks.append(asyncio.ensure_future(self.__get_comment_records(
+                        subreddit_submission_ids[number_of_submissions_requested], sorting_type,
+                        max_number_of_comments_to_analyze, analysis_stats, duplicate_handling)))
+                    number_of_submissions_requested += 1
+
+                analysis_results_of_submission = await self.__score_comment_records(
+                    submission_id, await comment_record_tasks.popleft(), analysis_stats)
+
+                with measure_stage(analysis_stats, 'aggregation', submission_id):
+                    for score_name in ['positive', 'negative']:
+                        average_results_for_subreddit[score_name] += \
+                            analysis_results_of_submission[score_name]
+        finally:
+            # Nothing is left running in the background when the analysis fails or is cancelled.
+            for comment_record_task in comment_record_tasks:
+                comment_record_task.cancel()
+
+        with measure_stage(analysis_stats, 'aggregation'):
+            total_sum_of_all_submission_scores = average_results_for_subreddit['positive'] + \
+                average_results_for_subreddit['negative']
+            if total_sum_of_all_submission_scores != 0:
+                average_results_for_subreddit['positive'] /= total_sum_of_all_submission_scores
+                average_results_for_subreddit['negative'] /= total_sum_of_all_submission_scores
+
+        return average_results_for_subreddit
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    async def get_subreddit_submission_ids(self, subreddit_name, sorting_type=None,
+                                           max_number_of_submissions=0):
+        """Return the ids of the submissions of a subreddit that analyze_subreddit() would analyze.
+        Subreddits that are backfilled into the submission catalog are listed newest submissions
+        first, others fall back to a distinct() over their comments.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the submissions of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            max_number_of_submissions {int} -- The max amount of ids that we return.
+                                               0 means every submission. (default: {0})
+
+        Returns:\n
+            list -- List of submission ids (str)."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(
+            sorting_type, max_number_of_submissions_option=max_number_of_submissions)
+
+        catalog_collection = self.__reddit_collection.database[SUBMISSION_CATALOG_COLLECTION_NAME]
+        if await catalog_collection.find_one({'_id': get_backfilled_subreddit_record_id(subreddit_name)},
+                                             {'_id': 1}) is not None:
+            catalog_query, catalog_sort = get_submissions_query_and_sort(subreddit_name, sorting_type)
+            catalog_records = await catalog_collection.find(catalog_query, {'_id': 1}).sort(
+                catalog_sort).limit(max_number_of_submissions).to_list(length=None)
+            return [catalog_record['_id'] for catalog_record in catalog_records]
+
+        comments_query = {'subreddit_name': subreddit_name}
+        if sorting_type:
+            comments_query['sorting_type'] = sorting_type
+        subreddit_submission_ids = await self.__reddit_collection.distinct('submission', comments_query)
+
+        if max_number_of_submissions:
+            return subreddit_submission_ids[: max_number_of_submissions]
+        return subreddit_submission_ids
+
+
+    async def analyze_submission(self, submission_id, sorting_type=None,
+                                 max_number_of_comments_to_analyze=0, analysis_stats=None,
+                                 duplicate_handling=None):
+        """Returns a dictionary containing the positivity and negativity of a submission.
+
+        Arguments:\n
+            submission_id {str} -- The reddit submission id of the submission you want to analyze.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            max_number_of_comments_to_analyze {int} -- The max amount of comments that we analyze.
+                                                       0 means every comment. (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis. (default: {None})\n
+            duplicate_handling {str} -- 'collapse' only analyzes one comment of every cluster of near
+                                        duplicate comments, 'exclude' leaves every comment that has a
+                                        near duplicate out. None analyzes every comment.
+                                        (default: {None})
+
+        Returns:\n
+            dict -- A dictionary in the form of {'positive': float, 'negative': float}"""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type,
+                                                                  max_number_of_comments_to_analyze,
+                                                                  duplicate_handling_option=\
+                                                                      duplicate_handling)
+
+        if analysis_stats:
+            analysis_stats.start_profiling()
+        try:
+            comment_records = await self.__get_comment_records(submission_id, sorting_type,
+                                                               max_number_of_comments_to_analyze,
+                                                               analysis_stats, duplicate_handling)
+            return await self.__score_comment_records(submission_id, comment_records, analysis_stats)
+        finally:
+            if analysis_stats:
+                analysis_stats.stop_profiling()
+
+
+    async def analyze_subreddit(self, subreddit_name, sorting_type=None,
+                                max_number_of_comments_to_analyze=0,
+                                max_number_of_submissions_to_analyze=0,
+                                analysis_stats=None,
+                                duplicate_handling=None):
+        """Return a dictionary containing the positive and negative results of a given subreddit.
+        The comments of the next submissions are pulled while the current one is scored.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want to analyze.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            max_number_of_comments_to_analyze {int} -- The max number of comments that we analyze
+                                                       per submission. (default: {0})\n
+            max_number_of_submissions_to_analyze {int} -- The max number of submissions that we
+                                                          analyze. (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis, in total and for
+                                              each submission. (default: {None})\n
+            duplicate_handling {str} -- 'collapse' only analyzes one comment of every cluster of near
+                                        duplicate comments, 'exclude' leaves every comment that has a
+                                        near duplicate out. None analyzes every comment.
+                                        (default: {None})
+
+        Returns:\n
+            dict -- Dictionary containing the positivity and negativity of a given subreddit.
+                    {'positive': float, 'negative': float}"""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type,
+                                                                  max_number_of_comments_to_analyze,
+                                                                  max_number_of_submissions_to_analyze,
+                                                                  duplicate_handling)
+
+        if analysis_stats:
+            analysis_stats.start_profiling()
+        try:
+            return await self.__analyze_subreddit(subreddit_name, sorting_type,
+                                                  max_number_of_comments_to_analyze,
+                                                  max_number_of_submissions_to_analyze, analysis_stats,
+                                                  duplicate_handling)
+        finally:
+            if analysis_stats:
+                analysis_stats.stop_profiling()
@@ -0,0 +1,219 @@
+"""
+@Author Eric Zair
+@File author_index.py
+@Description: Contains an object, AuthorActivityIndex, which keeps a mongodb collection of
+              per-author, per-subreddit, per-day comment counts and sentiment sums. It is updated
+              as comments are collected, so questions like "who are the most negative authors in
+              this subreddit this week" never need to rescan comment bodies.
+
+@package docstring
+"""
+# For sending all of the index updates of a batch of comments in one round trip.
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+# My comment preprocessor object, specifically used for reddit comments.
+from .comment_preprocessing import RedditPreprocessor
+
+# We use the same classification of comments as the SubredditAnalyzer does.
+from .comment_analysis import get_comment_classification
+
+# For analysis/gathering sentiment analysis results, with vader's lexicon already parsed.
+from .resource_cache import get_sentiment_analyzer
+
+
+"""Comment activity is bucketed by day (in utc), which is the granularity of time window queries."""
+SECONDS_PER_DAY = 86400
+
+
+class AuthorActivityIndex():
+    """Given a Mongodb collection, we maintain one record per (author, subreddit, day) in it with
+    the amount of comments that the author made and the sums of their sentiment scores.
+
+    Records of the collection have the following fields:
+        author, subreddit_name, day, comment_count, positive_count, negative_count,
+        compound_sum, first_comment_at, last_comment_at."""
+
+
+    def __init__(self, mongo_author_collection, language='english'):
+        """Constructs an AuthorActivityIndex object.
+
+        Arguments:\n
+            mongo_author_collection {Collection} -- The collection that the index is stored in.
+                                                    (This is NOT the collection of comments.)
+
+        Keyword Arguments:\n
+            language {str} -- The language of the stop words that we remove. (default: {'english'})"""
+
+        """MongoDB collection that holds the index records."""
+        self.__author_collection = mongo_author_collection
+        self.__author_collection.create_index([('author', ASCENDING), ('subreddit_name', ASCENDING),
+                                               ('day', ASCENDING)], unique=True)
+        self.__author_collection.create_index([('subreddit_name', ASCENDING), ('day', ASCENDING)])
+
+        """Used for scoring every comment that is added to the index."""
+        self.__comment_sentiment_analyzer = get_sentiment_analyzer()
+
+        """Used for preprocessing every comment before it is scored. It never queries for
+        comments itself, so it does not need a collection."""
+        self.__comment_preprocessor = RedditPreprocessor(None, language=language)
+
+        """These are the ways that a user can rank authors by."""
+        self.__valid_ranking_options = {'comment_count', 'negative_fraction', 'mean_sentiment'}
+
+
+    def add_comments(self, comment_records):
+        """Add comments to the index. Each comment must only ever be added once, e.g. only add the
+        comments that were newly inserted into the comments collection.
+
+        Arguments:\n
+            comment_records {iterable} -- Comment records as they are stored in mongo. Each one needs
+                                          at least the author, body, created_at, and subreddit_name
+                                          fields. Comments without an author are skipped.
+
+        Returns:\n
+            int -- The amount of comments that were added to the index."""
+
+        # Comments of the same author, subreddit, and day are summed up first, so that every
+        # index record is only updated once per batch.
+        index_updates = {}
+        number_of_comments_added = 0
+
+        for comment in comment_records:
+            if not comment.get('author'):
+                continue
+
+            analysis_results_of_comment = self.__comment_sentiment_analyzer.polarity_scores(
+                self.__comment_preprocessor.get_preprocessed_comment(
+                    self.__comment_preprocessor.get_comment_body(comment)))
+            classification = get_comment_classification(analysis_results_of_comment)
+
+            index_key = (comment['author'], comment['subreddit_name'],
+                         int(comment['created_at'] // SECONDS_PER_DAY))
+            if index_key not in index_updates:
+                index_updates[index_key] = {'comment_count': 0, 'positive_count': 0, 'negative_count': 0,
+                                            'compound_sum': 0.0,
+                                            'first_comment_at': comment['created_at'],
+                                            'last_comment_at': comment['created_at']}
+
+            index_update = index_updates[index_key]
+            index_update['comment_count'] += 1
+            index_update['positive_count'] += classification == "Positive"
+            index_update['negative_count'] += classification == "Negative"
+            index_update['compound_sum'] += analysis_results_of_comment['compound']
+            index_update['first_comment_at'] = min(index_update['first_comment_at'],
+                                                   comment['created_at'])
+            index_update['last_comment_at'] = max(index_update['last_comment_at'],
+                                                  comment['created_at'])
+            number_of_comments_added += 1
+
+        if index_updates:
+            self.__author_collection.bulk_write([
+                UpdateOne({'author': author, 'subreddit_name': subreddit_name, 'day': day},
+                          {'$inc': {'comment_count': index_update['comment_count'],
+                                    'positive_count': index_update['positive_count'],
+                                    'negative_count': index_update['negative_count'],
+                                    'compound_sum': index_update['compound_sum']},
+                           '$min': {'first_comment_at': index_update['first_comment_at']},
+                           '$max': {'last_comment_at': index_update['last_comment_at']}},
+                          upsert=True)
+                for (author, subreddit_name, day), index_update in index_updates.items()
+            ], ordered=False)
+
+        return number_of_comments_added
+
+
+    def rebuild_from_comment_collection(self, mongo_reddit_collection, batch_size=5000):
+        """Throw the index away and build it again from every comment in a comments collection.
+        This is meant for comments that were collected before the index existed.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            batch_size {int} -- The amount of comments added to the index at a time. (default: {5000})
+
+        Returns:\n
+            int -- The amount of comments that were added to the index."""
+
+        self.__author_collection.delete_many({})
+
+        # Stored bodies might be compressed, this preprocessor knows where their dictionaries are.
+        comment_body_reader = RedditPreprocessor(mongo_reddit_collection)
+
+        number_of_comments_added = 0
+        comment_batch = []
+        for comment in mongo_reddit_collection.find({'author': {'$ne': ''}},
+                                                    {'author': 1, 'body': 1, 'created_at': 1,
+                                                     'subreddit_name': 1}):
+            comment['body'] = comment_body_reader.get_comment_body(comment)
+            comment_batch.append(comment)
+            if len(comment_batch) == batch_size:
+                number_of_comments_added += self.add_comments(comment_batch)
+                comment_batch = []
+
+        return number_of_comments_added + self.add_comments(comment_batch)
+
+
+    def get_top_authors(self, subreddit_name=None, start_time=None, end_time=None,
+                        ranked_by='comment_count', number_of_authors=10, min_number_of_comments=1):
+        """Return the top authors, optionally only counting the comments of one subreddit and/or
+        of a time window. The time window is rounded out to whole (utc) days.
+
+        Keyword Arguments:\n
+            subreddit_name {str} -- Only count comments of this subreddit. None means every
+                                    subreddit. (default: {None})\n
+            start_time {float} -- Only count comments made at or after this unix time.
+                                  (default: {None})\n
+            end_time {float} -- Only count comments made at or before this unix time.
+                                (default: {None})\n
+            ranked_by {str} -- 'comment_count' (most prolific authors), 'negative_fraction' (most
+                               negative authors), or 'mean_sentiment' (most positive authors).
+                               (default: {'comment_count'})\n
+            number_of_authors {int} -- The amount of authors that we return. (default: {10})\n
+            min_number_of_comments {int} -- Authors with less comments than this are left out, so
+                                            one negative comment doesn't top the list.
+                                            (default: {1})
+
+        Raises:\n
+            ValueError: When ranked_by is not a valid ranking option.
+
+        Returns:\n
+            list -- List of dicts in the form of
+                    {'author': str, 'comment_count': int, 'positive_count': int,
+                     'negative_count': int, 'negative_fraction': float, 'mean_sentiment': float,
+                     'subreddits': list, 'first_comment_at': float, 'last_comment_at': float}"""
+
+        if ranked_by not in self.__valid_ranking_options:
+            raise ValueError(f'ranked_by must be one of the following options: '
+                             f'{self.__valid_ranking_options}.')
+
+        index_query = {}
+        if subreddit_name:
+            index_query['subreddit_name'] = subreddit_name
+        if start_time is not None or end_time is not None:
+            index_query['day'] = {}
+            if start_time is not None:
+                index_query['day']['$gte'] = int(start_time // SECONDS_PER_DAY)
+            if end_time is not None:
+                index_query['day']['$lte'] = int(end_time // SECONDS_PER_DAY)
+
+        top_authors = self.__author_collection.aggregate([
+            {'$match': index_query},
+            {'$group': {'_id': '$author',
+                        'comment_count': {'$sum': '$comment_count'},
+                        'positive_count': {'$sum': '$positive_count'},
+                        'negative_count': {'$sum': '$negative_count'},
+                        'compound_sum': {'$sum': '$compound_sum'},
+                        'subreddits': {'$addToSet': '$subreddit_name'},
+                        'first_comment_at': {'$min': '$first_comment_at'},
+                        'last_comment_at': {'$max': '$last_comment_at'}}},
+            {'$match': {'comment_count': {'$gte': max(min_number_of_comments, 1)}}},
+            {'$addFields': {'author': '$_id',
+                            'negative_fraction': {'$divide': ['$negative_count', '$comment_count']},
+                            'mean_sentiment': {'$divide': ['$compound_sum', '$comment_count']}}},
+            {'$project': {'_id': 0, 'compound_sum': 0}},
+            {'$sort': {ranked_by: DESCENDING, 'comment_count': DESCENDING}},
+            {'$limit': number_of_authors}
+        ])
+
+        return list(top_authors)
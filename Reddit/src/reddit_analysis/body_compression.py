@@ -0,0 +1,279 @@
+"""
+@Author Eric Zair
+@File body_compression.py
+@Description: Contains an object, CommentBodyCodec, which compresses comment bodies with a zstd
+              dictionary that is trained on our own comments. Comment text repeats a lot (quotes,
+              bot boilerplate, common phrases), so a trained dictionary shrinks even short
+              comments, which plain compression can't do. Every dictionary is stored (with a
+              version number) in a metadata collection, so bodies compressed with an old
+              dictionary can still be read after a new one is trained.
+
+              Compressed bodies are stored as bytes and plain bodies as str, so a collection can
+              hold both, and nothing needs to be migrated when compression is turned on.
+
+@package docstring
+"""
+# Decompressors are not thread safe, so every thread gets its own.
+import threading
+import time
+
+# For finding the newest dictionary, and compressing the comments we already have in bulk.
+from pymongo import DESCENDING, UpdateOne
+
+# NOTE: zstandard is only needed once a body is compressed or decompressed, so it is imported
+# inside of the methods that use it. Collections with only plain bodies never need it.
+
+
+"""Name of the collection (in the same database as our comments) that the dictionaries are
+stored in."""
+STORAGE_METADATA_COLLECTION_NAME = 'storage_metadata'
+
+"""The default size of a trained dictionary, this is what the zstd command line tool uses."""
+DEFAULT_DICTIONARY_SIZE = 112640
+
+"""The zstd compression level that bodies are compressed with."""
+DEFAULT_COMPRESSION_LEVEL = 9
+
+
+class CommentBodyCodec():
+    """Given a Mongodb metadata collection, we train, store, and load zstd dictionaries, and use
+    them to compress and decompress comment bodies.
+
+    Dictionary records of the collection have the following fields:
+        _id, type ('zstd_dictionary'), version, dictionary_id, dictionary, created_at,
+        number_of_training_comments."""
+
+
+    def __init__(self, mongo_metadata_collection, compression_level=DEFAULT_COMPRESSION_LEVEL):
+        """Constructs a CommentBodyCodec object.
+
+        Arguments:\n
+            mongo_metadata_collection {Collection} -- The collection that the dictionaries are
+                                                      stored in. (This is NOT the collection of
+                                                      comments.)
+
+        Keyword Arguments:\n
+            compression_level {int} -- The zstd level that bodies are compressed with.
+                                       (default: {DEFAULT_COMPRESSION_LEVEL})"""
+
+        self.__metadata_collection = mongo_metadata_collection
+        self.__compression_level = compression_level
+
+        """Maps the zstd id of every dictionary we have loaded to the dictionary."""
+        self.__dictionaries = {}
+
+        """The newest dictionary, which is the one that new bodies are compressed with."""
+        self.__current_dictionary = None
+        self.__current_compressor = None
+
+        """Holds the decompressors of every thread, one per dictionary."""
+        self.__thread_local_decompressors = threading.local()
+
+        self.__dictionaries_lock = threading.Lock()
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __get_dictionary(self, dictionary_id):
+        """(Helper method)\n
+        Return the dictionary with the given zstd id, loading it from mongo the first time."""
+
+        import zstandard
+
+        with self.__dictionaries_lock:
+            if dictionary_id not in self.__dictionaries:
+                dictionary_record = self.__metadata_collection.find_one({'type': 'zstd_dictionary',
+                                                                         'dictionary_id': dictionary_id})
+                if dictionary_record is None:
+                    raise ValueError(f'No zstd dictionary with the id {dictionary_id} was found in '
+                                     f'the {self.__metadata_collection.name} collection.')
+                self.__dictionaries[dictionary_id] = \
+                    zstandard.ZstdCompressionDict(dictionary_record['dictionary'])
+            return self.__dictionaries[dictionary_id]
+
+
+    def __get_decompressor(self, dictionary_id):
+        """(Helper method)\n
+        Return this thread's decompressor for the dictionary with the given zstd id."""
+
+        import zstandard
+
+        decompressors = getattr(self.__thread_local_decompressors, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self.__thread_local_decompressors.decompressors = {}
+
+        if dictionary_id not in decompressors:
+            decompressors[dictionary_id] = \
+                zstandard.ZstdDecompressor(dict_data=self.__get_dictionary(dictionary_id))
+        return decompressors[dictionary_id]
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def train_dictionary(self, comment_bodies, dictionary_size=DEFAULT_DICTIONARY_SIZE):
+        """Train a new dictionary on comment bodies, and store it as the newest version. Bodies
+        that are compressed from now on use the new dictionary.
+
+        Arguments:\n
+            comment_bodies {list} -- The (plain text) bodies that the dictionary is trained on.
+                                     A few thousand comments or more are needed.
+
+        Keyword Arguments:\n
+            dictionary_size {int} -- The max size of the dictionary in bytes.
+                                     (default: {DEFAULT_DICTIONARY_SIZE})
+
+        Raises:\n
+            ValueError: When there are no comment bodies to train on.
+
+        Returns:\n
+            int -- The version of the new dictionary."""
+
+        import zstandard
+
+        training_samples = [comment_body.encode('utf-8')
+                            for comment_body in comment_bodies if comment_body]
+        if not training_samples:
+            raise ValueError('Error: a dictionary can not be trained without any comment bodies.')
+
+        dictionary = zstandard.train_dictionary(dictionary_size, training_samples,
+                                                level=self.__compression_level)
+
+        newest_dictionary_record = self.__metadata_collection.find_one({'type': 'zstd_dictionary'},
+                                                                       sort=[('version', DESCENDING)])
+        version = newest_dictionary_record['version'] + 1 if newest_dictionary_record else 1
+
+        self.__metadata_collection.insert_one({'_id': f'zstd_dictionary_{version}',
+                                               'type': 'zstd_dictionary',
+                                               'version': version,
+                                               'dictionary_id': dictionary.dict_id(),
+                                               'dictionary': dictionary.as_bytes(),
+                                               'created_at': time.time(),
+                                               'number_of_training_comments': len(training_samples)})
+
+        with self.__dictionaries_lock:
+            self.__current_dictionary = None
+            self.__current_compressor = None
+        return version
+
+
+    def train_dictionary_from_comment_collection(self, mongo_reddit_collection,
+                                                 number_of_training_comments=20000,
+                                                 dictionary_size=DEFAULT_DICTIONARY_SIZE):
+        """Train a new dictionary on a random sample of the comments in a comments collection.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            number_of_training_comments {int} -- The amount of comments sampled. (default: {20000})\n
+            dictionary_size {int} -- The max size of the dictionary in bytes.
+                                     (default: {DEFAULT_DICTIONARY_SIZE})
+
+        Returns:\n
+            int -- The version of the new dictionary."""
+
+        sampled_comments = mongo_reddit_collection.aggregate([
+            {'$sample': {'size': number_of_training_comments}},
+            {'$project': {'body': 1}}
+        ])
+        # A new dictionary can be trained on comments that were compressed with an older one.
+        return self.train_dictionary([self.decompress_body(comment['body'])
+                                      for comment in sampled_comments],
+                                     dictionary_size=dictionary_size)
+
+
+    def get_current_dictionary_version(self):
+        """Return the version of the newest dictionary, or None if none has been trained yet.
+
+        Returns:\n
+            int -- The version of the newest dictionary."""
+
+        newest_dictionary_record = self.__metadata_collection.find_one({'type': 'zstd_dictionary'},
+                                                                       {'version': 1},
+                                                                       sort=[('version', DESCENDING)])
+        return newest_dictionary_record['version'] if newest_dictionary_record else None
+
+
+    def compress_body(self, comment_body):
+        """Compress a comment body with the newest dictionary. When no dictionary has been trained
+        yet, or compressing does not make the body any smaller, the plain body is returned.
+
+        Arguments:\n
+            comment_body {str} -- The plain text body of a comment.
+
+        Returns:\n
+            bytes or str -- The body as it should be stored in mongo."""
+
+        import zstandard
+
+        with self.__dictionaries_lock:
+            if self.__current_dictionary is None:
+                newest_dictionary_record = self.__metadata_collection.find_one(
+                    {'type': 'zstd_dictionary'}, sort=[('version', DESCENDING)])
+                if newest_dictionary_record is None:
+                    return comment_body
+
+                self.__current_dictionary = \
+                    zstandard.ZstdCompressionDict(newest_dictionary_record['dictionary'])
+                self.__dictionaries[self.__current_dictionary.dict_id()] = self.__current_dictionary
+                self.__current_compressor = zstandard.ZstdCompressor(level=self.__compression_level,
+                                                                     dict_data=self.__current_dictionary)
+
+            # The dictionary id is written into every frame, which is how we know which dictionary
+            # to decompress a body with.
+            encoded_body = comment_body.encode('utf-8')
+            compressed_body = self.__current_compressor.compress(encoded_body)
+
+        return compressed_body if len(compressed_body) < len(encoded_body) else comment_body
+
+
+    def decompress_body(self, stored_body):
+        """Return the plain text of a body as it was stored in mongo.
+
+        Arguments:\n
+            stored_body {bytes or str} -- The body of a comment record.
+
+        Returns:\n
+            str -- The plain text body."""
+
+        if isinstance(stored_body, str):
+            return stored_body
+
+        import zstandard
+
+        stored_body = bytes(stored_body)
+        dictionary_id = zstandard.get_frame_parameters(stored_body).dict_id
+        return self.__get_decompressor(dictionary_id).decompress(stored_body).decode('utf-8')
+
+
+    def compress_comment_collection(self, mongo_reddit_collection, batch_size=1000):
+        """Compress the bodies of every comment in a comments collection that is still stored as
+        plain text. This is meant for comments that were collected before compression was on.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            batch_size {int} -- The amount of comments updated in one round trip. (default: {1000})
+
+        Returns:\n
+            int -- The amount of comment bodies that were compressed."""
+
+        number_of_bodies_compressed = 0
+        body_updates = []
+        for comment in mongo_reddit_collection.find({'body': {'$type': 'string'}}, {'body': 1}):
+            compressed_body = self.compress_body(comment['body'])
+            if isinstance(compressed_body, str):
+                continue
+
+            body_updates.append(UpdateOne({'_id': comment['_id']}, {'$set': {'body': compressed_body}}))
+            number_of_bodies_compressed += 1
+            if len(body_updates) == batch_size:
+                mongo_reddit_collection.bulk_write(body_updates, ordered=False)
+                body_updates = []
+
+        if body_updates:
+            mongo_reddit_collection.bulk_write(body_updates, ordered=False)
+        return number_of_bodies_compressed
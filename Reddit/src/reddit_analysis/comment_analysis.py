@@ -10,15 +10,92 @@
 # We want to know how long the analysis of a subreddit takes, should the user want to see the results.
 import datetime
 
+# Approximate analysis needs a time budget and normal quantiles for the confidence
+# intervals that we report.
+import math
+import time
+from statistics import NormalDist, variance
+
 # Catching possible mongo errors.
 from pymongo.errors import CursorNotFound
 
 # My comment preprocessor object, specifically used for reddit comments.
 from .comment_preprocessing import RedditPreprocessor
 
-# For analysis/gathering sentiment analysis results.
+# For measuring how long each stage of an analysis takes, if the user asks for it.
+from .analysis_stats import measure_stage
+
+# For finding the hottest topics of a submission or subreddit in a single pass.
+from .topic_extraction import HeavyHitterTopicCounter
+
+# For listing the submissions of a subreddit without scanning all of its comments.
+from .submission_catalog import SUBMISSION_CATALOG_COLLECTION_NAME, SubmissionCatalog
+
+# For analysis/gathering sentiment analysis results. The vader SentimentIntensityAnalyzer is
+# loaded with its lexicon already parsed, out of our resource cache.
 # https://www.kaggle.com/kamote/exploring-toxic-comments-by-sentiment-analysis
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from .resource_cache import get_sentiment_analyzer
+
+
+def get_comment_classification(analysis_results_of_comment):
+    """Return the classification of a comment given the vader polarity scores of it.
+
+    Arguments:\n
+        analysis_results_of_comment {dict} -- The result of SentimentIntensityAnalyzer.polarity_scores()
+                                              for a comment. {'neg', 'neu', 'pos', 'compound'}
+
+    Returns:\n
+        str -- Either "Positive", "Negative", or "Ignored" (the comment is neutral)."""
+
+    if(
+        # Concluded comment is positive.
+        analysis_results_of_comment['compound'] >= 0.05 or \
+        analysis_results_of_comment['neg'] == 0 and analysis_results_of_comment['pos'] > 0
+    ):
+        return "Positive"
+    elif(
+        # Concluded comment is negative.
+        analysis_results_of_comment['compound'] <= -0.05 or \
+        analysis_results_of_comment['pos'] == 0 and analysis_results_of_comment['neg'] > 0
+    ):
+        return "Negative"
+
+    # Comment is not positive or negative, so it is ignored.
+    return "Ignored"
+
+
+def get_submission_analysis_results(analysis_results_of_comments):
+    """Return the positivity and negativity of a submission, given the vader polarity scores of its
+    comments. Every analyzer sums up the comments of a submission with this.
+
+    Arguments:\n
+        analysis_results_of_comments {iterable} -- The polarity_scores() results of the comments.
+
+    Returns:\n
+        dict -- A dictionary in the form of {'positive': float, 'negative': float}"""
+
+    # Used to sum up and get averages for positive and negative comments.
+    positive_comment_results = []
+    negative_comment_results = []
+
+    for analysis_results_of_comment in analysis_results_of_comments:
+        # Comment might not be positive or negative, in which case it is ignored.
+        classification = get_comment_classification(analysis_results_of_comment)
+
+        if classification == "Positive":
+            positive_comment_results.append(analysis_results_of_comment['compound'])
+        elif classification == "Negative":
+            negative_comment_results.append(abs(analysis_results_of_comment['compound']))
+
+    # Need this to later get percentages of negativity and positivity (math stuffs).
+    total_sum_of_result_scores = sum(positive_comment_results + negative_comment_results)
+
+    # This implies we have not analyzed anthing.
+    if total_sum_of_result_scores == 0:
+        return {'positive': 0, 'negative': 0}
+
+    return {'positive': sum(positive_comment_results) / total_sum_of_result_scores,
+            'negative': sum(negative_comment_results) / total_sum_of_result_scores}
 
 
 class SubredditAnalyzer():
@@ -29,8 +106,16 @@ class SubredditAnalyzer():
     of a given subreddit or submission."""
 
 
-    def __init__(self, mongo_reddit_collection, language='english'):
-        """Constructs a SubRedditAnalyzer object."""
+    def __init__(self, mongo_reddit_collection, language='english', near_duplicate_index=None,
+                 submission_catalog=None):
+        """Constructs a SubRedditAnalyzer object.
+
+        near_duplicate_index is the NearDuplicateIndex used when near duplicate comments are
+        collapsed or excluded. When it is None, one is made from the signature collection next to
+        mongo_reddit_collection the first time that it is needed.
+
+        submission_catalog is the SubmissionCatalog that the submissions of a subreddit are listed
+        from. When it is None, the catalog collection next to mongo_reddit_collection is used."""
 
         """MongDB collection that we will be pulling our reddit data from.
 
@@ -43,7 +128,7 @@ class SubredditAnalyzer():
         """This is an out of the box Sentiment Analyzer model that is exceptionally good
         at analyzing social media data. We will feed individual comments to it and it will
         give us a score of polarity (positivity, negativity, neutral, and Compound)."""
-        self.__comment_sentiment_analyzer = SentimentIntensityAnalyzer()
+        self.__comment_sentiment_analyzer = get_sentiment_analyzer()
 
         """RedditPreprocessor that is used for preprocessing all of the comments that we will be
         analyzing. This object can later be configured by the user, in the event that they want
@@ -54,13 +139,24 @@ class SubredditAnalyzer():
         Anything else will trigger an error, if it is not in our set."""
         self.__valid_sorting_types = {'new', 'top', 'hot', None}
 
+        """Knows which comments are near duplicates of each other."""
+        self.__near_duplicate_index = near_duplicate_index
+
+        """Knows which submissions we have comments of, so we never have to scan comments for them."""
+        self.__submission_catalog = submission_catalog
+
+        """These are the ways that near duplicate comments can be handled (None means that they
+        are analyzed like every other comment)."""
+        self.__valid_duplicate_handling_options = {'collapse', 'exclude', None}
+
 
     # PRIVATE METHODS__________________________________________________________________________________
 
 
     def __check_analysis_paramters_are_valid_raise_exception(self, sorting_type_option,
                                                              max_number_of_comments_option=None,
-                                                             max_number_of_submissions_option=None):
+                                                             max_number_of_submissions_option=None,
+                                                             duplicate_handling_option=None):
         """(Helper method)\n
         Method used to Make sure that the paramters passed to our analysis methods are valid.
         If the are not valid, then we throw an exception for the specific issue.\n
@@ -76,14 +172,17 @@ class SubredditAnalyzer():
                                                       will be analyzed. We need to make sure it is
                                                       in a certain range.
 
+            duplicate_handling_option {str or None} -- How near duplicate comments are handled.
+
         Raises:\n
             ValueError: When sorting type is not valid.\n
             ValueError: When max_number_of_comments_option is negative.\n
-            ValueError: When max_number_of_submissions_option is negative."""
+            ValueError: When max_number_of_submissions_option is negative.\n
+            ValueError: When duplicate_handling_option is not valid."""
 
         if sorting_type_option not in self.__valid_sorting_types:
             raise ValueError(f"Error: sorting type must be of the following options: "
-                             "{self.__valid_sorting_types}.")
+                             f"{self.__valid_sorting_types}.")
     
         if max_number_of_comments_option and max_number_of_comments_option < 0:
             raise ValueError('max_number_of_comments_to_analyze must be a positivity.')
@@ -91,13 +190,317 @@ class SubredditAnalyzer():
         if max_number_of_submissions_option and max_number_of_submissions_option < 0:
             raise ValueError('max_number_of_submissions_to_analyze must be a positivity.')
 
+        if duplicate_handling_option not in self.__valid_duplicate_handling_options:
+            raise ValueError(f"Error: duplicate handling must be of the following options: "
+                             f"{self.__valid_duplicate_handling_options}.")
+
+
+    def __get_near_duplicate_index(self):
+        """(Helper method)\n
+        Return the NearDuplicateIndex of our comments, which is made the first time it is needed."""
+
+        if self.__near_duplicate_index is None:
+            # numpy is only needed for near duplicates, so we only import it once they are asked for.
+            from .near_duplicates import NEAR_DUPLICATE_COLLECTION_NAME, NearDuplicateIndex
+            self.__near_duplicate_index = NearDuplicateIndex(
+                self.__reddit_collection.database[NEAR_DUPLICATE_COLLECTION_NAME])
+        return self.__near_duplicate_index
+
+
+    def __get_submission_catalog(self):
+        """(Helper method)\n
+        Return the SubmissionCatalog of our comments, which is made the first time it is needed."""
+
+        if self.__submission_catalog is None:
+            self.__submission_catalog = SubmissionCatalog(
+                self.__reddit_collection.database[SUBMISSION_CATALOG_COLLECTION_NAME])
+        return self.__submission_catalog
+
+
+    def __get_subreddit_submission_ids(self, subreddit_name, sorting_type=None):
+        """(Helper method)\n
+        Return a list of the ids of every submission that we have comments stored for in a subreddit,
+        newest submissions first.
+
+        The ids come from the submission catalog. Subreddits that are not backfilled into the catalog
+        yet (their comments were collected before it existed) fall back to a distinct() over their
+        comments.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the submissions of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only grab submissions of this sorting type. None means that we
+                                  grab every submission. (default: {None})
+
+        Returns:\n
+            list -- List of submission ids (str)."""
+
+        submission_catalog = self.__get_submission_catalog()
+        if submission_catalog.is_subreddit_backfilled(subreddit_name):
+            return submission_catalog.get_submissions(subreddit_name, sorting_type, ids_only=True)
+
+        if sorting_type:
+            # User only wants to get posts of given sorting type.
+            return self.__reddit_collection.find({'subreddit_name': subreddit_name,
+                                                  'sorting_type': sorting_type}
+                                                 ).distinct('submission')
+
+        # User did NOT give us a sorting type, so just grab everything.
+        return self.__reddit_collection.find({'subreddit_name': subreddit_name}).distinct('submission')
+
+
+    def __get_strata(self, submission_ids, sorting_type):
+        """(Helper method)\n
+        Return a stratum for every submission, holding the amount of comments that it has and the
+        weights of its sampled comments. Empty submissions can't contribute anything, so they
+        have no stratum."""
+
+        comment_counts = self.__comment_preprocessor.get_number_of_comments_of_submissions(
+            submission_ids, sorting_type=sorting_type)
+        return {submission_id: {'population_size': number_of_comments,
+                                'positive_weights': [],
+                                'total_weights': []}
+                for submission_id, number_of_comments in comment_counts.items()}
+
+
+    def __get_stratum_sample_sizes(self, strata, sample_batch_size, total_population_size):
+        """(Helper method)\n
+        Return how many comments we sample in the next round from each submission that still has
+        some left, proportionally to the amount of comments that it has. We need at least 2
+        comments of a submission to be able to estimate its variance."""
+
+        stratum_sample_sizes = {}
+        for submission_id, stratum in strata.items():
+            number_of_comments_sampled = len(stratum['total_weights'])
+            number_of_comments_left = stratum['population_size'] - number_of_comments_sampled
+            if number_of_comments_left > 0:
+                proportional_sample_size = \
+                    round(sample_batch_size * stratum['population_size'] / total_population_size)
+                stratum_sample_sizes[submission_id] = \
+                    min(number_of_comments_left,
+                        max(2 - number_of_comments_sampled, 1, proportional_sample_size))
+
+        return stratum_sample_sizes
+
+
+    def __sample_strata(self, strata, stratum_sample_sizes, sampled_comment_ids, sorting_type, deadline):
+        """(Helper method)\n
+        Draw the comments of one round from every submission that we are still sampling from (each
+        one on its own, so that no submission is left out), and add their weights to their strata.
+        Some of the drawn comments were sampled before and are dropped, so we draw more comments
+        of a submission than we need. We stop scoring comments once we are past the deadline."""
+
+        number_of_comments_to_draw = {}
+        for submission_id, sample_size in stratum_sample_sizes.items():
+            population_size = strata[submission_id]['population_size']
+            number_of_comments_left = population_size - len(strata[submission_id]['total_weights'])
+            number_of_comments_to_draw[submission_id] = \
+                min(population_size, math.ceil(sample_size * population_size / number_of_comments_left))
+
+        sampled_comment_objects = self.__comment_preprocessor.get_sampled_comment_objects(
+            number_of_comments_to_draw, sorting_type=sorting_type)
+
+        for submission_id, sampled_comments in sampled_comment_objects.items():
+            for comment in sampled_comments:
+                if time.monotonic() >= deadline:
+                    return
+
+                if comment['_id'] in sampled_comment_ids or stratum_sample_sizes[submission_id] == 0:
+                    continue
+                stratum_sample_sizes[submission_id] -= 1
+                sampled_comment_ids.add(comment['_id'])
+
+                analysis_results_of_comment = self.__comment_sentiment_analyzer.polarity_scores(
+                    self.__comment_preprocessor.get_preprocessed_comment(
+                        self.__comment_preprocessor.get_comment_body(comment)))
+                classification = get_comment_classification(analysis_results_of_comment)
+
+                positive_weight = 0
+                total_weight = 0
+                if classification == "Positive":
+                    positive_weight = analysis_results_of_comment['compound']
+                    total_weight = positive_weight
+                elif classification == "Negative":
+                    total_weight = abs(analysis_results_of_comment['compound'])
+
+                strata[submission_id]['positive_weights'].append(positive_weight)
+                strata[submission_id]['total_weights'].append(total_weight)
+
+
+    def __get_estimated_totals(self, strata):
+        """(Helper method)\n
+        Return the estimated totals of the positive weights and of all weights over every comment
+        of the strata that we have sampled from."""
+
+        estimated_positive_total = 0
+        estimated_total = 0
+        for stratum in strata.values():
+            sample_size = len(stratum['total_weights'])
+            if sample_size:
+                estimated_positive_total += stratum['population_size'] * \
+                    sum(stratum['positive_weights']) / sample_size
+                estimated_total += stratum['population_size'] * \
+                    sum(stratum['total_weights']) / sample_size
+
+        return estimated_positive_total, estimated_total
+
+
+    def __is_every_stratum_sampled(self, strata):
+        """(Helper method)\n
+        Return True if we have at least 2 sampled comments of every submission (or all of its
+        comments), so that the variance of every stratum can be estimated."""
+
+        return all(len(stratum['total_weights']) >= min(2, stratum['population_size'])
+                   for stratum in strata.values())
+
+
+    def __get_margin_of_error(self, strata, positivity_estimate, estimated_total, z_score):
+        """(Helper method)\n
+        Return the margin of error of the positivity estimate, using the linearized variance of
+        the ratio with the stratified variance of the residuals. Submissions with only one
+        sampled comment use the variance of the residuals of every sampled comment instead.
+
+        Submissions that we have no sampled comments of (when we ran out of time) are left out of
+        the estimate, so the margin of error is widened by the share of comments that they hold."""
+
+        residuals_of_strata = [(stratum['population_size'],
+                                [positive_weight - positivity_estimate * total_weight
+                                 for positive_weight, total_weight in zip(stratum['positive_weights'],
+                                                                          stratum['total_weights'])])
+                               for stratum in strata.values() if stratum['total_weights']]
+
+        every_residual = [residual for _, residuals in residuals_of_strata for residual in residuals]
+        pooled_residual_variance = variance(every_residual) if len(every_residual) > 1 else 0
+
+        variance_of_estimate = 0
+        for population_size, residuals in residuals_of_strata:
+            sample_size = len(residuals)
+            residual_variance = variance(residuals) if sample_size > 1 else pooled_residual_variance
+
+            # The finite population correction, we sample without replacement.
+            variance_of_estimate += population_size ** 2 * \
+                (1 - sample_size / population_size) * residual_variance / sample_size
+
+        number_of_comments_in_unsampled_strata = sum(stratum['population_size']
+                                                     for stratum in strata.values()
+                                                     if not stratum['total_weights'])
+        total_population_size = sum(stratum['population_size'] for stratum in strata.values())
+
+        return z_score * math.sqrt(variance_of_estimate) / estimated_total + \
+            number_of_comments_in_unsampled_strata / total_population_size
+
+
+    def __estimate_analysis_results(self, submission_ids, sorting_type, confidence_level,
+                                    target_margin_of_error, max_seconds_to_analyze, sample_batch_size):
+        """(Helper method)\n
+        Estimate the positivity and negativity of the comments of the given submissions by
+        analyzing a stratified random sample of them (every submission is a stratum).
+
+        We keep drawing batches of comments (allocated to each submission proportionally to the
+        amount of comments that it has) until the margin of error of our estimate is within the
+        target and we have at least 2 comments of every submission, we run out of time, or we have
+        analyzed every comment.
+
+        The positivity is a ratio estimate of the sum of positive compound scores over the sum of
+        the absolute compound scores of positive and negative comments (the same weighting that
+        analyze_submission uses), pooled over every comment. The variance is estimated with the
+        linearization (delta) method, so the confidence interval is a normal approximation.
+
+        Arguments:\n
+            submission_ids {list} -- The ids of the submissions that we are sampling comments from.
+            sorting_type {str or None} -- The sorting type of the comments that we are sampling.
+            confidence_level {float} -- Confidence level of the reported intervals, e.g. 0.95.
+            target_margin_of_error {float} -- We stop sampling once the margin of error is this low.
+            max_seconds_to_analyze {float} -- We stop sampling after this many seconds.
+            sample_batch_size {int} -- The amount of comments that we sample per round.
+
+        Returns:\n
+            dict -- Dictionary containing the estimates, see estimate_subreddit_analysis_results()."""
+
+        deadline = time.monotonic() + max_seconds_to_analyze
+
+        strata = self.__get_strata(submission_ids, sorting_type)
+        total_population_size = sum(stratum['population_size'] for stratum in strata.values())
+        z_score = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+
+        # A comment can be drawn again in a later round, this is how we know to drop it.
+        sampled_comment_ids = set()
+
+        positivity_estimate = 0
+        estimated_total = 0
+        margin_of_error = 1
+
+        while len(sampled_comment_ids) < total_population_size and time.monotonic() < deadline:
+            self.__sample_strata(strata,
+                                 self.__get_stratum_sample_sizes(strata, sample_batch_size,
+                                                                 total_population_size),
+                                 sampled_comment_ids, sorting_type, deadline)
+
+            estimated_positive_total, estimated_total = self.__get_estimated_totals(strata)
+            if estimated_total > 0:
+                positivity_estimate = estimated_positive_total / estimated_total
+                margin_of_error = self.__get_margin_of_error(strata, positivity_estimate,
+                                                             estimated_total, z_score)
+                if margin_of_error <= target_margin_of_error and self.__is_every_stratum_sampled(strata):
+                    break
+
+        # Nothing positive or negative was found (or there was nothing to find).
+        if estimated_total == 0:
+            positivity_estimate = 0
+            negativity_estimate = 0
+        else:
+            negativity_estimate = 1 - positivity_estimate
+
+        positive_confidence_interval = (max(0, positivity_estimate - margin_of_error),
+                                        min(1, positivity_estimate + margin_of_error))
+        negative_confidence_interval = (max(0, negativity_estimate - margin_of_error),
+                                        min(1, negativity_estimate + margin_of_error))
+
+        return {'positive': positivity_estimate,
+                'negative': negativity_estimate,
+                'positive_confidence_interval': positive_confidence_interval,
+                'negative_confidence_interval': negative_confidence_interval,
+                'margin_of_error': margin_of_error,
+                'confidence_level': confidence_level,
+                'number_of_comments_sampled': len(sampled_comment_ids),
+                'number_of_comments_in_population': total_population_size}
+
+
+    def __check_estimation_paramters_are_valid_raise_exception(self, confidence_level,
+                                                               target_margin_of_error,
+                                                               max_seconds_to_analyze,
+                                                               sample_batch_size):
+        """(Helper method)\n
+        Make sure that the paramters passed to our estimation methods are valid.
+
+        Raises:\n
+            ValueError: When confidence_level is not between 0 and 1.\n
+            ValueError: When target_margin_of_error is not between 0 and 1.\n
+            ValueError: When max_seconds_to_analyze is not positive.\n
+            ValueError: When sample_batch_size is not positive."""
+
+        if not 0 < confidence_level < 1:
+            raise ValueError('confidence_level must be between 0 and 1.')
+
+        if not 0 < target_margin_of_error < 1:
+            raise ValueError('target_margin_of_error must be between 0 and 1.')
+
+        if max_seconds_to_analyze <= 0:
+            raise ValueError('max_seconds_to_analyze must be a positive number.')
+
+        if sample_batch_size <= 0:
+            raise ValueError('sample_batch_size must be a positive number.')
+
 
     # PUBLIC INTERFACE_________________________________________________________________________________
 
 
     def analyze_submission(self, submission_id, sorting_type=None,
                            display_all_comment_results=False,
-                           max_number_of_comments_to_analyze=0):
+                           max_number_of_comments_to_analyze=0,
+                           analysis_stats=None,
+                           duplicate_handling=None):
         """Returns a dictionary containing the positivity and negativity of a submission.
 
         Arguments:\n
@@ -112,7 +515,13 @@ class SubredditAnalyzer():
             max_number_of_comments_to_analyze {int} -- This is the max amount of comments that we want to
                                                        analyze for a given submission.
                                                        A value of 0 means that we will collect all comments.
-                                                       (default: {0})
+                                                       (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis. (default: {None})\n
+            duplicate_handling {str} -- 'collapse' only analyzes one comment of every cluster of near
+                                        duplicate comments (bot replies, copypasta), 'exclude' leaves
+                                        every comment that has a near duplicate out. None analyzes
+                                        every comment. (default: {None})
 
         Returns:\n
             dict -- A dictionary in the form of {'positive': int_value, 'negative', int value}"""
@@ -121,83 +530,96 @@ class SubredditAnalyzer():
         # Passed in are valid, otherwise we need to trigger an error, before doing
         # a bunch of time costly analysis.
         self.__check_analysis_paramters_are_valid_raise_exception(sorting_type,
-                                                                  max_number_of_comments_to_analyze)
-
-        preprocessed_submission_comments = \
-            self.__comment_preprocessor.get_preprocessed_comments(submission_id,
                                                                   max_number_of_comments_to_analyze,
-                                                                  sorting_type=sorting_type)
-
-        # Used to sum up and get averages for positive and negative comments.
-        positive_comment_results = []
-        negative_comment_results = []
-
-        for comment in preprocessed_submission_comments:
-            analysis_results_of_comment = \
-                self.__comment_sentiment_analyzer.polarity_scores(comment)
-
-            # Comment might not be positive or negative, so by default it is ignored.
-            # It will be set later if we find the comment to be positive or negative.
-            classification_to_print_out = "Ignored"
-
-            if(             
-                # Concluded comment is positive.
-                analysis_results_of_comment['compound'] >= 0.05 or \
-                analysis_results_of_comment['neg'] == 0 and analysis_results_of_comment['pos'] > 0
-            ):
-                positive_comment_results.append(analysis_results_of_comment['compound'])
-                classification_to_print_out = "Positive"
-            elif(
-                # Concluded comment is negative.
-                analysis_results_of_comment['compound'] <= -0.05 or \
-                analysis_results_of_comment['pos'] == 0 and analysis_results_of_comment['neg'] > 0
-            ):
-                negative_comment_results.append(abs(analysis_results_of_comment['compound']))
-                classification_to_print_out = "Negative"
-
-            if display_all_comment_results:
-                # We want the user to know what subreddit a submission is from, since
-                # we are running analysis on it and wanna make a neat little image.
-                try:
-                    subreddit_name = self.__reddit_collection.find_one({'submission': submission_id}
-                                                                       )['subreddit_name']
-                except CursorNotFound:
-                    # Might not have a subreddit_name as a field for this one, so we
-                    # Need a default label for this sort of situation.
-                    subreddit_name = "NONE"
-
-                # Now we can actually...show the results the user wants to see.
-                print("\nSubreddit Name:", subreddit_name)
-                print("Comment:", comment)
-                print(f"Positivity Rating: {analysis_results_of_comment['pos']}")
-                print(f"Negativity Results: {analysis_results_of_comment['neg']}")
-                print(f"Neutral results: {analysis_results_of_comment['neu']}")
-                print("Classification:", classification_to_print_out)
-
-        # Need this to later get percentages of negativity and positivity (math stuffs).
-        total_sum_of_result_scores = sum(positive_comment_results + negative_comment_results)
-
-        # This implies we have not analyzed anthing.
-        if total_sum_of_result_scores == 0:
-            return {'positive': 0, 'negative': 0}
+                                                                  duplicate_handling_option=\
+                                                                      duplicate_handling)
+
+        if analysis_stats:
+            analysis_stats.start_profiling()
+        try:
+            return self.__analyze_submission(submission_id, sorting_type, display_all_comment_results,
+                                             max_number_of_comments_to_analyze, analysis_stats,
+                                             duplicate_handling)
+        finally:
+            if analysis_stats:
+                analysis_stats.stop_profiling()
+
+
+    def __display_comment_analysis_results(self, submission_id, preprocessed_comments,
+                                           analysis_results_of_comments):
+        """(Helper method)\n
+        Print the analysis results of every comment of a submission."""
+
+        # We want the user to know what subreddit a submission is from, since
+        # we are running analysis on it and wanna make a neat little image.
+        try:
+            subreddit_name = self.__reddit_collection.find_one({'submission': submission_id}
+                                                               )['subreddit_name']
+        except CursorNotFound:
+            # Might not have a subreddit_name as a field for this one, so we
+            # Need a default label for this sort of situation.
+            subreddit_name = "NONE"
+
+        for comment, analysis_results_of_comment in zip(preprocessed_comments,
+                                                        analysis_results_of_comments):
+            # Now we can actually...show the results the user wants to see.
+            print("\nSubreddit Name:", subreddit_name)
+            print("Comment:", comment)
+            print(f"Positivity Rating: {analysis_results_of_comment['pos']}")
+            print(f"Negativity Results: {analysis_results_of_comment['neg']}")
+            print(f"Neutral results: {analysis_results_of_comment['neu']}")
+            print("Classification:", get_comment_classification(analysis_results_of_comment))
+
+
+    def __analyze_submission(self, submission_id, sorting_type, display_all_comment_results,
+                             max_number_of_comments_to_analyze, analysis_stats, duplicate_handling=None):
+        """(Helper method)\n
+        Does the work of analyze_submission(), once the paramters have been checked."""
+
+        # Near duplicates are left out by mongo, so they never count towards the comment limit.
+        comment_ids_to_skip = None
+        if duplicate_handling:
+            with measure_stage(analysis_stats, 'mongo_query', submission_id):
+                comment_ids_to_skip = self.__get_near_duplicate_index().get_comment_ids_to_skip(
+                    [submission_id], duplicate_handling)
 
-        average_positivity = sum(positive_comment_results) / total_sum_of_result_scores
-        average_negativity = sum(negative_comment_results) / total_sum_of_result_scores
+        preprocessed_submission_comments = self.__comment_preprocessor.get_preprocessed_comments(
+            submission_id, max_number_of_comments_to_analyze, sorting_type=sorting_type,
+            analysis_stats=analysis_stats, comment_ids_to_skip=comment_ids_to_skip)
+
+        # The whole loop is timed at once, timing every comment would skew what we are measuring.
+        with measure_stage(analysis_stats, 'vader_scoring', submission_id):
+            analysis_results_of_comments = [self.__comment_sentiment_analyzer.polarity_scores(comment)
+                                            for comment in preprocessed_submission_comments]
+
+        if analysis_stats:
+            analysis_stats.add_item_count('vader_scoring', len(preprocessed_submission_comments),
+                                          submission_id)
+
+        if display_all_comment_results:
+            self.__display_comment_analysis_results(submission_id, preprocessed_submission_comments,
+                                                    analysis_results_of_comments)
+
+        with measure_stage(analysis_stats, 'aggregation', submission_id):
+            analysis_results_of_submission = \
+                get_submission_analysis_results(analysis_results_of_comments)
 
         # They also wanna see the final results of scoring (even tho they are returned).
         if display_all_comment_results:
             print(f'\nResults of all comments for submission: "{submission_id}"')
-            print("Average Positivity: {:.2f}%".format(average_positivity * 100))
-            print("Average Negativity: {:.2f}%".format(average_negativity * 100))
+            print("Average Positivity: {:.2f}%".format(analysis_results_of_submission['positive'] * 100))
+            print("Average Negativity: {:.2f}%".format(analysis_results_of_submission['negative'] * 100))
 
-        return {'positive': average_positivity, 'negative': average_negativity}
+        return analysis_results_of_submission
 
 
     def analyze_subreddit(self, subreddit_name, sorting_type=None,
                           display_all_comment_results=False,
                           display_all_submission_results=False,
                           max_number_of_comments_to_analyze=0,
-                          max_number_of_submissions_to_analyze=0):
+                          max_number_of_submissions_to_analyze=0,
+                          analysis_stats=None,
+                          duplicate_handling=None):
         """Return a dictionary containing the positive and negative results of a given subreddit.
 
         Arguments:\n
@@ -216,6 +638,13 @@ class SubredditAnalyzer():
             max_number_of_submissions_to_analyze {int} -- The max number of submissions that we are
                                                           going to analyze for positivity and
                                                           negativity. (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis, in total and for
+                                              each submission. (default: {None})\n
+            duplicate_handling {str} -- 'collapse' only analyzes one comment of every cluster of near
+                                        duplicate comments, 'exclude' leaves every comment that has a
+                                        near duplicate out. None analyzes every comment.
+                                        (default: {None})
 
         Returns:\n
             dict -- Dictionary containing the positivity and negativity of a given subreddit.
@@ -226,20 +655,33 @@ class SubredditAnalyzer():
         # a bunch of time costly analysis.
         self.__check_analysis_paramters_are_valid_raise_exception(sorting_type,
                                                                   max_number_of_comments_to_analyze,
-                                                                  max_number_of_submissions_to_analyze)
+                                                                  max_number_of_submissions_to_analyze,
+                                                                  duplicate_handling)
+
+        if analysis_stats:
+            analysis_stats.start_profiling()
+        try:
+            return self.__analyze_subreddit(subreddit_name, sorting_type, display_all_comment_results,
+                                            display_all_submission_results,
+                                            max_number_of_comments_to_analyze,
+                                            max_number_of_submissions_to_analyze, analysis_stats,
+                                            duplicate_handling)
+        finally:
+            if analysis_stats:
+                analysis_stats.stop_profiling()
+
+
+    def __analyze_subreddit(self, subreddit_name, sorting_type, display_all_comment_results,
+                            display_all_submission_results, max_number_of_comments_to_analyze,
+                            max_number_of_submissions_to_analyze, analysis_stats,
+                            duplicate_handling=None):
+        """(Helper method)\n
+        Does the work of analyze_subreddit(), once the paramters have been checked."""
 
         analysis_start_time = datetime.datetime.now()
 
-        subreddit_submission_ids = []
-        if sorting_type:
-            # User only wants to get posts of given sorting type.
-            subreddit_submission_ids = self.__reddit_collection.find({'subreddit_name': subreddit_name,
-                                                                      'sorting_type': sorting_type}
-                                                                     ).distinct('submission')
-        else:
-            # User did NOT give us a sorting type, so just grab everything.
-            subreddit_submission_ids = self.__reddit_collection.find({'subreddit_name': subreddit_name}
-                                                                     ).distinct('submission')
+        with measure_stage(analysis_stats, 'mongo_query'):
+            subreddit_submission_ids = self.__get_subreddit_submission_ids(subreddit_name, sorting_type)
 
         # No posts found in subreddit, there is not point in analyzing, just return now.
         if len(subreddit_submission_ids) == 0:
@@ -267,10 +709,13 @@ class SubredditAnalyzer():
                 self.analyze_submission(submission_id, sorting_type=sorting_type,
                                         display_all_comment_results=display_all_comment_results,
                                         max_number_of_comments_to_analyze=\
-                                            max_number_of_comments_to_analyze)
+                                            max_number_of_comments_to_analyze,
+                                        analysis_stats=analysis_stats,
+                                        duplicate_handling=duplicate_handling)
 
-            average_results_for_subreddit['positive'] += analysis_results_of_submission['positive']
-            average_results_for_subreddit['negative'] += analysis_results_of_submission['negative']
+            with measure_stage(analysis_stats, 'aggregation', submission_id):
+                average_results_for_subreddit['positive'] += analysis_results_of_submission['positive']
+                average_results_for_subreddit['negative'] += analysis_results_of_submission['negative']
 
             # They want to see the rating for each submission post over time.
             if display_all_submission_results:
@@ -281,16 +726,17 @@ class SubredditAnalyzer():
 
         analysis_end_time = datetime.datetime.now()
 
-        # We can use this as our divisor in following calculations, so that we can
-        # get average score for positivity and the average score for negativity.
-        total_sum_of_all_submission_scores = average_results_for_subreddit['positive'] +\
-                                             average_results_for_subreddit['negative']
+        with measure_stage(analysis_stats, 'aggregation'):
+            # We can use this as our divisor in following calculations, so that we can
+            # get average score for positivity and the average score for negativity.
+            total_sum_of_all_submission_scores = average_results_for_subreddit['positive'] +\
+                                                 average_results_for_subreddit['negative']
 
-        # We don't want to divide by zero.
-        # We would get to this point if all results were evaluated as neutral in an odd case.
-        if total_sum_of_all_submission_scores != 0:
-            average_results_for_subreddit['positive'] /= total_sum_of_all_submission_scores
-            average_results_for_subreddit['negative'] /= total_sum_of_all_submission_scores
+            # We don't want to divide by zero.
+            # We would get to this point if all results were evaluated as neutral in an odd case.
+            if total_sum_of_all_submission_scores != 0:
+                average_results_for_subreddit['positive'] /= total_sum_of_all_submission_scores
+                average_results_for_subreddit['negative'] /= total_sum_of_all_submission_scores
 
         # They wanna show the averages in the method.
         if display_all_submission_results:
@@ -302,9 +748,189 @@ class SubredditAnalyzer():
         return average_results_for_subreddit
 
 
+    def get_subreddit_submission_ids(self, subreddit_name, sorting_type=None,
+                                     max_number_of_submissions=0):
+        """Return the ids of the submissions of a subreddit that analyze_subreddit() would analyze.
+        Subreddits in the submission catalog are listed newest submissions first.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the submissions of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            max_number_of_submissions {int} -- The max amount of ids that we return.
+                                               0 means every submission. (default: {0})
+
+        Returns:\n
+            list -- List of submission ids (str)."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type,
+                                                                  max_number_of_submissions_option=\
+                                                                      max_number_of_submissions)
+
+        subreddit_submission_ids = self.__get_subreddit_submission_ids(subreddit_name, sorting_type)
+        if max_number_of_submissions:
+            return subreddit_submission_ids[: max_number_of_submissions]
+        return subreddit_submission_ids
+
+
+    def get_subreddit_submissions(self, subreddit_name, sorting_type=None, sorted_by='created_at',
+                                  page_number=0, page_size=50):
+        """Return one page of the submissions that we have comments of in a subreddit, from the
+        submission catalog.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the submissions of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            sorted_by {str} -- 'created_at', 'comment_count', or 'last_fetched_at'. The biggest
+                               values come first. (default: {'created_at'})\n
+            page_number {int} -- The page that we return, starting at 0. (default: {0})\n
+            page_size {int} -- The amount of submissions in a page. (default: {50})
+
+        Returns:\n
+            list -- List of {'_id', 'subreddit_name', 'sorting_types', 'comment_count',
+                    'created_at', 'last_fetched_at'} dicts."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+        return self.__get_submission_catalog().get_submissions(subreddit_name, sorting_type,
+                                                               sorted_by=sorted_by,
+                                                               page_number=page_number,
+                                                               page_size=page_size)
+
+
+    def analyze_submissions(self, submission_ids, sorting_type=None):
+        """Return the positivity and negativity of many submissions at once. The comments of every
+        submission are pulled with a single query, which saves a round trip per submission.
+        The results are the same as calling analyze_submission() on each submission.
+
+        Arguments:\n
+            submission_ids {list} -- The reddit submission ids of the submissions you want to analyze.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})
+
+        Returns:\n
+            dict -- Maps every submission id to a dict in the form of
+                    {'positive': float, 'negative': float}"""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+
+        preprocessed_comments_of_submissions = \
+            self.__comment_preprocessor.get_preprocessed_comments_of_submissions(
+                submission_ids, sorting_type=sorting_type)
+
+        analysis_results_of_submissions = {}
+        for submission_id, preprocessed_comments in preprocessed_comments_of_submissions.items():
+            analysis_results_of_submissions[submission_id] = get_submission_analysis_results(
+                [self.__comment_sentiment_analyzer.polarity_scores(comment)
+                 for comment in preprocessed_comments])
+
+        return analysis_results_of_submissions
+
+
+    def estimate_submission_analysis_results(self, submission_id, sorting_type=None,
+                                             confidence_level=0.95, target_margin_of_error=0.02,
+                                             max_seconds_to_analyze=10, sample_batch_size=200):
+        """Return an estimate of the positivity and negativity of a submission, which is computed
+        from a random sample of its comments rather than every comment.
+
+        Arguments:\n
+            submission_id {str} -- The reddit submission id of the submission you want to analyze.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            confidence_level {float} -- Confidence level of the returned intervals. (default: {0.95})\n
+            target_margin_of_error {float} -- We stop sampling once the margin of error of the estimate
+                                              is at most this. (default: {0.02})\n
+            max_seconds_to_analyze {float} -- We stop sampling after this many seconds, even if the
+                                              target margin of error was not reached. (default: {10})\n
+            sample_batch_size {int} -- The amount of comments we sample per round. (default: {200})
+
+        Returns:\n
+            dict -- See estimate_subreddit_analysis_results()."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+        self.__check_estimation_paramters_are_valid_raise_exception(confidence_level,
+                                                                    target_margin_of_error,
+                                                                    max_seconds_to_analyze,
+                                                                    sample_batch_size)
+
+        return self.__estimate_analysis_results([submission_id], sorting_type, confidence_level,
+                                                target_margin_of_error, max_seconds_to_analyze,
+                                                sample_batch_size)
+
+
+    def estimate_subreddit_analysis_results(self, subreddit_name, sorting_type=None,
+                                            confidence_level=0.95, target_margin_of_error=0.02,
+                                            max_seconds_to_analyze=10, sample_batch_size=200,
+                                            display_results=False):
+        """Return an estimate of the positivity and negativity of a subreddit along with confidence
+        intervals. Instead of analyzing every comment (or the first N of them, which is biased), we
+        analyze a stratified random sample with every submission in the subreddit as a stratum.
+
+        Unlike analyze_subreddit(), every comment has the same weight, no matter how many comments
+        its submission has.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want to analyze.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            confidence_level {float} -- Confidence level of the returned intervals. (default: {0.95})\n
+            target_margin_of_error {float} -- We stop sampling once the margin of error of the estimate
+                                              is at most this. (default: {0.02})\n
+            max_seconds_to_analyze {float} -- We stop sampling after this many seconds, even if the
+                                              target margin of error was not reached. (default: {10})\n
+            sample_batch_size {int} -- The amount of comments we sample per round. (default: {200})\n
+            display_results {bool} -- True if the user wants the estimate printed. (default: {False})
+
+        Returns:\n
+            dict -- Dictionary in the form of
+                    {'positive': float, 'negative': float,
+                     'positive_confidence_interval': (float, float),
+                     'negative_confidence_interval': (float, float),
+                     'margin_of_error': float, 'confidence_level': float,
+                     'number_of_comments_sampled': int, 'number_of_comments_in_population': int}"""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+        self.__check_estimation_paramters_are_valid_raise_exception(confidence_level,
+                                                                    target_margin_of_error,
+                                                                    max_seconds_to_analyze,
+                                                                    sample_batch_size)
+
+        subreddit_submission_ids = self.__get_subreddit_submission_ids(subreddit_name, sorting_type)
+
+        estimated_results = self.__estimate_analysis_results(subreddit_submission_ids, sorting_type,
+                                                             confidence_level, target_margin_of_error,
+                                                             max_seconds_to_analyze, sample_batch_size)
+
+        if display_results:
+            print(f'\nEstimated results of comments for : "{subreddit_name}"')
+            print("Estimated positivity: {:.2f}% ({:.2f}% - {:.2f}%)".format(
+                estimated_results['positive'] * 100,
+                estimated_results['positive_confidence_interval'][0] * 100,
+                estimated_results['positive_confidence_interval'][1] * 100))
+            print("Estimated negativity: {:.2f}% ({:.2f}% - {:.2f}%)".format(
+                estimated_results['negative'] * 100,
+                estimated_results['negative_confidence_interval'][0] * 100,
+                estimated_results['negative_confidence_interval'][1] * 100))
+            print(f"Comments analyzed: {estimated_results['number_of_comments_sampled']} of "
+                  f"{estimated_results['number_of_comments_in_population']}")
+
+        return estimated_results
+
+
     def get_most_positive_subreddit_analysis_results(self, list_of_subreddits, sorting_type=None,
                                                      max_number_of_comments_to_analyze=0,
-                                                     max_number_submissions_to_analyze=0):
+                                                     max_number_submissions_to_analyze=0,
+                                                     analysis_stats=None):
         """Return a dict containing the subreddit with the most positive results, the positivity level,
            of the result, the negativity level of the results.
 
@@ -319,31 +945,34 @@ class SubredditAnalyzer():
                                                        analyze. 0 means we will query everything. (default: {0})\n
             max_number_submissions_to_analyze {int} -- The max number of submissions that we will analyze.
                                                        0 Means we will query everything. (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis. (default: {None})\n
 
         Returns:\n
             dict -- dict in the form {'subreddit': str, 'positive': int, 'negative': int}."""
 
-        most_positive_subreddit = ""
-        most_positive_subreddit = {}
-        
+        # Every score is at least 0, so the first subreddit we analyze always replaces this.
+        most_positive_subreddit = {'subreddit': None, 'positive': -1, 'negative': -1}
+
         for subreddit in list_of_subreddits:
             analysis_result = self.analyze_subreddit(subreddit, max_number_of_comments_to_analyze=\
                                                                     max_number_of_comments_to_analyze,
                                                     max_number_of_submissions_to_analyze=\
                                                         max_number_submissions_to_analyze,
-                                                    sorting_type=sorting_type)
+                                                    sorting_type=sorting_type,
+                                                    analysis_stats=analysis_stats)
 
             if analysis_result['positive'] > most_positive_subreddit['positive']:
                 most_positive_subreddit = analysis_result
-                most_positive_score = analysis_result['positive']
+                most_positive_subreddit['subreddit'] = subreddit
 
-        most_positive_score['subreddit'] = subreddit
-        return most_positive_score
+        return most_positive_subreddit
 
 
     def get_most_negative_subreddit_analysis_results(self, list_of_subreddits, sorting_type=None,
                                                      max_number_of_comments_to_analyze=0,
-                                                     max_number_submissions_to_analyze=0):
+                                                     max_number_submissions_to_analyze=0,
+                                                     analysis_stats=None):
         """Return a dict containing the subreddit with the most negative results, the positivity level,
            of the result, the negativity level of the results.
 
@@ -358,33 +987,181 @@ class SubredditAnalyzer():
                                                        analyze. 0 means we will query everything. (default: {0})\n
             max_number_submissions_to_analyze {int} -- The max number of submissions that we will analyze.
                                                        0 Means we will query everything. (default: {0})\n
+            analysis_stats {AnalysisStats} -- If given, it is filled with the time and item counts
+                                              of every stage of the analysis. (default: {None})\n
 
         Returns:\n
             dict -- dict in the form {'subreddit': str, 'positive': int, 'negative': int}."""
 
-        most_negative_subreddit = ""
-        most_negative_subreddit = {}
-        
+        # Every score is at least 0, so the first subreddit we analyze always replaces this.
+        most_negative_subreddit = {'subreddit': None, 'positive': -1, 'negative': -1}
+
         for subreddit in list_of_subreddits:
             analysis_result = self.analyze_subreddit(subreddit, max_number_of_comments_to_analyze=\
                                                                     max_number_of_comments_to_analyze,
                                                     max_number_of_submissions_to_analyze=\
                                                         max_number_submissions_to_analyze,
-                                                    sorting_type=sorting_type)
+                                                    sorting_type=sorting_type,
+                                                    analysis_stats=analysis_stats)
 
             if analysis_result['negative'] > most_negative_subreddit['negative']:
                 most_negative_subreddit = analysis_result
-                most_negative_score = analysis_result['negative']
+                most_negative_subreddit['subreddit'] = subreddit
+
+        return most_negative_subreddit
+
 
-        most_positive_score['subreddit'] = subreddit
-        return most_negative_score
+    def __get_reply_graph(self, comments_query):
+        """(Helper method)\n
+        Return a ReplyGraph of every comment that matches a mongo query, where the sentiment of
+        each comment is its vader compound score."""
+
+        # numpy is only needed for reply graphs, so we only import it once one is asked for.
+        from .reply_graph import ReplyGraph
+
+        comment_ids = []
+        parent_ids = []
+        sentiments = []
+        for comment in self.__reddit_collection.find(comments_query, {'parent_id': 1, 'body': 1}):
+            preprocessed_comment = self.__comment_preprocessor.get_preprocessed_comment(
+                self.__comment_preprocessor.get_comment_body(comment))
+
+            comment_ids.append(comment['_id'])
+            parent_ids.append(comment.get('parent_id'))
+            sentiments.append(
+                self.__comment_sentiment_analyzer.polarity_scores(preprocessed_comment)['compound'])
 
+        return ReplyGraph(comment_ids, parent_ids, sentiments)
 
-    # Later, once I implement word bubble and freq analysis.
-    def show_hotest_submission_topics(self, submission_id):
-        pass
 
+    def __display_hotest_topics(self, hotest_topics, topic_counter, title):
+        """(Helper method)\n
+        Print out the hottest topics that were found, along with their counts.
+
+        Arguments:\n
+            hotest_topics {list} -- List of (topic, count) tuples.
+            topic_counter {HeavyHitterTopicCounter} -- The counter that found the topics.
+            title {str} -- What the topics are for, e.g. 'submission: "ca8q81"'."""
+
+        print(f'\nHottest topics of {title}')
+        for topic, count in hotest_topics:
+            print(f'{topic}: {count}')
+        print(f'(Counts may be under by at most {topic_counter.get_max_count_error()})')
+
+
+    def show_hotest_submission_topics(self, submission_id, sorting_type=None, number_of_topics=10,
+                                      max_number_of_counters=1000, include_bigrams=True,
+                                      display_topics=False):
+        """Return the hottest topics (most frequent stemmed words and bigrams) of a submission.
+        The comments are streamed through a HeavyHitterTopicCounter, so we only pass over them once
+        and memory does not grow with the amount of different words.
+
+        Arguments:\n
+            submission_id {str} -- The reddit submission id of the submission you want the topics of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            number_of_topics {int} -- The amount of topics that we return. (default: {10})\n
+            max_number_of_counters {int} -- The max amount of topics we keep counts for at once.
+                                            Must be larger than number_of_topics. (default: {1000})\n
+            include_bigrams {bool} -- True if pairs of words count as topics. (default: {True})\n
+            display_topics {bool} -- True if the user wants the topics printed out. (default: {False})
+
+        Returns:\n
+            list -- List of (topic, count) tuples, from the hottest topic to the coldest."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+
+        topic_counter = HeavyHitterTopicCounter(max_number_of_counters, include_bigrams=include_bigrams)
+        for comment in self.__comment_preprocessor.iterate_preprocessed_comments(
+                submission_id, sorting_type=sorting_type):
+            topic_counter.add_comment(comment)
+
+        hotest_topics = topic_counter.get_hottest_topics(number_of_topics)
+
+        if display_topics:
+            self.__display_hotest_topics(hotest_topics, topic_counter, f'submission: "{submission_id}"')
+
+        return hotest_topics
+
+
+    def show_hotest_subreddit_topics(self, subreddit_name, sorting_type=None, number_of_topics=10,
+                                     max_number_of_counters=1000, include_bigrams=True,
+                                     display_topics=False):
+        """Return the hottest topics (most frequent stemmed words and bigrams) of a subreddit.
+        The comments are streamed through a HeavyHitterTopicCounter, so we only pass over them once
+        and memory does not grow with the amount of different words.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the topics of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})\n
+            number_of_topics {int} -- The amount of topics that we return. (default: {10})\n
+            max_number_of_counters {int} -- The max amount of topics we keep counts for at once.
+                                            Must be larger than number_of_topics. (default: {1000})\n
+            include_bigrams {bool} -- True if pairs of words count as topics. (default: {True})\n
+            display_topics {bool} -- True if the user wants the topics printed out. (default: {False})
 
-    # Later, once I implement word bubble and freq analysis.
-    def show_hotest_subreddit_topics(self, subreddit_id):
-        pass
+        Returns:\n
+            list -- List of (topic, count) tuples, from the hottest topic to the coldest."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+
+        topic_counter = HeavyHitterTopicCounter(max_number_of_counters, include_bigrams=include_bigrams)
+        for comment in self.__comment_preprocessor.iterate_preprocessed_subreddit_comments(
+                subreddit_name, sorting_type=sorting_type):
+            topic_counter.add_comment(comment)
+
+        hotest_topics = topic_counter.get_hottest_topics(number_of_topics)
+
+        if display_topics:
+            self.__display_hotest_topics(hotest_topics, topic_counter, f'subreddit: "{subreddit_name}"')
+
+        return hotest_topics
+
+
+    def get_submission_reply_graph(self, submission_id, sorting_type=None):
+        """Return the reply graph of the comments of a submission. Every comment is scored once,
+        after that thread structure questions can be answered without going back to mongo.
+
+        Arguments:\n
+            submission_id {str} -- The reddit submission id of the submission.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})
+
+        Returns:\n
+            ReplyGraph -- The reply graph, with the compound score of each comment as its sentiment."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+
+        comments_query = {'submission': submission_id}
+        if sorting_type:
+            comments_query['sorting_type'] = sorting_type
+        return self.__get_reply_graph(comments_query)
+
+
+    def get_subreddit_reply_graph(self, subreddit_name, sorting_type=None):
+        """Return the reply graph of the comments of every submission in a subreddit.
+        Every top level comment is the root of its own thread.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the reply graph of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Must be one of the following: 'hot', 'top', 'new', or None.
+                                  (default: {None})
+
+        Returns:\n
+            ReplyGraph -- The reply graph, with the compound score of each comment as its sentiment."""
+
+        self.__check_analysis_paramters_are_valid_raise_exception(sorting_type)
+
+        comments_query = {'subreddit_name': subreddit_name}
+        if sorting_type:
+            comments_query['sorting_type'] = sorting_type
+        return self.__get_reply_graph(comments_query)
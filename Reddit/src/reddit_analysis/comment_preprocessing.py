@@ -7,11 +7,25 @@
 
 @package docstring
 """
-# For data preprocessing and frequency analysis.
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
-from nltk.tokenize import RegexpTokenizer
+# For measuring how long each stage of an analysis takes, if the user asks for it.
+from .analysis_stats import measure_stage
+
+# For tokenizing comments, this is exactly what nltk's RegexpTokenizer(r'\w+') does.
+import re
+
+# For timing the first batch of a cursor apart from the rest of it.
+import itertools
+
+# Stop words and word stems come out of a pickled cache, so nltk (which takes seconds to
+# import) is only imported when we see a word that we have never stemmed before.
+from .resource_cache import add_to_stem_cache, get_stem_cache, load_stop_words
+
+# Comment bodies may be stored compressed with one of our zstd dictionaries.
+from .body_compression import STORAGE_METADATA_COLLECTION_NAME, CommentBodyCodec
+
+
+"""Matches every word in a comment, punctuation is left out."""
+WORD_PATTERN = re.compile(r'\w+')
 
 
 class RedditPreprocessor():
@@ -20,17 +34,27 @@ class RedditPreprocessor():
     preprocess comments given to this object in general."""
 
 
-    def __init__(self, mongo_reddit_collection, language='english'):
+    def __init__(self, mongo_reddit_collection, language='english', body_codec=None):
         """ Constructs a RedditPreprocessor object.
         The user actually has the option to pass in whatever language
-        that they wanna analyze in. Example: english or spanish."""
+        that they wanna analyze in. Example: english or spanish.
+
+        body_codec is the CommentBodyCodec used to decompress comment bodies. When it is None,
+        one is made from the metadata collection next to mongo_reddit_collection the first time
+        that a compressed body is read."""
 
         """Since we are analyzing english, we will use a already created (and tested)
         set of stopwords that.
         Every word in here is a word that is not worth analyzing in a given comment.
         These are the kind of words that can make or break your analysis results."""
-        self.__stop_words = stopwords.words(language)
-        
+        self.__stop_words = load_stop_words(language)
+
+        """Maps words to their stems, shared with every other preprocessor in the process."""
+        self.__stem_cache = get_stem_cache()
+
+        """Porter stemmer from nltk, only created when a word is not in the stem cache."""
+        self.__stemmer = None
+
         """The MongDB collection that we will be pulling our reddit data from.
 
         The database must have the following fielding fields in it:
@@ -39,6 +63,36 @@ class RedditPreprocessor():
             subreddit, sorting_type, sorting_type"""
         self.__reddit_collection = mongo_reddit_collection
 
+        """Decompresses comment bodies that were stored compressed."""
+        self.__body_codec = body_codec
+
+
+    def get_comment_body(self, comment):
+        """Return the plain text body of a comment record, decompressing it if it was stored
+        compressed.
+
+        Arguments:\n
+            comment {dict} -- A comment record (with at least the body field) as stored in mongo.
+
+        Raises:\n
+            ValueError: When the body is compressed and this preprocessor has no collection or
+                        codec to find the dictionary with.
+
+        Returns:\n
+            str -- The plain text body of the comment."""
+
+        comment_body = comment['body']
+        if isinstance(comment_body, str):
+            return comment_body
+
+        if self.__body_codec is None:
+            if self.__reddit_collection is None:
+                raise ValueError('Error: a compressed comment body can not be read without a '
+                                 'collection or body_codec to load its dictionary from.')
+            self.__body_codec = CommentBodyCodec(
+                self.__reddit_collection.database[STORAGE_METADATA_COLLECTION_NAME])
+        return self.__body_codec.decompress_body(comment_body)
+
 
     def get_preprocessed_comment(self, comment):
         """Return a list of preprocessed reddit comments. Comments are ready for analysis.
@@ -54,8 +108,7 @@ class RedditPreprocessor():
         filtered_tokens_in_comment = []
 
         # We don't wanna have any punctuation in our comment.
-        tokenizer = RegexpTokenizer(r'\w+')
-        tokenized_comment = tokenizer.tokenize(comment)
+        tokenized_comment = WORD_PATTERN.findall(comment)
 
         # We do not care about words in our stop list, they just cause issues.
         for token in tokenized_comment:
@@ -64,8 +117,7 @@ class RedditPreprocessor():
 
         # Now we stem each token in the commen that we have.
         # E.g. Words like 'run' or 'running' just become their base form word 'run'
-        stemmer = PorterStemmer()
-        stemed_tokens = [stemmer.stem(token) for token in filtered_tokens_in_comment]
+        stemed_tokens = [self.__get_stem(token) for token in filtered_tokens_in_comment]
 
         # Now, we wanna put these tokens back into string form, so that we can easily
         # feed them into our sentiment analyzer later on.\
@@ -73,8 +125,29 @@ class RedditPreprocessor():
         return stemed_tokens_to_string_form
 
 
+    def __get_stem(self, word):
+        """Return the porter stem of a word, from the stem cache if we have stemmed it before.
+
+        Arguments:\n
+            word {str} -- The word that we want the stem of.
+
+        Returns:\n
+            str -- The stem of the word."""
+
+        if word in self.__stem_cache:
+            return self.__stem_cache[word]
+
+        if not self.__stemmer:
+            from nltk.stem import PorterStemmer
+            self.__stemmer = PorterStemmer()
+
+        stem = self.__stemmer.stem(word)
+        add_to_stem_cache(word, stem)
+        return stem
+
+
     def __get_comment_objects_for_submission(self, submission_id, number_of_comments_to_get,
-                                             sorting_type=None):
+                                             sorting_type=None, comment_ids_to_skip=None):
         """Return a list of comment objects. The type of sorting_type given will determine the
         type of comments that we are querying for. If no sorting type is None, then we grab any
         comments from the submission.
@@ -86,7 +159,8 @@ class RedditPreprocessor():
         Keyword Arguments:\n
             sorting_type {str} -- The type of comments that we are querying for.
                                   Either 'hot', 'top', or 'new'. If None is given, then we just pull
-                                  any comment without using sorting type. (default: {None})
+                                  any comment without using sorting type. (default: {None})\n
+            comment_ids_to_skip {set} -- Ids of comments that are left out. (default: {None})
 
         Raises:\n
             ValueError: If the user passes something that is not 'hot', 'new', 'top', or 'None'.
@@ -94,23 +168,42 @@ class RedditPreprocessor():
         Returns:\n
             Comment -- A reddit comment object from the praw API."""
         
+        comments_query = self.__get_submission_comments_query(submission_id, sorting_type)
+        if comment_ids_to_skip:
+            comments_query['_id'] = {'$nin': list(comment_ids_to_skip)}
+
+        return self.__reddit_collection.find(comments_query).limit(number_of_comments_to_get)
+
+
+    def __get_submission_comments_query(self, submission_id, sorting_type=None):
+        """Return the mongo query used to find the comments of a submission.
+
+        Arguments:\n
+            submission_id {str} -- The id of the reddit submission that we are pulling comments from.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Either 'hot', 'top', 'new', or None for any sorting type.
+                                  (default: {None})
+
+        Raises:\n
+            ValueError: If the user passes something that is not 'hot', 'new', 'top', or 'None'.
+
+        Returns:\n
+            dict -- The mongo query."""
+
         if sorting_type:
             if sorting_type not in ['hot', 'new', 'top']:
                 # The user might not have passed in a valid sorting type.
                 raise ValueError(f'Error calling get_preprocessed_comments:, "{sorting_type}"'
                                  'is not a valid option. Valid Options: "hot", "new, and "top"')
-            else:
-                return self.__reddit_collection.find({'submission': submission_id,
-                                                      'sorting_type': sorting_type}
-                                                    ).limit(number_of_comments_to_get)
+            return {'submission': submission_id, 'sorting_type': sorting_type}
 
         # No sorting type given, so we can just get the query.
-        return self.__reddit_collection.find({'submission': submission_id}
-                                            ).limit(number_of_comments_to_get)
+        return {'submission': submission_id}
 
 
     def get_preprocessed_comments(self, submission_id, number_of_comments_to_get,
-                                  sorting_type=None):
+                                  sorting_type=None, analysis_stats=None, comment_ids_to_skip=None):
         """Return a list of preprocessed comments, each comment is a str.
 
         Arguments:\n
@@ -120,36 +213,195 @@ class RedditPreprocessor():
         Keyword Arguments:\n
             sorting_type {str} -- The type of comments that we want to grab.
                                 Must be 'new', 'top', 'hot'. If None is given, we grab any type
-                                of comment. (default: {None})
+                                of comment. (default: {None})\n
+            analysis_stats {AnalysisStats} -- If given, the query, cursor iteration, and preprocessing
+                                              stages are measured into it. (default: {None})\n
+            comment_ids_to_skip {set} -- Ids of comments that are left out, e.g. near duplicates.
+                                         (default: {None})
 
         Returns:\n
         list -- A list of preprocessed comments. Each comment in the list is a str."""
 
         # Varying on the sorting type that is passed in, we will query on it.
         # if no sorting type is given, then we just grab all posts for the submission.
-        submission_comment_objects =\
-            self.__get_comment_objects_for_submission(submission_id, number_of_comments_to_get,
-                                                      sorting_type=sorting_type)
+        # Cursors are lazy, mongo is only sent the query once the first comment is read, so the
+        # query stage covers the round trip of the first batch.
+        with measure_stage(analysis_stats, 'mongo_query', submission_id):
+            submission_comment_cursor = \
+                self.__get_comment_objects_for_submission(submission_id, number_of_comments_to_get,
+                                                          sorting_type=sorting_type,
+                                                          comment_ids_to_skip=comment_ids_to_skip)
+            first_submission_comment_objects = list(itertools.islice(submission_comment_cursor, 1))
 
         # We need the comments in the form of strings, otherwise we cannot preprocess them/
-        # prep them for analysis.
-        submission_comments_as_strings =\
-            [comment['body'] for comment in submission_comment_objects]
+        # prep them for analysis. The rest of the cursor is read in here (fetching its later
+        # batches), and compressed bodies are decompressed.
+        with measure_stage(analysis_stats, 'cursor_iteration', submission_id):
+            submission_comments_as_strings =\
+                [self.get_comment_body(comment) for comment in
+                 itertools.chain(first_submission_comment_objects, submission_comment_cursor)]
 
         # We have now cleaned up each individual comment in the given list, now they are ready
         # to be analyzed later.
-        preprocessed_comments_for_submission =\
-            [self.get_preprocessed_comment(comment) for comment in submission_comments_as_strings]
+        with measure_stage(analysis_stats, 'preprocessing', submission_id):
+            preprocessed_comments_for_submission =\
+                [self.get_preprocessed_comment(comment) for comment in submission_comments_as_strings]
+
+        if analysis_stats:
+            analysis_stats.add_item_count('cursor_iteration', len(submission_comments_as_strings),
+                                          submission_id)
+            analysis_stats.add_item_count('preprocessing', len(preprocessed_comments_for_submission),
+                                          submission_id)
 
         return preprocessed_comments_for_submission
 
 
+    def get_preprocessed_comments_of_submissions(self, submission_ids, sorting_type=None):
+        """Return the preprocessed comments of many submissions, which are pulled with one query
+        instead of one query per submission.
+
+        Arguments:\n
+            submission_ids {list} -- The ids of the submissions that we are grabbing comments for.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only grab comments of this sorting type. (default: {None})
+
+        Returns:\n
+            dict -- Maps every submission id to a list of its preprocessed comments (str)."""
+
+        comments_query = self.__get_submission_comments_query({'$in': list(submission_ids)},
+                                                              sorting_type)
+
+        preprocessed_comments_of_submissions = {submission_id: [] for submission_id in submission_ids}
+        for comment in self.__reddit_collection.find(comments_query, {'body': 1, 'submission': 1}):
+            preprocessed_comments_of_submissions[comment['submission']].append(
+                self.get_preprocessed_comment(self.get_comment_body(comment)))
+
+        return preprocessed_comments_of_submissions
+
+
+    def iterate_preprocessed_comments(self, submission_id, sorting_type=None):
+        """Yield the preprocessed comments of a submission one by one, instead of building a list.
+        Use this when the submission might have too many comments to hold in memory.
+
+        Arguments:\n
+            submission_id {str} -- The id of the submission that we are grabbing comments for.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only grab comments of this sorting type. (default: {None})
+
+        Yields:\n
+            str -- A preprocessed comment."""
+
+        comments_query = self.__get_submission_comments_query(submission_id, sorting_type)
+        for comment in self.__reddit_collection.find(comments_query, {'body': 1}):
+            yield self.get_preprocessed_comment(self.get_comment_body(comment))
+
+
+    def iterate_preprocessed_subreddit_comments(self, subreddit_name, sorting_type=None):
+        """Yield the preprocessed comments of every submission in a subreddit one by one.
+
+        Arguments:\n
+            subreddit_name {str} -- The name of the subreddit that we are grabbing comments for.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only grab comments of this sorting type. (default: {None})
+
+        Raises:\n
+            ValueError: If the user passes something that is not 'hot', 'new', 'top', or 'None'.
+
+        Yields:\n
+            str -- A preprocessed comment."""
+
+        comments_query = {'subreddit_name': subreddit_name}
+        if sorting_type:
+            if sorting_type not in ['hot', 'new', 'top']:
+                raise ValueError(f'Error calling iterate_preprocessed_subreddit_comments:, '
+                                 f'"{sorting_type}" is not a valid option. '
+                                 'Valid Options: "hot", "new, and "top"')
+            comments_query['sorting_type'] = sorting_type
+
+        for comment in self.__reddit_collection.find(comments_query, {'body': 1}):
+            yield self.get_preprocessed_comment(self.get_comment_body(comment))
+
+
+    def get_number_of_comments_of_submissions(self, submission_ids, sorting_type=None):
+        """Return the amount of comments that we have stored for every submission, which are
+        counted with one query instead of one query per submission.
+
+        Arguments:\n
+            submission_ids {list} -- The ids of the submissions that we are counting comments for.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only count comments of this sorting type. (default: {None})
+
+        Returns:\n
+            dict -- Maps every submission id that has comments to its amount of comments (int)."""
+
+        comments_query = self.__get_submission_comments_query({'$in': list(submission_ids)},
+                                                              sorting_type)
+
+        comment_counts = self.__reddit_collection.aggregate([
+            {'$match': comments_query},
+            {'$group': {'_id': '$submission', 'number_of_comments': {'$sum': 1}}}
+        ])
+        return {comment_count['_id']: comment_count['number_of_comments']
+                for comment_count in comment_counts}
+
+
+    def get_sampled_comment_objects(self, sample_sizes, sorting_type=None,
+                                    max_number_of_submissions_per_query=100):
+        """Return a random sample of the comments of every given submission, so we never pull the
+        whole submissions. Each submission is sampled on its own ($sample inside of a $facet), so
+        small submissions are never crowded out by big ones.
+
+        The comments are not preprocessed, so that the caller only preprocesses the ones it keeps.
+        Comments that were sampled before can be sampled again, leaving them out with $nin would
+        make the query grow with every sample.
+
+        Arguments:\n
+            sample_sizes {dict} -- Maps the id of every submission that we sample from to the max
+                                   amount of its comments in the sample.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only sample comments of this sorting type. (default: {None})\n
+            max_number_of_submissions_per_query {int} -- The amount of submissions sampled per
+                                                         query, which keeps the result of a
+                                                         $facet under the document size limit.
+                                                         (default: {100})
+
+        Returns:\n
+            dict -- Maps every submission id to a list of its sampled comment objects, which only
+                    have their _id, body, and submission fields."""
+
+        submission_ids = list(sample_sizes)
+        sampled_comment_objects = {}
+        for query_start in range(0, len(submission_ids), max_number_of_submissions_per_query):
+            query_submission_ids = \
+                submission_ids[query_start: query_start + max_number_of_submissions_per_query]
+
+            # $facet field names can't hold every character of an id, so they are positions.
+            submission_samples = {str(position): [{'$match': {'submission': submission_id}},
+                                                  {'$sample': {'size': sample_sizes[submission_id]}},
+                                                  {'$project': {'body': 1, 'submission': 1}}]
+                                  for position, submission_id in enumerate(query_submission_ids)}
+
+            comments_query = self.__get_submission_comments_query({'$in': query_submission_ids},
+                                                                  sorting_type)
+            for sampled_comments in self.__reddit_collection.aggregate([{'$match': comments_query},
+                                                                        {'$facet': submission_samples}]):
+                for position, submission_id in enumerate(query_submission_ids):
+                    sampled_comment_objects[submission_id] = sampled_comments[str(position)]
+
+        return sampled_comment_objects
+
+
     def add_words_to_stop_word_list(self, list_of_words_to_add):
-        """Append each element in a given list of words to our list of stop_words.
+        """Add each element in a given list of words to our set of stop_words.
            Each appended word is AUTOMATICALLY converted to lowercase.
 
         Arguments:\n
-            list_of_words_to_add {list} -- A list of words to append to our stop_words list.
+            list_of_words_to_add {list} -- A list of words to add to our stop_words set.
 
         Raises:\n
             ValueError: An element of the given list is not of type string."""
@@ -159,7 +411,4 @@ class RedditPreprocessor():
             if type(word) != str:
                 raise ValueError(f"Error in add_words_to_stop_list: {word} is not of type str")
             # Words that we add need to be lowercase, just like our in our stop words list.
-            self.__stop_words.append(word.lower())
-
-        # It was a list of strings, we are all good.
-        self.__stop_words += list_of_words_to_add
+            self.__stop_words.add(word.lower())
@@ -0,0 +1,388 @@
+"""
+@Author Eric Zair
+@File job_queue.py
+@Description: Contains an object, AnalysisJobQueue, which splits subreddit analysis tasks into
+              work units that are stored in a mongodb jobs collection. Any amount of worker
+              processes (on any amount of machines) can claim units with a lease that they keep
+              alive with heartbeats. Finished results are stored in a results collection, so a
+              crashed run picks up exactly where it stopped.
+
+@package docstring
+"""
+# Task ids are a hash of the task, so submitting the same task twice resumes it.
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from pymongo import ASCENDING, ReturnDocument
+
+
+"""The states that a work unit can be in."""
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+"""Every task also has one record in the jobs collection (next to its units) that holds the
+submissions it was split into. Records of tasks have this record_type, units have none."""
+TASK_RECORD_TYPE = 'task'
+
+
+def get_task_id(task):
+    """Return the id of a task, which is the same every time the same task is given.
+
+    Arguments:\n
+        task {dict} -- The task, e.g. {'subreddit_name': 'battlestations', 'sorting_type': 'top'}.
+
+    Returns:\n
+        str -- The id of the task."""
+
+    return hashlib.sha1(json.dumps(task, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def get_default_worker_id():
+    """Return an id for a worker, made of the host name, process id, and a thread id.
+
+    Returns:\n
+        str -- The id of the worker."""
+
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class AnalysisJobQueue():
+    """Given a Mongodb jobs collection and results collection, we split analysis tasks into work
+    units, hand the units out to workers, and store the results of every analyzed submission.
+
+    A task is a dict with the following fields:
+        subreddit_name, sorting_type (optional), max_number_of_comments_to_analyze (optional),
+        max_number_of_submissions_to_analyze (optional)."""
+
+
+    def __init__(self, mongo_jobs_collection, mongo_results_collection, lease_in_seconds=120,
+                 max_attempts=3):
+        """Constructs an AnalysisJobQueue object.
+
+        Arguments:\n
+            mongo_jobs_collection {Collection} -- The collection that holds the work units.
+            mongo_results_collection {Collection} -- The collection that holds the results.
+
+        Keyword Arguments:\n
+            lease_in_seconds {float} -- How long a claimed unit belongs to a worker without a
+                                        heartbeat, before another worker can claim it. (default: {120})\n
+            max_attempts {int} -- The amount of times a unit is tried before it is marked as
+                                  failed. (default: {3})"""
+
+        self.__jobs_collection = mongo_jobs_collection
+        self.__jobs_collection.create_index([('status', ASCENDING), ('lease_expires_at', ASCENDING)])
+        self.__jobs_collection.create_index('task_id')
+
+        self.__results_collection = mongo_results_collection
+        self.__results_collection.create_index('task_id')
+
+        self.__lease_in_seconds = lease_in_seconds
+        self.__max_attempts = max_attempts
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __keep_lease_alive(self, unit_id, worker_id, stop_event, lease_lost_event):
+        """(Helper method)\n
+        Extend the lease of a unit every third of a lease, until stop_event is set. If the unit
+        was taken by someone else in the meantime, lease_lost_event is set."""
+
+        while not stop_event.wait(self.__lease_in_seconds / 3):
+            update_result = self.__jobs_collection.update_one(
+                {'_id': unit_id, 'worker_id': worker_id, 'status': RUNNING},
+                {'$set': {'lease_expires_at': time.time() + self.__lease_in_seconds}})
+            if update_result.matched_count == 0:
+                lease_lost_event.set()
+                return
+
+
+    def __store_task_result_if_finished(self, task_id):
+        """(Helper method)\n
+        Once every unit of a task is done (or failed), store the result of the whole task."""
+
+        if self.__jobs_collection.count_documents({'task_id': task_id,
+                                                   'status': {'$in': [PENDING, RUNNING]}}):
+            return
+
+        task_result = self.get_task_result(task_id)
+        self.__results_collection.replace_one({'_id': task_id}, task_result, upsert=True)
+
+
+    def __fail_units_out_of_attempts(self, current_time):
+        """(Helper method)\n
+        Mark units whose lease ran out on their last attempt as failed (their worker died), since
+        nobody can claim them again. Tasks that are finished because of it get their result stored."""
+
+        out_of_attempts_query = {'status': RUNNING, 'lease_expires_at': {'$lt': current_time},
+                                 'attempts': {'$gte': self.__max_attempts}}
+        task_ids = {unit['task_id'] for unit in self.__jobs_collection.find(out_of_attempts_query,
+                                                                            {'task_id': 1})}
+        if not task_ids:
+            return
+
+        self.__jobs_collection.update_many(out_of_attempts_query,
+                                           {'$set': {'status': FAILED, 'worker_id': None,
+                                                     'error': 'The lease ran out on the last attempt.'}})
+        for task_id in task_ids:
+            self.__store_task_result_if_finished(task_id)
+
+
+    def __get_task_submission_ids(self, task, task_id, analyzer):
+        """(Helper method)\n
+        Return the submissions of a task. They are looked up (and stored in the record of the task)
+        the first time the task is submitted, and never change after that, so newly collected
+        submissions can not shift the units of a task that was already submitted."""
+
+        task_record = self.__jobs_collection.find_one({'_id': task_id}, {'submission_ids': 1})
+        if task_record is not None:
+            return task_record['submission_ids']
+
+        submission_ids = analyzer.get_subreddit_submission_ids(
+            task['subreddit_name'], sorting_type=task.get('sorting_type'),
+            max_number_of_submissions=task.get('max_number_of_submissions_to_analyze', 0))
+
+        # Another process might have submitted the same task in the meantime, the first one wins.
+        task_record = self.__jobs_collection.find_one_and_update(
+            {'_id': task_id},
+            {'$setOnInsert': {'record_type': TASK_RECORD_TYPE, 'task': task,
+                              'submission_ids': submission_ids, 'created_at': time.time()}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+        return task_record['submission_ids']
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def submit_task(self, task, analyzer, submissions_per_unit=10):
+        """Split a task into work units and add them to the jobs collection. The submissions of a
+        task are fixed the first time it is submitted, and units that already exist (from
+        submitting the same task before) are left as they are, so submitting a task again only
+        adds the units that are missing.
+
+        Arguments:\n
+            task {dict} -- The task that we are splitting up.
+            analyzer {SubredditAnalyzer} -- Used to find the submissions of the task's subreddit.
+
+        Keyword Arguments:\n
+            submissions_per_unit {int} -- The amount of submissions in every work unit. (default: {10})
+
+        Returns:\n
+            str -- The id of the task."""
+
+        task_id = get_task_id(task)
+        submission_ids = self.__get_task_submission_ids(task, task_id, analyzer)
+
+        for unit_number in range(0, len(submission_ids), submissions_per_unit):
+            self.__jobs_collection.update_one(
+                {'_id': f'{task_id}:{unit_number // submissions_per_unit}'},
+                {'$setOnInsert': {'task_id': task_id,
+                                  'task': task,
+                                  'submission_ids': submission_ids[unit_number:
+                                                                   unit_number + submissions_per_unit],
+                                  'status': PENDING,
+                                  'attempts': 0,
+                                  'worker_id': None,
+                                  'lease_expires_at': 0,
+                                  'created_at': time.time()}},
+                upsert=True)
+
+        # A task with no submissions at all is already finished.
+        self.__store_task_result_if_finished(task_id)
+        return task_id
+
+
+    def claim_unit(self, worker_id):
+        """Claim the next work unit that is pending, or whose lease has run out.
+
+        Arguments:\n
+            worker_id {str} -- The id of the worker that is claiming a unit.
+
+        Returns:\n
+            dict -- The claimed unit, or None if there is nothing to claim."""
+
+        current_time = time.time()
+        self.__fail_units_out_of_attempts(current_time)
+
+        return self.__jobs_collection.find_one_and_update(
+            {'$or': [{'status': PENDING},
+                     {'status': RUNNING, 'lease_expires_at': {'$lt': current_time}}],
+             'attempts': {'$lt': self.__max_attempts}},
+            {'$set': {'status': RUNNING, 'worker_id': worker_id,
+                      'lease_expires_at': current_time + self.__lease_in_seconds},
+             '$inc': {'attempts': 1}},
+            sort=[('created_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER)
+
+
+    def run_unit(self, unit, worker_id, analyzer):
+        """Analyze every submission of a claimed unit, while keeping its lease alive, and store
+        the results. If the lease was lost to another worker, the results are thrown away.
+
+        Arguments:\n
+            unit {dict} -- The unit returned by claim_unit().
+            worker_id {str} -- The id of the worker that claimed the unit.
+            analyzer {SubredditAnalyzer} -- The analyzer that the submissions are analyzed with.
+
+        Returns:\n
+            bool -- True if the unit was finished by this worker, False otherwise."""
+
+        stop_event = threading.Event()
+        lease_lost_event = threading.Event()
+        heartbeat_thread = threading.Thread(target=self.__keep_lease_alive,
+                                            args=(unit['_id'], worker_id, stop_event, lease_lost_event),
+                                            daemon=True)
+        heartbeat_thread.start()
+
+        task = unit['task']
+        try:
+            if task.get('max_number_of_comments_to_analyze'):
+                submission_results = {
+                    submission_id: analyzer.analyze_submission(
+                        submission_id, sorting_type=task.get('sorting_type'),
+                        max_number_of_comments_to_analyze=task['max_number_of_comments_to_analyze'])
+                    for submission_id in unit['submission_ids']}
+            else:
+                submission_results = analyzer.analyze_submissions(unit['submission_ids'],
+                                                                  sorting_type=task.get('sorting_type'))
+        except Exception as error:
+            stop_event.set()
+            heartbeat_thread.join()
+
+            # Try again later, unless this unit has been tried too many times already.
+            self.__jobs_collection.update_one(
+                {'_id': unit['_id'], 'worker_id': worker_id},
+                {'$set': {'status': FAILED if unit['attempts'] >= self.__max_attempts else PENDING,
+                          'error': repr(error), 'worker_id': None}})
+            self.__store_task_result_if_finished(unit['task_id'])
+            return False
+
+        stop_event.set()
+        heartbeat_thread.join()
+        if lease_lost_event.is_set():
+            return False
+
+        # Results are keyed by task and submission, so storing them twice is harmless.
+        for submission_id, analysis_results in submission_results.items():
+            self.__results_collection.replace_one(
+                {'_id': f"{unit['task_id']}:{submission_id}"},
+                {'task_id': unit['task_id'], 'submission_id': submission_id,
+                 'positive': analysis_results['positive'], 'negative': analysis_results['negative']},
+                upsert=True)
+
+        update_result = self.__jobs_collection.update_one(
+            {'_id': unit['_id'], 'worker_id': worker_id, 'status': RUNNING},
+            {'$set': {'status': DONE, 'finished_at': time.time()}})
+        if update_result.matched_count == 0:
+            return False
+
+        self.__store_task_result_if_finished(unit['task_id'])
+        return True
+
+
+    def run_worker(self, analyzer, worker_id=None, stop_when_empty=True, poll_interval_in_seconds=5):
+        """Claim and run units until there are none left (or forever, if stop_when_empty is False).
+
+        Arguments:\n
+            analyzer {SubredditAnalyzer} -- The analyzer that the submissions are analyzed with.
+
+        Keyword Arguments:\n
+            worker_id {str} -- The id of this worker. None means one is made up. (default: {None})\n
+            stop_when_empty {bool} -- Stop once there is nothing left to claim. (default: {True})\n
+            poll_interval_in_seconds {float} -- How long we wait before looking for new units when
+                                                there is nothing to claim. (default: {5})
+
+        Returns:\n
+            int -- The amount of units that this worker finished."""
+
+        worker_id = worker_id or get_default_worker_id()
+        number_of_units_finished = 0
+
+        while True:
+            unit = self.claim_unit(worker_id)
+            if unit is None:
+                # Units that are still running elsewhere might still come back if a worker dies.
+                if stop_when_empty and not self.__jobs_collection.count_documents(
+                        {'status': {'$in': [PENDING, RUNNING]},
+                         'attempts': {'$lt': self.__max_attempts}}):
+                    return number_of_units_finished
+                time.sleep(poll_interval_in_seconds)
+                continue
+
+            print(f"{worker_id}: analyzing {len(unit['submission_ids'])} submissions of "
+                  f"r/{unit['task']['subreddit_name']} (unit {unit['_id']})")
+            number_of_units_finished += self.run_unit(unit, worker_id, analyzer)
+
+
+    def get_task_result(self, task_id):
+        """Return the result of a task from the results of its submissions. The submissions are
+        combined the same way that analyze_subreddit() combines them.
+
+        Arguments:\n
+            task_id {str} -- The id of the task.
+
+        Returns:\n
+            dict -- {'task_id': str, 'positive': float, 'negative': float,
+                     'number_of_submissions': int, 'number_of_failed_submissions': int}"""
+
+        submission_results = list(self.__results_collection.aggregate([
+            {'$match': {'task_id': task_id, 'submission_id': {'$exists': True}}},
+            {'$group': {'_id': None, 'positive': {'$sum': '$positive'},
+                        'negative': {'$sum': '$negative'}, 'number_of_submissions': {'$sum': 1}}}
+        ]))
+
+        # Submissions of failed units are left out of the result, but we say how many there were.
+        failed_units = self.__jobs_collection.find({'task_id': task_id, 'status': FAILED},
+                                                   {'submission_ids': 1})
+        number_of_failed_submissions = sum(len(unit['submission_ids']) for unit in failed_units)
+
+        task_result = {'task_id': task_id, 'positive': 0, 'negative': 0, 'number_of_submissions': 0,
+                       'number_of_failed_submissions': number_of_failed_submissions}
+        if submission_results:
+            task_result['number_of_submissions'] = submission_results[0]['number_of_submissions']
+            total_sum_of_all_submission_scores = submission_results[0]['positive'] + \
+                submission_results[0]['negative']
+            if total_sum_of_all_submission_scores != 0:
+                task_result['positive'] = submission_results[0]['positive'] / \
+                    total_sum_of_all_submission_scores
+                task_result['negative'] = submission_results[0]['negative'] / \
+                    total_sum_of_all_submission_scores
+
+        return task_result
+
+
+    def get_status(self):
+        """Return the amount of units in each state, for every task.
+
+        Returns:\n
+            dict -- {task_id: {'task': dict, 'pending': int, 'running': int, 'done': int,
+                               'failed': int}}"""
+
+        unit_counts = self.__jobs_collection.aggregate([
+            {'$match': {'record_type': {'$ne': TASK_RECORD_TYPE}}},
+            {'$group': {'_id': {'task_id': '$task_id', 'status': '$status'},
+                        'task': {'$first': '$task'}, 'units': {'$sum': 1}}}
+        ])
+
+        task_statuses = {}
+        for unit_count in unit_counts:
+            task_status = task_statuses.setdefault(unit_count['_id']['task_id'],
+                                                   {'task': unit_count['task'], PENDING: 0, RUNNING: 0,
+                                                    DONE: 0, FAILED: 0})
+            task_status[unit_count['_id']['status']] = unit_count['units']
+        return task_statuses
+
+
+    def get_task_results(self):
+        """Return the stored results of every finished task.
+
+        Returns:\n
+            list -- List of {'task_id', 'positive', 'negative', 'number_of_submissions'} dicts."""
+
+        return list(self.__results_collection.find({'submission_id': {'$exists': False}}))
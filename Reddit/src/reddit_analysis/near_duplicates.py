@@ -0,0 +1,380 @@
+"""
+@Author Eric Zair
+@File near_duplicates.py
+@Description: Contains an object, NearDuplicateIndex, which finds comments that are (nearly) the
+              same as a comment we have already seen, like bot replies, copypasta, and comments
+              that were posted to more than one submission. Every comment gets a MinHash
+              signature when it is collected, and the signature is split into bands that mongo
+              indexes, so finding the comments that look like a new one only touches the few
+              comments that share a band with it, instead of every comment we have.
+
+              Comments that look alike are put in a cluster. The first comment of a cluster is its
+              representative, every comment after it is marked as a duplicate.
+
+@package docstring
+"""
+# For hashing word shingles and bands to the same numbers in every process.
+import hashlib
+import zlib
+
+# Signatures are computed for every permutation at once.
+import numpy as np
+
+# For sending all of the index changes of a batch of comments in one round trip.
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+
+# Comments are tokenized the same way that the preprocessor does it.
+from .comment_preprocessing import WORD_PATTERN
+
+
+"""Name of the collection (in the same database as our comments) that the index is stored in."""
+NEAR_DUPLICATE_COLLECTION_NAME = 'comment_signatures'
+
+"""Hash values are taken modulo this prime, which is the last prime below 2^32, so every signature
+value fits in a uint32."""
+MINHASH_PRIME = 4294967291
+
+
+def get_comment_ids_to_skip_query(submission_ids, duplicate_handling='collapse'):
+    """Return the query of the index records of the comments of some submissions that should not be
+    analyzed. This is also used by AsyncSubredditAnalyzer, which reads the index through an async
+    driver.
+
+    Arguments:\n
+        submission_ids {list} -- The ids of the submissions.
+
+    Keyword Arguments:\n
+        duplicate_handling {str} -- Either 'collapse' or 'exclude', see
+                                    NearDuplicateIndex.get_comment_ids_to_skip().
+                                    (default: {'collapse'})
+
+    Raises:\n
+        ValueError: When duplicate_handling is not 'collapse' or 'exclude'.
+
+    Returns:\n
+        dict -- The mongo query."""
+
+    if duplicate_handling == 'collapse':
+        skip_query = {'is_duplicate': True}
+    elif duplicate_handling == 'exclude':
+        skip_query = {'$or': [{'is_duplicate': True}, {'has_duplicates': True}]}
+    else:
+        raise ValueError('duplicate_handling must be either "collapse" or "exclude".')
+
+    skip_query['submission'] = {'$in': list(submission_ids)}
+    return skip_query
+
+
+class NearDuplicateIndex():
+    """Given a Mongodb collection, we keep one record per comment in it with the MinHash signature
+    of the comment, and the cluster of near duplicate comments that it belongs to.
+
+    Records of the collection have the following fields:
+        _id (the id of the comment), submission, subreddit_name, signature, cluster_id,
+        is_duplicate, has_duplicates, bands (only for cluster representatives)."""
+
+
+    def __init__(self, mongo_signature_collection, number_of_bands=16, rows_per_band=4,
+                 shingle_size=3, similarity_threshold=0.7, seed=0):
+        """Constructs a NearDuplicateIndex object.
+
+        Arguments:\n
+            mongo_signature_collection {Collection} -- The collection that the index is stored in.
+                                                       (This is NOT the collection of comments.)
+
+        Keyword Arguments:\n
+            number_of_bands {int} -- The amount of bands that a signature is split into. More bands
+                                     find less similar comments. (default: {16})\n
+            rows_per_band {int} -- The amount of signature values in every band. More rows only
+                                   find more similar comments. (default: {4})\n
+            shingle_size {int} -- The amount of words in every shingle of a comment. (default: {3})\n
+            similarity_threshold {float} -- The min (estimated) jaccard similarity of two comments
+                                            for them to be near duplicates. (default: {0.7})\n
+            seed {int} -- Seed of the MinHash permutations. Every process that uses the same
+                          collection must use the same seed and sizes. (default: {0})
+
+        Raises:\n
+            ValueError: When similarity_threshold is not in (0, 1]."""
+
+        if not 0 < similarity_threshold <= 1:
+            raise ValueError('similarity_threshold must be greater than 0 and at most 1.')
+
+        """MongoDB collection that holds the index records."""
+        self.__signature_collection = mongo_signature_collection
+        self.__signature_collection.create_index('bands')
+        self.__signature_collection.create_index([('submission', ASCENDING),
+                                                  ('is_duplicate', ASCENDING)])
+        self.__signature_collection.create_index('cluster_id')
+
+        self.__number_of_bands = number_of_bands
+        self.__rows_per_band = rows_per_band
+        self.__shingle_size = shingle_size
+        self.__similarity_threshold = similarity_threshold
+
+        """The a and b of the (a * x + b) % MINHASH_PRIME permutation, for every signature value."""
+        random_generator = np.random.RandomState(seed)
+        number_of_permutations = number_of_bands * rows_per_band
+        self.__permutation_multipliers = \
+            random_generator.randint(1, MINHASH_PRIME, size=number_of_permutations, dtype=np.uint64)
+        self.__permutation_offsets = \
+            random_generator.randint(0, MINHASH_PRIME, size=number_of_permutations, dtype=np.uint64)
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __get_band_keys(self, signature):
+        """(Helper method)\n
+        Return the key of every band of a signature. The band number is part of the key, so the
+        same values in two different bands never match."""
+
+        band_keys = []
+        for band_number in range(self.__number_of_bands):
+            band_start = band_number * self.__rows_per_band
+            band = signature[band_start: band_start + self.__rows_per_band]
+            band_hash = int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=7).digest(), 'big')
+            band_keys.append((band_number << 56) | band_hash)
+        return band_keys
+
+
+    def __get_similarity(self, signature, other_signature):
+        """(Helper method)\n
+        Return the estimated jaccard similarity of the comments of two signatures."""
+
+        return float(np.mean(signature == other_signature))
+
+
+    def __get_representatives_by_band_key(self, band_keys):
+        """(Helper method)\n
+        Return every cluster representative that has any of the band keys, as a dict that maps band
+        keys to lists of (representative id, signature). They are looked up with one query.
+        Only cluster representatives are banded, so a big cluster is still only one candidate."""
+
+        representatives_by_band_key = {}
+        for representative in self.__signature_collection.find({'bands': {'$in': band_keys}},
+                                                               {'signature': 1, 'bands': 1}):
+            representative_signature = np.frombuffer(representative['signature'], dtype=np.uint32)
+            for band_key in representative['bands']:
+                representatives_by_band_key.setdefault(band_key, []).append(
+                    (representative['_id'], representative_signature))
+        return representatives_by_band_key
+
+
+    def __get_most_similar_representative_id(self, signature, band_keys, representatives_by_band_key):
+        """(Helper method)\n
+        Return the id of the most similar representative that shares a band with a signature (the
+        cluster that it belongs to), or None if none of them are similar enough."""
+
+        most_similar_representative_id = None
+        highest_similarity = self.__similarity_threshold
+        for band_key in band_keys:
+            for representative_id, representative_signature in \
+                    representatives_by_band_key.get(band_key, []):
+                similarity = self.__get_similarity(signature, representative_signature)
+                if similarity >= highest_similarity:
+                    most_similar_representative_id = representative_id
+                    highest_similarity = similarity
+        return most_similar_representative_id
+
+
+    def __get_index_changes_of_comment(self, comment, signature, band_keys,
+                                       representatives_by_band_key):
+        """(Helper method)\n
+        Put a comment in a cluster, and return the bulk write operations that add it to the index
+        (an insert, plus an update of its representative if it is a near duplicate). A comment that
+        starts a new cluster is added to representatives_by_band_key, so the rest of the batch can
+        find it."""
+
+        most_similar_representative_id = self.__get_most_similar_representative_id(
+            signature, band_keys, representatives_by_band_key)
+
+        index_record = {'_id': comment['_id'], 'submission': comment['submission'],
+                        'subreddit_name': comment['subreddit_name'],
+                        'signature': signature.tobytes(), 'has_duplicates': False}
+
+        if most_similar_representative_id is None:
+            index_record.update({'cluster_id': comment['_id'], 'is_duplicate': False,
+                                 'bands': band_keys})
+            for band_key in band_keys:
+                representatives_by_band_key.setdefault(band_key, []).append((comment['_id'], signature))
+            return [InsertOne(index_record)]
+
+        index_record.update({'cluster_id': most_similar_representative_id, 'is_duplicate': True})
+        return [InsertOne(index_record), UpdateOne({'_id': most_similar_representative_id},
+                                                   {'$set': {'has_duplicates': True}})]
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def get_signature(self, comment_body):
+        """Return the MinHash signature of a comment body.
+
+        Arguments:\n
+            comment_body {str} -- The plain text body of a comment.
+
+        Returns:\n
+            numpy.ndarray -- The signature (uint32), or None if the comment has no words."""
+
+        tokens = WORD_PATTERN.findall(comment_body.lower())
+        if not tokens:
+            return None
+
+        # Comments shorter than a shingle are one shingle.
+        shingles = {' '.join(tokens[token_number: token_number + self.__shingle_size])
+                    for token_number in range(max(len(tokens) - self.__shingle_size + 1, 1))}
+        shingle_hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                                     dtype=np.uint64, count=len(shingles))
+
+        # Every row is one permutation of every shingle hash, the signature is the min of each row.
+        permuted_hashes = (np.outer(self.__permutation_multipliers, shingle_hashes) +
+                           self.__permutation_offsets[:, None]) % MINHASH_PRIME
+        return permuted_hashes.min(axis=1).astype(np.uint32)
+
+
+    def add_comments(self, comment_records):
+        """Add comments to the index, and put every one of them in a cluster. Comments that are
+        already in the index are skipped.
+
+        Arguments:\n
+            comment_records {iterable} -- Comment records with plain text bodies. Each one needs at
+                                          least the _id, body, submission, and subreddit_name fields.
+
+        Returns:\n
+            int -- The amount of comments that were near duplicates of a comment in the index."""
+
+        new_comments = []
+        for comment in comment_records:
+            signature = self.get_signature(comment['body'])
+            if signature is not None:
+                new_comments.append((comment, signature, self.__get_band_keys(signature)))
+        if not new_comments:
+            return 0
+
+        already_indexed_comment_ids = {record['_id'] for record in self.__signature_collection.find(
+            {'_id': {'$in': [comment['_id'] for comment, _, _ in new_comments]}}, {'_id': 1})}
+        representatives_by_band_key = self.__get_representatives_by_band_key(
+            [band_key for _, _, band_keys in new_comments for band_key in band_keys])
+
+        index_changes = []
+        number_of_near_duplicates = 0
+        for comment, signature, band_keys in new_comments:
+            if comment['_id'] in already_indexed_comment_ids:
+                continue
+            already_indexed_comment_ids.add(comment['_id'])
+
+            comment_index_changes = self.__get_index_changes_of_comment(comment, signature, band_keys,
+                                                                        representatives_by_band_key)
+            index_changes.extend(comment_index_changes)
+            number_of_near_duplicates += len(comment_index_changes) - 1
+
+        if index_changes:
+            # Representatives of this batch are inserted before their duplicates update them.
+            self.__signature_collection.bulk_write(
+                sorted(index_changes, key=lambda index_change: isinstance(index_change, UpdateOne)),
+                ordered=True)
+        return number_of_near_duplicates
+
+
+    def rebuild_from_comment_collection(self, mongo_reddit_collection, batch_size=5000):
+        """Throw the index away and build it again from every comment in a comments collection,
+        oldest comments first (so they become the representatives of their clusters).
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            batch_size {int} -- The amount of comments added to the index at a time. (default: {5000})
+
+        Returns:\n
+            int -- The amount of comments that were near duplicates."""
+
+        # Imported here, since the preprocessor (and its stop words) are only needed for this.
+        from .comment_preprocessing import RedditPreprocessor
+
+        self.__signature_collection.delete_many({})
+
+        # Stored bodies might be compressed, this preprocessor knows where their dictionaries are.
+        comment_body_reader = RedditPreprocessor(mongo_reddit_collection)
+
+        number_of_near_duplicates = 0
+        comment_batch = []
+        comments = mongo_reddit_collection.find({}, {'body': 1, 'submission': 1, 'subreddit_name': 1})
+        for comment in comments.sort('created_at', ASCENDING):
+            comment['body'] = comment_body_reader.get_comment_body(comment)
+            comment_batch.append(comment)
+            if len(comment_batch) == batch_size:
+                number_of_near_duplicates += self.add_comments(comment_batch)
+                comment_batch = []
+
+        return number_of_near_duplicates + self.add_comments(comment_batch)
+
+
+    def get_comment_ids_to_skip(self, submission_ids, duplicate_handling='collapse'):
+        """Return the ids of the comments of some submissions that should not be analyzed.
+
+        Arguments:\n
+            submission_ids {list} -- The ids of the submissions.
+
+        Keyword Arguments:\n
+            duplicate_handling {str} -- 'collapse' skips every comment of a cluster except for its
+                                        representative, so a cluster is only counted once.
+                                        'exclude' skips every comment of a cluster with more than one
+                                        comment in it. (default: {'collapse'})
+
+        Raises:\n
+            ValueError: When duplicate_handling is not 'collapse' or 'exclude'.
+
+        Returns:\n
+            set -- The ids of the comments to skip."""
+
+        skip_query = get_comment_ids_to_skip_query(submission_ids, duplicate_handling)
+        return {record['_id'] for record in self.__signature_collection.find(skip_query, {'_id': 1})}
+
+
+    def get_near_duplicates_of_comment(self, comment_id):
+        """Return the ids of every comment in the same cluster as a comment (including itself).
+
+        Arguments:\n
+            comment_id {str} -- The id of the comment.
+
+        Returns:\n
+            list -- The ids of the comments in the cluster, or an empty list if the comment is not
+                    in the index."""
+
+        index_record = self.__signature_collection.find_one({'_id': comment_id}, {'cluster_id': 1})
+        if index_record is None:
+            return []
+        return [record['_id'] for record in self.__signature_collection.find(
+            {'cluster_id': index_record['cluster_id']}, {'_id': 1})]
+
+
+    def get_largest_clusters(self, subreddit_name=None, number_of_clusters=10):
+        """Return the clusters with the most comments in them, which is where bots and copypasta
+        show up.
+
+        Keyword Arguments:\n
+            subreddit_name {str} -- Only count comments of this subreddit. None means every
+                                    subreddit. (default: {None})\n
+            number_of_clusters {int} -- The amount of clusters that we return. (default: {10})
+
+        Returns:\n
+            list -- List of dicts in the form of
+                    {'cluster_id': str, 'number_of_comments': int, 'number_of_submissions': int,
+                     'subreddits': list}"""
+
+        largest_clusters = self.__signature_collection.aggregate([
+            {'$match': {'subreddit_name': subreddit_name} if subreddit_name else {}},
+            {'$group': {'_id': '$cluster_id',
+                        'number_of_comments': {'$sum': 1},
+                        'submissions': {'$addToSet': '$submission'},
+                        'subreddits': {'$addToSet': '$subreddit_name'}}},
+            {'$match': {'number_of_comments': {'$gt': 1}}},
+            {'$sort': {'number_of_comments': DESCENDING}},
+            {'$limit': number_of_clusters}
+        ])
+
+        return [{'cluster_id': cluster['_id'], 'number_of_comments': cluster['number_of_comments'],
+                 'number_of_submissions': len(cluster['submissions']),
+                 'subreddits': cluster['subreddits']}
+                for cluster in largest_clusters]
@@ -0,0 +1,265 @@
+"""
+@Author Eric Zair
+@File rate_limiter.py
+@Description: Contains an object, SharedRateLimiter, which is a token bucket for requests to
+              reddit that every collector process on this machine shares, through a small sqlite
+              file. The rate of the bucket follows the X-Ratelimit-Remaining and X-Ratelimit-Reset
+              headers that reddit sends back, so the requests left in a rate limit window are
+              spread evenly over the time left in it, no matter how many collectors are running.
+              When reddit does answer with a 429, every process backs off together.
+
+              RateLimitedRequestor plugs the limiter into praw, see the README for how to use it
+              in reddit_credentials.py.
+
+@package docstring
+"""
+# For the shared state, sqlite locks the file for us, so no process ever sees half of an update.
+import os
+import random
+import sqlite3
+import time
+from contextlib import closing
+
+# The requestor is what every praw request goes through.
+import prawcore
+
+# The state file is kept next to our other cached resources.
+from .resource_cache import CACHE_DIRECTORY
+
+
+"""Name of the bucket for requests to the reddit api (oauth.reddit.com), which API_INSTANCE uses."""
+OAUTH_BUCKET_NAME = 'reddit_oauth'
+
+"""Name of the bucket for plain requests to www.reddit.com, like the ones in sub_reddit_exists()."""
+WEB_BUCKET_NAME = 'reddit_web'
+
+"""Path of the sqlite file that the buckets are shared through.
+It can be changed with the REDDIT_RATE_LIMIT_FILE environment variable."""
+RATE_LIMIT_STATE_FILE = os.environ.get('REDDIT_RATE_LIMIT_FILE',
+                                       os.path.join(CACHE_DIRECTORY, 'rate_limits.sqlite'))
+
+
+class SharedRateLimiter():
+    """A token bucket whose state lives in a sqlite file, so that every process using the same
+    bucket name and file shares one rate limit."""
+
+
+    def __init__(self, bucket_name=OAUTH_BUCKET_NAME, state_file_path=None, requests_per_second=1.0,
+                 burst_size=5, max_retries=5, max_backoff_in_seconds=60):
+        """Constructs a SharedRateLimiter object.
+
+        Keyword Arguments:\n
+            bucket_name {str} -- Processes with the same bucket name share a rate limit.
+                                 (default: {OAUTH_BUCKET_NAME})\n
+            state_file_path {str} -- Path of the sqlite file that the bucket is kept in. None means
+                                     RATE_LIMIT_STATE_FILE. (default: {None})\n
+            requests_per_second {float} -- The rate that is used until reddit tells us its rate
+                                           limit in the headers of a response. (default: {1.0})\n
+            burst_size {int} -- The max amount of requests that can be sent right after another.
+                                (default: {5})\n
+            max_retries {int} -- The amount of times a request is sent again after a 429.
+                                 (default: {5})\n
+            max_backoff_in_seconds {float} -- The max amount of time we back off after a 429.
+                                              (default: {60})
+
+        Raises:\n
+            ValueError: When requests_per_second or burst_size is not positive."""
+
+        if requests_per_second <= 0 or burst_size <= 0:
+            raise ValueError('requests_per_second and burst_size must be positive.')
+
+        self.__bucket_name = bucket_name
+        self.__state_file_path = state_file_path or RATE_LIMIT_STATE_FILE
+        self.__default_requests_per_second = requests_per_second
+        self.__burst_size = burst_size
+        self.__max_retries = max_retries
+        self.__max_backoff_in_seconds = max_backoff_in_seconds
+
+        directory_of_state_file = os.path.dirname(self.__state_file_path)
+        if directory_of_state_file:
+            os.makedirs(directory_of_state_file, exist_ok=True)
+
+        with closing(self.__connect()) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, '
+                               'tokens REAL, updated_at REAL, requests_per_second REAL, '
+                               'blocked_until REAL, rate_limit_reset_at REAL)')
+            connection.execute('INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, ?, 0, 0)',
+                               (bucket_name, burst_size, time.time(), requests_per_second))
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __connect(self):
+        """(Helper method)\n
+        Return a new connection to the state file. Connections are never shared, so the limiter
+        keeps working in forked and threaded workers."""
+
+        return sqlite3.connect(self.__state_file_path, timeout=30)
+
+
+    def __update_bucket(self, update_bucket_state):
+        """(Helper method)\n
+        Lock the state file, give the (refilled) state of our bucket to update_bucket_state, and
+        write back the state that it returns. Returns whatever else update_bucket_state returns.
+
+        update_bucket_state gets and returns a dict with tokens, requests_per_second,
+        blocked_until, and rate_limit_reset_at, and returns a second value."""
+
+        with closing(self.__connect()) as connection, connection:
+            # BEGIN IMMEDIATE takes the write lock now, so no other process can take a token
+            # between our read and our write.
+            connection.execute('BEGIN IMMEDIATE')
+            tokens, updated_at, requests_per_second, blocked_until, rate_limit_reset_at = \
+                connection.execute('SELECT tokens, updated_at, requests_per_second, blocked_until, '
+                                   'rate_limit_reset_at FROM buckets WHERE name = ?',
+                                   (self.__bucket_name,)).fetchone()
+
+            current_time = time.time()
+
+            # Once the rate limit window of reddit is over, we go back to our default rate.
+            if rate_limit_reset_at and current_time >= rate_limit_reset_at:
+                requests_per_second = self.__default_requests_per_second
+                rate_limit_reset_at = 0
+
+            bucket_state = {'tokens': min(self.__burst_size,
+                                          tokens + (current_time - updated_at) * requests_per_second),
+                            'requests_per_second': requests_per_second,
+                            'blocked_until': blocked_until,
+                            'rate_limit_reset_at': rate_limit_reset_at}
+            bucket_state, result = update_bucket_state(bucket_state, current_time)
+
+            connection.execute('UPDATE buckets SET tokens = ?, updated_at = ?, requests_per_second = ?, '
+                               'blocked_until = ?, rate_limit_reset_at = ? WHERE name = ?',
+                               (bucket_state['tokens'], current_time,
+                                bucket_state['requests_per_second'], bucket_state['blocked_until'],
+                                bucket_state['rate_limit_reset_at'], self.__bucket_name))
+        return result
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def acquire(self):
+        """Wait until a request can be sent, and take a token for it.
+
+        Returns:\n
+            float -- The amount of seconds that we waited."""
+
+        def take_token(bucket_state, current_time):
+            if current_time < bucket_state['blocked_until']:
+                return bucket_state, bucket_state['blocked_until'] - current_time
+            if bucket_state['tokens'] >= 1:
+                bucket_state['tokens'] -= 1
+                return bucket_state, 0
+            return bucket_state, (1 - bucket_state['tokens']) / bucket_state['requests_per_second']
+
+        total_time_waited = 0
+        while True:
+            time_to_wait = self.__update_bucket(take_token)
+            if time_to_wait == 0:
+                return total_time_waited
+            time.sleep(time_to_wait)
+            total_time_waited += time_to_wait
+
+
+    def update_from_response(self, response):
+        """Change the rate of the bucket to what the rate limit headers of a response allow.
+        When the response is a 429, every process using the bucket backs off.
+
+        Arguments:\n
+            response {requests.Response} -- A response from reddit.
+
+        Returns:\n
+            bool -- True if the response was a 429 (too many requests), False otherwise."""
+
+        remaining_requests = response.headers.get('X-Ratelimit-Remaining')
+        seconds_until_reset = response.headers.get('X-Ratelimit-Reset')
+        was_throttled = response.status_code == 429
+        retry_after = response.headers.get('Retry-After')
+
+        def change_rate(bucket_state, current_time):
+            if remaining_requests is not None and seconds_until_reset is not None:
+                remaining_window = max(float(seconds_until_reset), 1)
+                bucket_state['rate_limit_reset_at'] = current_time + remaining_window
+
+                # The requests that are left are spread over the rest of the window. When there are
+                # none left, nobody sends anything until the window is over.
+                if float(remaining_requests) < 1:
+                    bucket_state['blocked_until'] = max(bucket_state['blocked_until'],
+                                                        current_time + remaining_window)
+                else:
+                    bucket_state['requests_per_second'] = float(remaining_requests) / remaining_window
+                    bucket_state['tokens'] = min(bucket_state['tokens'], float(remaining_requests))
+
+            if was_throttled and retry_after is not None:
+                bucket_state['blocked_until'] = max(bucket_state['blocked_until'],
+                                                    current_time + float(retry_after))
+            return bucket_state, None
+
+        self.__update_bucket(change_rate)
+        return was_throttled
+
+
+    def back_off(self, attempt):
+        """Block the bucket for an exponentially growing (jittered) time after a 429. send() only
+        does this when reddit did not tell us how long to wait with a Retry-After header.
+
+        Arguments:\n
+            attempt {int} -- How many times in a row the request has been throttled (starting at 0)."""
+
+        backoff_in_seconds = min(self.__max_backoff_in_seconds, 2 ** attempt) * random.uniform(0.5, 1)
+
+        def block_bucket(bucket_state, current_time):
+            bucket_state['blocked_until'] = max(bucket_state['blocked_until'],
+                                                current_time + backoff_in_seconds)
+            bucket_state['tokens'] = 0
+            return bucket_state, None
+
+        self.__update_bucket(block_bucket)
+
+
+    def send(self, send_request):
+        """Send a request once the bucket allows it, and send it again as long as reddit answers
+        with a 429. We wait for as long as the Retry-After header of the 429 says, or back off if
+        it has none.
+
+        Arguments:\n
+            send_request {callable} -- Sends the request and returns its requests.Response.
+
+        Returns:\n
+            requests.Response -- The response of the last time the request was sent."""
+
+        for attempt in range(self.__max_retries + 1):
+            self.acquire()
+            response = send_request()
+            if not self.update_from_response(response):
+                return response
+
+            # update_from_response() already blocked the bucket until the Retry-After time.
+            if response.headers.get('Retry-After') is None:
+                self.back_off(attempt)
+        return response
+
+
+class RateLimitedRequestor(prawcore.Requestor):
+    """A praw requestor that sends every request through a SharedRateLimiter. Give it to praw with
+    praw.Reddit(..., requestor_class=RateLimitedRequestor)."""
+
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        """Constructs a RateLimitedRequestor object. Every argument except for rate_limiter is
+        passed on to prawcore.Requestor.
+
+        Keyword Arguments:\n
+            rate_limiter {SharedRateLimiter} -- The rate limiter that every request goes through.
+                                                None means the shared OAUTH_BUCKET_NAME bucket.
+                                                (default: {None})"""
+
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter or SharedRateLimiter(OAUTH_BUCKET_NAME)
+
+
+    def request(self, *args, **kwargs):
+        send_request = super().request
+        return self.rate_limiter.send(lambda: send_request(*args, **kwargs))
@@ -0,0 +1,220 @@
+"""
+@Author Eric Zair
+@File reply_graph.py
+@Description: Contains an object, ReplyGraph, which is a compact (array backed) index of the reply
+              structure of the comments of a submission or subreddit. It is used to answer thread
+              structure questions, e.g. how deep the threads go, how big each reply subtree is, and
+              whether negativity spreads down a thread.
+
+@package docstring
+"""
+# Every part of the graph is stored in flat arrays, so traversals and aggregations are vectorized.
+import numpy as np
+
+
+"""Reddit prefixes the parent_id of a comment with t1_ when the parent is a comment
+(the comment is a reply) and with t3_ when the parent is the submission itself."""
+COMMENT_PARENT_PREFIX = 't1_'
+
+
+class ReplyGraph():
+    """CSR style reply graph over a set of comments. Every comment is a node with an integer id.
+    The children (replies) of node n are children[child_offsets[n]: child_offsets[n + 1]], and the
+    sentiment of node n is sentiments[n]. Top level comments, and comments whose parent we do not
+    have stored, are the roots of the threads."""
+
+
+    def __init__(self, comment_ids, parent_ids, sentiments):
+        """Constructs a ReplyGraph object.
+
+        Arguments:\n
+            comment_ids {list} -- The id of every comment (the _id field of the stored comment).
+            parent_ids {list} -- The parent_id field of every comment, in the same order.
+            sentiments {list} -- The sentiment (vader compound score) of every comment,
+                                 in the same order.
+
+        Raises:\n
+            ValueError: When the given lists are not all the same length."""
+
+        if not len(comment_ids) == len(parent_ids) == len(sentiments):
+            raise ValueError('comment_ids, parent_ids, and sentiments must be the same length.')
+
+        """Maps a node id to the id of its comment, and the other way around."""
+        self.__comment_ids = list(comment_ids)
+        self.__node_ids = {comment_id: node_id for node_id, comment_id in enumerate(self.__comment_ids)}
+
+        number_of_nodes = len(self.__comment_ids)
+
+        """The parent node of every node, -1 when the node is the root of a thread."""
+        self.__parents = np.full(number_of_nodes, -1, dtype=np.int64)
+        for node_id, parent_id in enumerate(parent_ids):
+            if parent_id and parent_id.startswith(COMMENT_PARENT_PREFIX):
+                self.__parents[node_id] = \
+                    self.__node_ids.get(parent_id[len(COMMENT_PARENT_PREFIX):], -1)
+
+        """The sentiment of every node, parallel to the node ids."""
+        self.__sentiments = np.asarray(sentiments, dtype=np.float64)
+
+        """The offset and child arrays. Replies are grouped by their parent."""
+        non_root_nodes = np.flatnonzero(self.__parents >= 0)
+        self.__children = non_root_nodes[np.argsort(self.__parents[non_root_nodes], kind='stable')]
+        self.__child_offsets = np.zeros(number_of_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.__parents[non_root_nodes], minlength=number_of_nodes),
+                  out=self.__child_offsets[1:])
+
+        """The nodes of every depth of the graph (breadth first levels), roots first."""
+        self.__levels = []
+        current_level = np.flatnonzero(self.__parents < 0)
+        while len(current_level):
+            self.__levels.append(current_level)
+            current_level = self.get_children_of_nodes(current_level)
+
+
+    def get_number_of_comments(self):
+        """Return the amount of comments (nodes) in the graph.
+
+        Returns:\n
+            int -- The amount of nodes."""
+
+        return len(self.__comment_ids)
+
+
+    def get_node_id(self, comment_id):
+        """Return the node id of a comment.
+
+        Arguments:\n
+            comment_id {str} -- The id of the comment.
+
+        Returns:\n
+            int -- The node id of the comment."""
+
+        return self.__node_ids[comment_id]
+
+
+    def get_comment_id(self, node_id):
+        """Return the comment id of a node.
+
+        Arguments:\n
+            node_id {int} -- The id of the node.
+
+        Returns:\n
+            str -- The id of the comment."""
+
+        return self.__comment_ids[node_id]
+
+
+    def get_children_of_nodes(self, node_ids):
+        """Return the children (direct replies) of every given node, all in one array.
+
+        Arguments:\n
+            node_ids {np.ndarray} -- The nodes that we want the children of.
+
+        Returns:\n
+            np.ndarray -- The node ids of the children."""
+
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        child_starts = self.__child_offsets[node_ids]
+        child_counts = self.__child_offsets[node_ids + 1] - child_starts
+
+        # Gather every [start, start + count) range at once, instead of one slice per node.
+        range_offsets = np.repeat(child_starts - np.cumsum(child_counts) + child_counts, child_counts)
+        return self.__children[range_offsets + np.arange(child_counts.sum())]
+
+
+    def get_depths(self):
+        """Return the depth of every node. Roots of threads have a depth of 0.
+
+        Returns:\n
+            np.ndarray -- The depth of every node, indexed by node id."""
+
+        depths = np.zeros(len(self.__comment_ids), dtype=np.int64)
+        for depth, level in enumerate(self.__levels):
+            depths[level] = depth
+        return depths
+
+
+    def get_subtree_sizes(self):
+        """Return the size of the reply subtree of every node (the node and all of its replies).
+
+        Returns:\n
+            np.ndarray -- The subtree size of every node, indexed by node id."""
+
+        subtree_sizes = np.ones(len(self.__comment_ids), dtype=np.int64)
+
+        # Going from the deepest level up, every node adds its finished subtree to its parent.
+        for level in reversed(self.__levels[1:]):
+            np.add.at(subtree_sizes, self.__parents[level], subtree_sizes[level])
+        return subtree_sizes
+
+
+    def get_thread_roots(self):
+        """Return the root of the thread that every node is in.
+
+        Returns:\n
+            np.ndarray -- The node id of the thread root of every node, indexed by node id."""
+
+        thread_roots = np.arange(len(self.__comment_ids), dtype=np.int64)
+        for level in self.__levels[1:]:
+            thread_roots[level] = thread_roots[self.__parents[level]]
+        return thread_roots
+
+
+    def get_thread_sentiment_summary(self, negative_threshold=-0.05):
+        """Return the aggregated sentiment of every thread (a root comment and all of its replies).
+
+        Keyword Arguments:\n
+            negative_threshold {float} -- Comments with a sentiment at or below this are negative.
+                                          (default: {-0.05})
+
+        Returns:\n
+            dict -- Dictionary of arrays, one entry per thread:
+                    {'root_comment_ids': list, 'sizes': np.ndarray, 'max_depths': np.ndarray,
+                     'mean_sentiments': np.ndarray, 'negative_fractions': np.ndarray}"""
+
+        number_of_nodes = len(self.__comment_ids)
+        thread_roots = self.get_thread_roots()
+        depths = self.get_depths()
+        roots = self.__levels[0] if self.__levels else np.array([], dtype=np.int64)
+
+        sizes = np.bincount(thread_roots, minlength=number_of_nodes)[roots]
+        sentiment_sums = np.bincount(thread_roots, weights=self.__sentiments,
+                                     minlength=number_of_nodes)[roots]
+        negative_counts = np.bincount(thread_roots, weights=self.__sentiments <= negative_threshold,
+                                      minlength=number_of_nodes)[roots]
+
+        max_depths = np.zeros(number_of_nodes, dtype=np.int64)
+        np.maximum.at(max_depths, thread_roots, depths)
+
+        return {'root_comment_ids': [self.__comment_ids[root] for root in roots],
+                'sizes': sizes,
+                'max_depths': max_depths[roots],
+                'mean_sentiments': sentiment_sums / np.maximum(sizes, 1),
+                'negative_fractions': negative_counts / np.maximum(sizes, 1)}
+
+
+    def get_negativity_spread(self, negative_threshold=-0.05):
+        """Return how likely a reply is to be negative, given whether the comment it replies to is
+        negative or not. If negativity spreads down threads, the first will be higher.
+
+        Keyword Arguments:\n
+            negative_threshold {float} -- Comments with a sentiment at or below this are negative.
+                                          (default: {-0.05})
+
+        Returns:\n
+            dict -- {'negative_reply_rate_to_negative': float,
+                     'negative_reply_rate_to_non_negative': float}
+                    A rate is 0 when there are no replies of that kind."""
+
+        replies = np.flatnonzero(self.__parents >= 0)
+        reply_is_negative = self.__sentiments[replies] <= negative_threshold
+        parent_is_negative = self.__sentiments[self.__parents[replies]] <= negative_threshold
+
+        replies_to_negative = parent_is_negative.sum()
+        replies_to_non_negative = len(replies) - replies_to_negative
+
+        return {'negative_reply_rate_to_negative':
+                    float((reply_is_negative & parent_is_negative).sum() / replies_to_negative)
+                    if replies_to_negative else 0.0,
+                'negative_reply_rate_to_non_negative':
+                    float((reply_is_negative & ~parent_is_negative).sum() / replies_to_non_negative)
+                    if replies_to_non_negative else 0.0}
@@ -0,0 +1,196 @@
+"""
+@Author Eric Zair
+@File resource_cache.py
+@Description: Loads the resources that preprocessing and scoring need (the stop word set, the
+              parsed vader lexicon, and the stems of words we have seen before) from compact
+              pickle files, instead of importing NLTK and parsing text files on every run.
+              The pickles are built the first time a resource is asked for.
+
+@package docstring
+"""
+# Everything in here is standard library, so importing this module costs next to nothing.
+import atexit
+import importlib.util
+import os
+import pickle
+import tempfile
+
+
+"""Directory that the cached resources are stored in.
+It can be changed with the REDDIT_ANALYSIS_CACHE_DIR environment variable."""
+CACHE_DIRECTORY = os.environ.get('REDDIT_ANALYSIS_CACHE_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'reddit_analysis'))
+
+"""The max amount of word stems that we keep in the stem cache file."""
+MAX_NUMBER_OF_CACHED_STEMS = 200000
+
+"""The sentiment analyzer is the same for everyone in the process, so it is only built once."""
+_sentiment_analyzer = None
+
+"""Stems of words, shared by every RedditPreprocessor in the process."""
+_stem_cache = None
+_stem_cache_has_new_stems = False
+
+
+def _get_cache_file_path(cache_file_name):
+    """(Helper function)\n
+    Return the path of a file in the cache directory."""
+
+    return os.path.join(CACHE_DIRECTORY, cache_file_name)
+
+
+def _read_cache_file(cache_file_name):
+    """(Helper function)\n
+    Return the object pickled in a cache file, or None if it does not exist or is unreadable."""
+
+    try:
+        with open(_get_cache_file_path(cache_file_name), 'rb') as cache_file:
+            return pickle.load(cache_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def _write_cache_file(cache_file_name, cached_object):
+    """(Helper function)\n
+    Pickle an object into a cache file. The file is replaced atomically, so other processes never
+    read half of a file. If the cache directory is not writable we just don't cache."""
+
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=CACHE_DIRECTORY)
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            pickle.dump(cached_object, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, _get_cache_file_path(cache_file_name))
+    except OSError:
+        pass
+
+
+def load_stop_words(language='english'):
+    """Return the NLTK stop words of a language. NLTK is only imported the first time.
+
+    Keyword Arguments:\n
+        language {str} -- The language of the stop words. (default: {'english'})
+
+    Returns:\n
+        set -- The stop words (a new set every call, so it is safe to change)."""
+
+    cache_file_name = f'stop_words_{language}.pickle'
+    stop_words = _read_cache_file(cache_file_name)
+
+    if stop_words is None:
+        from nltk.corpus import stopwords
+        stop_words = frozenset(stopwords.words(language))
+        _write_cache_file(cache_file_name, stop_words)
+
+    return set(stop_words)
+
+
+def _get_lexicon_version():
+    """(Helper function)\n
+    Return the version of vader's lexicon files (and the code that parses them), which the cached
+    lexicon must match. Every file that ships with vaderSentiment is part of it, so a new emoji
+    lexicon makes the cache out of date as well."""
+
+    vader_directory = importlib.util.find_spec('vaderSentiment').submodule_search_locations[0]
+    file_versions = []
+    for file_name in sorted(os.listdir(vader_directory)):
+        if file_name.endswith('.txt') or file_name.endswith('.py'):
+            file_stats = os.stat(os.path.join(vader_directory, file_name))
+            file_versions.append(f'{file_name}_{file_stats.st_size}_{int(file_stats.st_mtime)}')
+    return '|'.join(file_versions)
+
+
+def get_sentiment_analyzer():
+    """Return a vader SentimentIntensityAnalyzer. Instead of parsing the lexicon text files, the
+    parsed lexicon is loaded from the cache (it is rebuilt if any of vader's files change).
+    Every call in the same process gets the same analyzer.
+
+    Returns:\n
+        SentimentIntensityAnalyzer -- The sentiment analyzer."""
+
+    global _sentiment_analyzer
+    if _sentiment_analyzer:
+        return _sentiment_analyzer
+
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    lexicon_version = _get_lexicon_version()
+    cached_lexicon = _read_cache_file('vader_lexicon.pickle')
+
+    if cached_lexicon and cached_lexicon.get('version') == lexicon_version:
+        class CachedLexiconSentimentIntensityAnalyzer(SentimentIntensityAnalyzer):
+            """Built by vader's own __init__, only parsing the lexicons is replaced by the cache."""
+
+
+            def make_lex_dict(self):
+                return cached_lexicon['lexicon']
+
+
+            def make_emoji_dict(self):
+                return cached_lexicon['emojis']
+
+        sentiment_analyzer = CachedLexiconSentimentIntensityAnalyzer()
+    else:
+        sentiment_analyzer = SentimentIntensityAnalyzer()
+        _write_cache_file('vader_lexicon.pickle', {'version': lexicon_version,
+                                                    'lexicon': sentiment_analyzer.lexicon,
+                                                    'emojis': sentiment_analyzer.emojis})
+
+    _sentiment_analyzer = sentiment_analyzer
+    return _sentiment_analyzer
+
+
+def get_stem_cache():
+    """Return the dict of word -> stem that every RedditPreprocessor in the process shares.
+    It is loaded from the cache file, and written back when the process exits if new stems were
+    added with add_to_stem_cache(). Words that are in it never need NLTK to be imported.
+
+    Returns:\n
+        dict -- Maps a word to its porter stem."""
+
+    global _stem_cache
+    if _stem_cache is None:
+        _stem_cache = _read_cache_file('stems.pickle') or {}
+        atexit.register(save_stem_cache)
+    return _stem_cache
+
+
+def add_to_stem_cache(word, stem):
+    """Add the stem of a word to the stem cache.
+
+    Arguments:\n
+        word {str} -- The word that was stemmed.
+        stem {str} -- The stem of the word."""
+
+    global _stem_cache_has_new_stems
+    stem_cache = get_stem_cache()
+    if len(stem_cache) < MAX_NUMBER_OF_CACHED_STEMS:
+        stem_cache[word] = stem
+        _stem_cache_has_new_stems = True
+
+
+def save_stem_cache():
+    """Write the stem cache to its cache file, if stems were added since it was loaded."""
+
+    global _stem_cache_has_new_stems
+    if _stem_cache is not None and _stem_cache_has_new_stems:
+        _write_cache_file('stems.pickle', _stem_cache)
+        _stem_cache_has_new_stems = False
+
+
+def clear_resource_cache():
+    """Delete every cached resource file, e.g. after downloading a new NLTK stop word corpus."""
+
+    global _sentiment_analyzer, _stem_cache, _stem_cache_has_new_stems
+    for cache_file_name in ['vader_lexicon.pickle', 'stems.pickle']:
+        if os.path.exists(_get_cache_file_path(cache_file_name)):
+            os.remove(_get_cache_file_path(cache_file_name))
+
+    if os.path.isdir(CACHE_DIRECTORY):
+        for cache_file_name in os.listdir(CACHE_DIRECTORY):
+            if cache_file_name.startswith('stop_words_'):
+                os.remove(_get_cache_file_path(cache_file_name))
+
+    _sentiment_analyzer = None
+    _stem_cache = None
+    _stem_cache_has_new_stems = False
@@ -0,0 +1,331 @@
+"""
+@Author Eric Zair
+@File submission_catalog.py
+@Description: Contains an object, SubmissionCatalog, which keeps a small mongodb collection with
+              one record per submission that we have comments of. It is updated as comments are
+              collected, so the submissions of a subreddit can be listed (paged and sorted) from
+              it, instead of running distinct() over every comment of the subreddit, which gets
+              slow, and stops working once the ids are over mongo's 16MB limit.
+
+@package docstring
+"""
+# For the last fetched times of submissions.
+import time
+
+# For sending all of the catalog updates of a batch of comments in one round trip.
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+
+
+"""Name of the collection (in the same database as our comments) that the catalog is stored in."""
+SUBMISSION_CATALOG_COLLECTION_NAME = 'submission_catalog'
+
+"""These are the fields that submissions can be listed by."""
+SORTED_BY_OPTIONS = ('created_at', 'comment_count', 'last_fetched_at')
+
+
+def get_backfilled_subreddit_record_id(subreddit_name):
+    """Return the id of the record that marks a subreddit as backfilled. These records live in the
+    catalog collection next to the submissions, but have no subreddit_name field, so listing the
+    submissions of a subreddit never finds them. Submission ids never contain a "/".
+
+    Arguments:\n
+        subreddit_name {str} -- The name of the subreddit.
+
+    Returns:\n
+        str -- The id of the record."""
+
+    return f'r/{subreddit_name}'
+
+
+def get_submissions_query_and_sort(subreddit_name, sorting_type=None, sorted_by='created_at',
+                                   descending=True):
+    """Return the query and sort used to list the submissions of a subreddit from the catalog
+    collection. This is also used by AsyncSubredditAnalyzer, which reads the catalog through an
+    async driver.
+
+    Arguments:\n
+        subreddit_name {str} -- The subreddit that we want the submissions of.
+
+    Keyword Arguments:\n
+        sorting_type {str} -- Only list submissions that we have comments of this sorting type
+                              of. None means every submission. (default: {None})\n
+        sorted_by {str} -- One of SORTED_BY_OPTIONS. (default: {'created_at'})\n
+        descending {bool} -- True lists the newest (or biggest) submissions first.
+                             (default: {True})
+
+    Raises:\n
+        ValueError: When sorted_by is not a valid option.
+
+    Returns:\n
+        tuple -- (query {dict}, sort {list})"""
+
+    if sorted_by not in SORTED_BY_OPTIONS:
+        raise ValueError(f'sorted_by must be one of the following options: {SORTED_BY_OPTIONS}.')
+
+    catalog_query = {'subreddit_name': subreddit_name}
+    if sorting_type:
+        catalog_query['sorting_types'] = sorting_type
+
+    # The id breaks ties, so pages never overlap.
+    sort_direction = DESCENDING if descending else ASCENDING
+    return catalog_query, [(sorted_by, sort_direction), ('_id', sort_direction)]
+
+
+class SubmissionCatalog():
+    """Given a Mongodb collection, we keep one record per submission in it.
+
+    Records of the collection have the following fields:
+        _id (the id of the submission), subreddit_name, sorting_types, comment_count,
+        created_at, last_fetched_at.
+
+    Subreddits whose comments were collected before the catalog existed are only listed from it
+    once they are backfilled, see backfill_subreddits(). Making a SubmissionCatalog never writes to
+    mongo, whoever writes to the catalog calls ensure_indexes() first."""
+
+
+    def __init__(self, mongo_catalog_collection):
+        """Constructs a SubmissionCatalog object.
+
+        Arguments:\n
+            mongo_catalog_collection {Collection} -- The collection that the catalog is stored in.
+                                                     (This is NOT the collection of comments.)"""
+
+        """MongoDB collection that holds the catalog records."""
+        self.__catalog_collection = mongo_catalog_collection
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __write_submission_summaries(self, mongo_reddit_collection, match_stages, batch_size):
+        """(Helper method)\n
+        Sum up the comments (that match_stages leave in) of every submission, and write them over
+        the records of those submissions. Every subreddit that is written is marked as backfilled.
+        The time that those submissions were created (and last fetched) is not known, so the times
+        of their oldest (and newest) comments are used instead. Returns the amount of submissions."""
+
+        submission_summaries = mongo_reddit_collection.aggregate(match_stages + [
+            {'$group': {'_id': '$submission',
+                        'subreddit_name': {'$first': '$subreddit_name'},
+                        'sorting_types': {'$addToSet': '$sorting_type'},
+                        'comment_count': {'$sum': 1},
+                        'created_at': {'$min': '$created_at'},
+                        'last_fetched_at': {'$max': '$created_at'}}}
+        ], allowDiskUse=True)
+
+        # Records are replaced rather than inserted, so collectors running at the same time never
+        # make a backfill fail.
+        number_of_submissions = 0
+        backfilled_subreddit_names = set()
+        catalog_writes = []
+        for submission_summary in submission_summaries:
+            backfilled_subreddit_names.add(submission_summary['subreddit_name'])
+            catalog_writes.append(ReplaceOne({'_id': submission_summary['_id']}, submission_summary,
+                                             upsert=True))
+            if len(catalog_writes) == batch_size:
+                self.__catalog_collection.bulk_write(catalog_writes, ordered=False)
+                number_of_submissions += len(catalog_writes)
+                catalog_writes = []
+
+        if catalog_writes:
+            self.__catalog_collection.bulk_write(catalog_writes, ordered=False)
+
+        self.__mark_subreddits_as_backfilled(backfilled_subreddit_names)
+        return number_of_submissions + len(catalog_writes)
+
+
+    def __mark_subreddits_as_backfilled(self, subreddit_names):
+        """(Helper method)\n
+        Mark subreddits as backfilled, so that their submissions are listed from the catalog."""
+
+        for subreddit_name in subreddit_names:
+            self.__catalog_collection.update_one(
+                {'_id': get_backfilled_subreddit_record_id(subreddit_name)},
+                {'$set': {'backfilled_subreddit_name': subreddit_name}}, upsert=True)
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def ensure_indexes(self):
+        """Create the indexes of the catalog collection, if they do not exist yet. The collector
+        calls this before it writes to the catalog, so analysis (which only reads it) never sends
+        index definitions to mongo."""
+
+        # Every way of listing the submissions of a subreddit has its own index.
+        for field_name in SORTED_BY_OPTIONS:
+            self.__catalog_collection.create_index([('subreddit_name', ASCENDING),
+                                                    ('sorting_types', ASCENDING),
+                                                    (field_name, DESCENDING)])
+            self.__catalog_collection.create_index([('subreddit_name', ASCENDING),
+                                                    (field_name, DESCENDING)])
+
+
+    def add_comments(self, comment_records, submission_created_times=None, fetched_at=None):
+        """Add comments to the catalog. Each comment must only ever be added once, e.g. only add the
+        comments that were newly inserted into the comments collection.
+
+        Arguments:\n
+            comment_records {iterable} -- Comment records as they are stored in mongo. Each one needs
+                                          at least the created_at, submission, subreddit_name, and
+                                          sorting_type fields.
+
+        Keyword Arguments:\n
+            submission_created_times {dict} -- Maps submission ids to the time that the submission
+                                               was created. Submissions that are not in it use the
+                                               time of their oldest comment. (default: {None})\n
+            fetched_at {float} -- The time that the comments were fetched from reddit. None means
+                                  now. (default: {None})
+
+        Returns:\n
+            int -- The amount of submissions that were updated."""
+
+        submission_created_times = submission_created_times or {}
+        fetched_at = fetched_at or time.time()
+
+        # Comments of the same submission are summed up first, so every record is updated once.
+        catalog_updates = {}
+        for comment in comment_records:
+            if comment['submission'] not in catalog_updates:
+                catalog_updates[comment['submission']] = {
+                    'subreddit_name': comment['subreddit_name'],
+                    'sorting_types': set(),
+                    'comment_count': 0,
+                    'created_at': submission_created_times.get(comment['submission'],
+                                                               comment['created_at'])}
+
+            catalog_update = catalog_updates[comment['submission']]
+            catalog_update['sorting_types'].add(comment['sorting_type'])
+            catalog_update['comment_count'] += 1
+            catalog_update['created_at'] = min(catalog_update['created_at'], comment['created_at'])
+
+        if catalog_updates:
+            self.__catalog_collection.bulk_write([
+                UpdateOne({'_id': submission_id},
+                          {'$set': {'subreddit_name': catalog_update['subreddit_name'],
+                                    'last_fetched_at': fetched_at},
+                           '$addToSet': {'sorting_types': {
+                               '$each': sorted(catalog_update['sorting_types'])}},
+                           '$inc': {'comment_count': catalog_update['comment_count']},
+                           '$min': {'created_at': catalog_update['created_at']}},
+                          upsert=True)
+                for submission_id, catalog_update in catalog_updates.items()
+            ], ordered=False)
+
+        return len(catalog_updates)
+
+
+    def mark_submissions_as_fetched(self, submission_ids, fetched_at=None):
+        """Set the last fetched time of submissions that are already in the catalog, e.g. when
+        they were collected again but none of their comments were new.
+
+        Arguments:\n
+            submission_ids {iterable} -- The ids of the submissions that were fetched.
+
+        Keyword Arguments:\n
+            fetched_at {float} -- The time that the submissions were fetched. None means now.
+                                  (default: {None})"""
+
+        self.__catalog_collection.update_many({'_id': {'$in': list(submission_ids)}},
+                                              {'$set': {'last_fetched_at': fetched_at or time.time()}})
+
+
+    def rebuild_from_comment_collection(self, mongo_reddit_collection, batch_size=1000):
+        """Throw the catalog away and build it again from every comment in a comments collection.
+        Every subreddit in the comments collection is marked as backfilled.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            batch_size {int} -- The amount of records written at a time. (default: {1000})
+
+        Returns:\n
+            int -- The amount of submissions in the catalog."""
+
+        self.__catalog_collection.delete_many({})
+        return self.__write_submission_summaries(mongo_reddit_collection, [], batch_size)
+
+
+    def backfill_subreddits(self, mongo_reddit_collection, subreddit_names, batch_size=1000):
+        """Add every submission of some subreddits that we have comments of to the catalog, unless
+        the subreddit was already backfilled, and mark them as backfilled. This must happen before
+        newly collected comments of a subreddit are stored, so that they are not counted twice.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+            subreddit_names {iterable} -- The names of the subreddits.
+
+        Keyword Arguments:\n
+            batch_size {int} -- The amount of records written at a time. (default: {1000})
+
+        Returns:\n
+            int -- The amount of submissions that were added to the catalog."""
+
+        subreddit_names_to_backfill = [subreddit_name for subreddit_name in set(subreddit_names)
+                                       if not self.is_subreddit_backfilled(subreddit_name)]
+        if not subreddit_names_to_backfill:
+            return 0
+
+        number_of_submissions = self.__write_submission_summaries(
+            mongo_reddit_collection,
+            [{'$match': {'subreddit_name': {'$in': subreddit_names_to_backfill}}}], batch_size)
+
+        # Subreddits that we have no comments of yet are complete as well.
+        self.__mark_subreddits_as_backfilled(subreddit_names_to_backfill)
+        return number_of_submissions
+
+
+    def is_subreddit_backfilled(self, subreddit_name):
+        """Return True if every submission of a subreddit is in the catalog, which is the case once
+        it was backfilled (or rebuilt). Until then, the catalog only has the submissions of the
+        subreddit that were collected after the catalog existed, which are not all of them.
+
+        Arguments:\n
+            subreddit_name {str} -- The name of the subreddit.
+
+        Returns:\n
+            bool -- True if the subreddit was backfilled, False otherwise."""
+
+        return self.__catalog_collection.find_one(
+            {'_id': get_backfilled_subreddit_record_id(subreddit_name)}, {'_id': 1}) is not None
+
+
+    def get_submissions(self, subreddit_name, sorting_type=None, sorted_by='created_at', descending=True,
+                        page_number=0, page_size=0, ids_only=False):
+        """Return the submissions of a subreddit, sorted and (optionally) one page at a time.
+
+        Arguments:\n
+            subreddit_name {str} -- The subreddit that we want the submissions of.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only list submissions that we have comments of this sorting type
+                                  of. None means every submission. (default: {None})\n
+            sorted_by {str} -- One of SORTED_BY_OPTIONS. (default: {'created_at'})\n
+            descending {bool} -- True lists the newest (or biggest) submissions first.
+                                 (default: {True})\n
+            page_number {int} -- The page that we return, starting at 0. (default: {0})\n
+            page_size {int} -- The amount of submissions in a page. 0 means every submission is in
+                               one page. (default: {0})\n
+            ids_only {bool} -- Return only the ids of the submissions. (default: {False})
+
+        Raises:\n
+            ValueError: When sorted_by is not a valid option.\n
+            ValueError: When page_number or page_size is negative.
+
+        Returns:\n
+            list -- The catalog records (or ids) of the submissions."""
+
+        if page_number < 0 or page_size < 0:
+            raise ValueError('page_number and page_size can not be negative.')
+
+        catalog_query, catalog_sort = get_submissions_query_and_sort(subreddit_name, sorting_type,
+                                                                     sorted_by, descending)
+        catalog_records = self.__catalog_collection.find(catalog_query, {'_id': 1} if ids_only else None)
+        catalog_records = catalog_records.sort(catalog_sort)
+        if page_size:
+            catalog_records = catalog_records.skip(page_number * page_size).limit(page_size)
+
+        if ids_only:
+            return [catalog_record['_id'] for catalog_record in catalog_records]
+        return list(catalog_records)
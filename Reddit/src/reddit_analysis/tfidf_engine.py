@@ -0,0 +1,273 @@
+"""
+@Author Eric Zair
+@File tfidf_engine.py
+@Description: Contains an object, SubredditTfidfEngine, which builds a TF-IDF representation of
+              the comments stored in our mongodb database (using sparse matrices) and uses it to
+              find the terms that set a subreddit apart from the other subreddits.
+
+@package docstring
+"""
+# Term ids and document ids are buffered in compact arrays until they are added to the matrix.
+from array import array
+
+# For the sparse document-term matrix and the vectorized TF-IDF math.
+import numpy as np
+from scipy import sparse
+
+# My comment preprocessor object, specifically used for reddit comments.
+from .comment_preprocessing import RedditPreprocessor
+
+
+class SubredditTfidfEngine():
+    """Incrementally builds a sparse document-term count matrix out of the comments of a mongodb
+    collection, where every submission is a document (row) that belongs to a subreddit.
+
+    From that matrix we can compute TF-IDF scores with either the subreddits or the submissions
+    as the documents, and find the most distinctive terms of each subreddit."""
+
+
+    def __init__(self, mongo_reddit_collection, language='english', max_buffered_tokens=1000000,
+                 batch_size=1000):
+        """Constructs a SubredditTfidfEngine object.
+
+        Arguments:\n
+            mongo_reddit_collection {Collection} -- The collection that holds our reddit comments.
+
+        Keyword Arguments:\n
+            language {str} -- The language of the stop words that we remove. (default: {'english'})\n
+            max_buffered_tokens {int} -- The amount of tokens that we buffer before adding them to
+                                         our sparse matrix. (default: {1000000})\n
+            batch_size {int} -- The amount of new comments that we pull per query, when a subreddit
+                                is added again. (default: {1000})"""
+
+        """MongDB collection that we will be pulling our reddit comments from."""
+        self.__reddit_collection = mongo_reddit_collection
+
+        """Used to turn every comment into stemmed tokens with no stop words."""
+        self.__comment_preprocessor = RedditPreprocessor(self.__reddit_collection, language=language)
+
+        """Maps a term to its column in the matrix, and the other way around."""
+        self.__term_ids = {}
+        self.__terms = []
+
+        """Maps a submission to its row in the matrix, and each row to the id of its subreddit."""
+        self.__submission_row_ids = {}
+        self.__row_subreddit_ids = array('i')
+
+        """Maps a subreddit name to its id, and the other way around."""
+        self.__subreddit_ids = {}
+        self.__subreddit_names = []
+
+        """The ids of every comment that we have added. Comments are not stored in the order that
+        they were made (or in the order of their ids), so this is how we know which comments of a
+        subreddit are new the next time it is added."""
+        self.__added_comment_ids = set()
+        self.__batch_size = batch_size
+
+        """Tokens that have not yet been added to the matrix. They are added in batches."""
+        self.__buffered_row_ids = array('i')
+        self.__buffered_term_ids = array('i')
+        self.__max_buffered_tokens = max_buffered_tokens
+
+        """The submission x term matrix of counts."""
+        self.__term_counts = sparse.csr_matrix((0, 0), dtype=np.float64)
+
+
+    # PRIVATE METHODS__________________________________________________________________________________
+
+
+    def __get_row_id(self, submission_id, subreddit_name):
+        """(Helper method)\n
+        Return the row of a submission, making a new one if it does not have one yet."""
+
+        if submission_id not in self.__submission_row_ids:
+            if subreddit_name not in self.__subreddit_ids:
+                self.__subreddit_ids[subreddit_name] = len(self.__subreddit_names)
+                self.__subreddit_names.append(subreddit_name)
+
+            self.__submission_row_ids[submission_id] = len(self.__row_subreddit_ids)
+            self.__row_subreddit_ids.append(self.__subreddit_ids[subreddit_name])
+
+        return self.__submission_row_ids[submission_id]
+
+
+    def __flush_buffered_tokens(self):
+        """(Helper method)\n
+        Add every buffered token to our count matrix. Duplicate (row, term) pairs are summed."""
+
+        number_of_rows = len(self.__row_subreddit_ids)
+        number_of_terms = len(self.__terms)
+
+        buffered_term_counts = sparse.coo_matrix(
+            (np.ones(len(self.__buffered_term_ids)),
+             (np.frombuffer(self.__buffered_row_ids, dtype=np.int32),
+              np.frombuffer(self.__buffered_term_ids, dtype=np.int32))),
+            shape=(number_of_rows, number_of_terms)).tocsr()
+
+        # New submissions and terms might have shown up since the last time we flushed.
+        self.__term_counts.resize((number_of_rows, number_of_terms))
+        self.__term_counts = self.__term_counts + buffered_term_counts
+
+        self.__buffered_row_ids = array('i')
+        self.__buffered_term_ids = array('i')
+
+
+    def __get_new_comment_ids(self, comments_query):
+        """(Helper method)\n
+        Return the ids of the comments that match a query which we have not added yet."""
+
+        return [comment['_id'] for comment in self.__reddit_collection.find(comments_query, {'_id': 1})
+                if comment['_id'] not in self.__added_comment_ids]
+
+
+    def __get_tfidf_matrix(self, document_term_counts):
+        """(Helper method)\n
+        Return the L2 normalized TF-IDF matrix of a matrix of document x term counts.
+        We use the smoothed idf: log((1 + number of documents) / (1 + document frequency)) + 1."""
+
+        number_of_documents = document_term_counts.shape[0]
+        document_frequencies = np.asarray((document_term_counts > 0).sum(axis=0)).ravel()
+        inverse_document_frequencies = np.log((1 + number_of_documents) / (1 + document_frequencies)) + 1
+
+        # Term frequency is the count of a term over the amount of terms in the document.
+        document_lengths = np.asarray(document_term_counts.sum(axis=1)).ravel()
+        document_lengths[document_lengths == 0] = 1
+        term_frequencies = sparse.diags(1 / document_lengths) @ document_term_counts
+
+        tfidf_matrix = term_frequencies @ sparse.diags(inverse_document_frequencies)
+
+        row_norms = np.sqrt(np.asarray(tfidf_matrix.multiply(tfidf_matrix).sum(axis=1)).ravel())
+        row_norms[row_norms == 0] = 1
+        return (sparse.diags(1 / row_norms) @ tfidf_matrix).tocsr()
+
+
+    def __get_subreddit_membership_matrix(self):
+        """(Helper method)\n
+        Return a subreddit x submission matrix, with a 1 where the submission is in the subreddit."""
+
+        number_of_rows = len(self.__row_subreddit_ids)
+        return sparse.csr_matrix((np.ones(number_of_rows),
+                                  (np.frombuffer(self.__row_subreddit_ids, dtype=np.int32),
+                                   np.arange(number_of_rows))),
+                                 shape=(len(self.__subreddit_names), number_of_rows))
+
+
+    # PUBLIC INTERFACE_________________________________________________________________________________
+
+
+    def add_comments(self, comment_records):
+        """Add comments to our term counts. Comments (with an _id) that were already added are skipped.
+
+        Arguments:\n
+            comment_records {iterable} -- Comment records as they are stored in mongo. Each one needs
+                                          at least the body, submission, and subreddit_name fields."""
+
+        for comment in comment_records:
+            if '_id' in comment:
+                if comment['_id'] in self.__added_comment_ids:
+                    continue
+                self.__added_comment_ids.add(comment['_id'])
+
+            row_id = self.__get_row_id(comment['submission'], comment['subreddit_name'])
+
+            comment_body = self.__comment_preprocessor.get_comment_body(comment)
+            for term in self.__comment_preprocessor.get_preprocessed_comment(comment_body).split():
+                term = term.lower()
+                if term not in self.__term_ids:
+                    self.__term_ids[term] = len(self.__terms)
+                    self.__terms.append(term)
+
+                self.__buffered_row_ids.append(row_id)
+                self.__buffered_term_ids.append(self.__term_ids[term])
+
+            if len(self.__buffered_term_ids) >= self.__max_buffered_tokens:
+                self.__flush_buffered_tokens()
+
+        self.__flush_buffered_tokens()
+
+
+    def add_subreddit(self, subreddit_name, sorting_type=None):
+        """Add the comments of a subreddit in our mongo collection to our term counts.
+        If the subreddit was already added, then only the bodies of the comments that we have not
+        added yet are pulled, so we never count a comment twice.
+
+        Arguments:\n
+            subreddit_name {str} -- The name of the subreddit that we are adding.
+
+        Keyword Arguments:\n
+            sorting_type {str} -- Only add comments of this sorting type. (default: {None})"""
+
+        comments_query = {'subreddit_name': subreddit_name}
+        if sorting_type:
+            comments_query['sorting_type'] = sorting_type
+        comment_projection = {'body': 1, 'submission': 1, 'subreddit_name': 1}
+
+        if subreddit_name not in self.__subreddit_ids:
+            self.add_comments(self.__reddit_collection.find(comments_query, comment_projection))
+            return
+
+        # Only the ids are pulled of every comment, the bodies only of the new ones.
+        new_comment_ids = self.__get_new_comment_ids(comments_query)
+        for batch_start in range(0, len(new_comment_ids), self.__batch_size):
+            self.add_comments(self.__reddit_collection.find(
+                {'_id': {'$in': new_comment_ids[batch_start: batch_start + self.__batch_size]}},
+                comment_projection))
+
+
+    def get_distinctive_terms(self, number_of_terms=10, document_level='subreddit'):
+        """Return the terms that set each subreddit apart from the other subreddits the most.
+
+        Keyword Arguments:\n
+            number_of_terms {int} -- The amount of terms we return for each subreddit. (default: {10})\n
+            document_level {str} -- Either 'subreddit' (every subreddit is one document) or
+                                    'submission' (every submission is a document, and the score of
+                                    a subreddit is the mean score of its submissions).
+                                    (default: {'subreddit'})
+
+        Raises:\n
+            ValueError: When document_level is not 'subreddit' or 'submission'.
+
+        Returns:\n
+            dict -- Maps each subreddit name to a list of (term, score) tuples, highest score first."""
+
+        if document_level not in {'subreddit', 'submission'}:
+            raise ValueError("document_level must be 'subreddit' or 'submission'.")
+
+        subreddit_membership = self.__get_subreddit_membership_matrix()
+
+        if document_level == 'subreddit':
+            subreddit_scores = \
+                self.__get_tfidf_matrix((subreddit_membership @ self.__term_counts).tocsr())
+        else:
+            submissions_per_subreddit = np.asarray(subreddit_membership.sum(axis=1)).ravel()
+            submissions_per_subreddit[submissions_per_subreddit == 0] = 1
+            subreddit_scores = (sparse.diags(1 / submissions_per_subreddit) @ subreddit_membership
+                                @ self.__get_tfidf_matrix(self.__term_counts)).tocsr()
+
+        distinctive_terms = {}
+        for subreddit_id, subreddit_name in enumerate(self.__subreddit_names):
+            row_start, row_end = subreddit_scores.indptr[subreddit_id: subreddit_id + 2]
+            row_scores = subreddit_scores.data[row_start: row_end]
+            row_term_ids = subreddit_scores.indices[row_start: row_end]
+
+            # We only need to fully sort the best number_of_terms scores.
+            if len(row_scores) > number_of_terms:
+                best_positions = np.argpartition(-row_scores, number_of_terms)[: number_of_terms]
+            else:
+                best_positions = np.arange(len(row_scores))
+            best_positions = best_positions[np.argsort(-row_scores[best_positions])]
+
+            distinctive_terms[subreddit_name] = [(self.__terms[row_term_ids[position]],
+                                                  float(row_scores[position]))
+                                                 for position in best_positions]
+
+        return distinctive_terms
+
+
+    def get_number_of_terms(self):
+        """Return the size of our vocabulary.
+
+        Returns:\n
+            int -- The amount of different terms that we have seen."""
+
+        return len(self.__terms)
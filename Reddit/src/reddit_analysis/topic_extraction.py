@@ -0,0 +1,107 @@
+"""
+@Author Eric Zair
+@File topic_extraction.py
+@Description: Contains an object, HeavyHitterTopicCounter, which is used for finding the hottest
+              topics (most frequent terms and bigrams) in a stream of preprocessed reddit comments.
+              The amount of memory that it uses is bounded, no matter how many different words
+              show up in the comments that it is fed.
+
+@package docstring
+"""
+
+
+class HeavyHitterTopicCounter():
+    """Streaming top-k counter for topics of preprocessed comments, using the Misra-Gries algorithm.
+
+    We only ever keep max_number_of_counters counters around. Every topic that appears more than
+    (number of topics counted) / (max_number_of_counters + 1) times is guaranteed to have a counter,
+    and every count is underestimated by at most that same amount."""
+
+
+    def __init__(self, max_number_of_counters=1000, include_bigrams=True):
+        """Constructs a HeavyHitterTopicCounter object.
+
+        Keyword Arguments:\n
+            max_number_of_counters {int} -- The max amount of topics that we keep counts for.
+                                            More counters means more accurate counts. (default: {1000})\n
+            include_bigrams {bool} -- True if pairs of neighbouring words in a comment count as
+                                      topics too; False if only single words do. (default: {True})
+
+        Raises:\n
+            ValueError: When max_number_of_counters is not positive."""
+
+        if max_number_of_counters <= 0:
+            raise ValueError('max_number_of_counters must be a positive number.')
+
+        """The max amount of counters that we can have at once, this bounds our memory use."""
+        self.__max_number_of_counters = max_number_of_counters
+
+        """Whether or not bigrams (e.g. 'graphic card') are counted as topics."""
+        self.__include_bigrams = include_bigrams
+
+        """Maps a topic to its (under estimated) count."""
+        self.__topic_counts = {}
+
+        """The total amount of topics that we have counted, used for the error bound."""
+        self.__number_of_topics_counted = 0
+
+
+    def add_topic(self, topic):
+        """Count one occurrence of a topic.
+
+        Arguments:\n
+            topic {str} -- The topic (a term or a bigram) that we are counting."""
+
+        self.__number_of_topics_counted += 1
+
+        if topic in self.__topic_counts:
+            self.__topic_counts[topic] += 1
+        elif len(self.__topic_counts) < self.__max_number_of_counters:
+            self.__topic_counts[topic] = 1
+        else:
+            # There is no room for the new topic, so every counter (and the new topic) loses one.
+            # The amount of decrements can never be more than the amount of increments, so this
+            # is constant time amortized.
+            for counted_topic in list(self.__topic_counts):
+                if self.__topic_counts[counted_topic] == 1:
+                    del self.__topic_counts[counted_topic]
+                else:
+                    self.__topic_counts[counted_topic] -= 1
+
+
+    def add_comment(self, preprocessed_comment):
+        """Count every topic in a comment that was preprocessed by a RedditPreprocessor.
+
+        Arguments:\n
+            preprocessed_comment {str} -- The preprocessed comment (space separated stemmed words)."""
+
+        words_in_comment = preprocessed_comment.lower().split()
+
+        for word in words_in_comment:
+            self.add_topic(word)
+
+        if self.__include_bigrams:
+            for first_word, second_word in zip(words_in_comment, words_in_comment[1:]):
+                self.add_topic(f'{first_word} {second_word}')
+
+
+    def get_max_count_error(self):
+        """Return the most that any count given by get_hottest_topics() can be under estimated by.
+
+        Returns:\n
+            int -- The max error of a count."""
+
+        return self.__number_of_topics_counted // (self.__max_number_of_counters + 1)
+
+
+    def get_hottest_topics(self, number_of_topics=10):
+        """Return the topics with the highest counts.
+
+        Keyword Arguments:\n
+            number_of_topics {int} -- The amount of topics that we return. (default: {10})
+
+        Returns:\n
+            list -- List of (topic, count) tuples, sorted from the highest count to the lowest."""
+
+        return sorted(self.__topic_counts.items(),
+                      key=lambda topic_count: topic_count[1], reverse=True)[: number_of_topics]
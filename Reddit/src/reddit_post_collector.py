@@ -12,22 +12,115 @@
 # Also for displaying help text.
 import argparse
 
-# For getting the status code for a subreddit on reddit.com
-import requests
-
-# Potential exceptions to catch.
-from pymongo.errors import DuplicateKeyError
-from prawcore.exceptions import NotFound
-
-# This is from our credentials lib (not an external lib).
-from credentials.reddit_credentials import API_INSTANCE
-from credentials.mongo_credentials import DB_COLLECTION
+# NOTE: Everything else (requests, pymongo, praw, our credentials, and the author index) is
+# imported inside of the functions that need it. Importing the credentials opens connections
+# to reddit and mongo, which --add and --remove never need.
 
 
 """Default location that program searches for our sub reddit list.
 Change this variable if you want run program on a different sub_reddit_list."""
 SUB_REDDIT_LIST = "sub_reddit_list.sub"
 
+"""The rate that we send requests to www.reddit.com at (which does not send rate limit headers),
+shared by every collector on this machine. Requests to the reddit api follow its headers instead."""
+WEB_REQUESTS_PER_SECOND = 0.5
+
+"""The most posts that reddit gives in one listing request (one page)."""
+MAX_POSTS_PER_LISTING_REQUEST = 100
+
+"""Name of the collection (in the same database as our comments) that holds the author index."""
+AUTHOR_INDEX_COLLECTION_NAME = "author_activity"
+
+"""The settings of a praw instance that are copied from the API_INSTANCE of our credentials."""
+REDDIT_API_SETTINGS = ('client_id', 'client_secret', 'user_agent', 'username', 'password',
+                       'refresh_token', 'redirect_uri')
+
+"""The rate limited praw instance, it is only made once."""
+_reddit_api_instance = None
+
+
+def get_rate_limited_reddit_api_instance(reddit_api):
+    """Returns a new praw instance with the same settings as reddit_api, whose requests all go
+    through the rate limiter that every collector on this machine shares.
+
+    Arguments:\n
+        reddit_api {Reddit} -- The praw instance whose settings are used.
+
+    Returns:\n
+        Reddit -- The rate limited praw instance."""
+
+    import praw
+    from praw.config import Config
+
+    # Every request goes through a rate limiter that all collectors on this machine share.
+    from reddit_analysis.rate_limiter import RateLimitedRequestor
+
+    reddit_api_settings = {setting_name: getattr(reddit_api.config, setting_name)
+                           for setting_name in REDDIT_API_SETTINGS
+                           if getattr(reddit_api.config, setting_name, None) not in
+                           (None, Config.CONFIG_NOT_SET)}
+    return praw.Reddit(requestor_class=RateLimitedRequestor, **reddit_api_settings)
+
+
+def get_reddit_api_instance():
+    """Returns a praw instance made from the API_INSTANCE of our reddit credentials, which are only
+    imported (and connected) the first time that they are needed. Its requests are rate limited,
+    even if the API_INSTANCE of the credentials is not.
+
+    Returns:\n
+        Reddit -- The rate limited praw instance."""
+
+    global _reddit_api_instance
+    if _reddit_api_instance is None:
+        from credentials.reddit_credentials import API_INSTANCE
+        _reddit_api_instance = get_rate_limited_reddit_api_instance(API_INSTANCE)
+    return _reddit_api_instance
+
+
+def get_db_collection():
+    """Returns the DB_COLLECTION from our mongo credentials, which is only imported (and connected)
+    the first time that it is needed.
+
+    Returns:\n
+        Collection -- The mongo collection that our comments are stored in."""
+
+    from credentials.mongo_credentials import DB_COLLECTION
+    return DB_COLLECTION
+
+
+def get_body_codec():
+    """Returns a CommentBodyCodec that keeps its dictionaries next to our comments.
+
+    Returns:\n
+        CommentBodyCodec -- Compresses and decompresses comment bodies."""
+
+    from reddit_analysis.body_compression import STORAGE_METADATA_COLLECTION_NAME, CommentBodyCodec
+    return CommentBodyCodec(get_db_collection().database[STORAGE_METADATA_COLLECTION_NAME])
+
+
+def get_submission_catalog():
+    """Returns a SubmissionCatalog that is stored next to our comments, with its indexes made, since
+    the collector is what writes to it.
+
+    Returns:\n
+        SubmissionCatalog -- Keeps one record per submission that we have comments of."""
+
+    from reddit_analysis.submission_catalog import SUBMISSION_CATALOG_COLLECTION_NAME, SubmissionCatalog
+    submission_catalog = \
+        SubmissionCatalog(get_db_collection().database[SUBMISSION_CATALOG_COLLECTION_NAME])
+    submission_catalog.ensure_indexes()
+    return submission_catalog
+
+
+def get_author_index():
+    """Returns an AuthorActivityIndex that is stored next to our comments.
+
+    Returns:\n
+        AuthorActivityIndex -- Keeps per-author, per-subreddit, per-day comment activity."""
+
+    from reddit_analysis.author_index import AuthorActivityIndex
+    return AuthorActivityIndex(get_db_collection().database[AUTHOR_INDEX_COLLECTION_NAME])
+
 
 def get_argument_parser_containing_program_flag_information():
     """Returns Loads up an argument_parser object with the value that the
@@ -56,11 +149,41 @@ def get_argument_parser_containing_program_flag_information():
 
     argument_to_execute.add_argument('--remove', help='Remove the subreddit '
                                                       'passed in by the user.')
+
+    argument_to_execute.add_argument('--train-body-dictionary', action='store_true',
+                                     help='Train a new zstd dictionary on the comments that are '
+                                          'already collected, used by --compress-bodies.')
+
+    argument_to_execute.add_argument('--compress-existing-bodies', action='store_true',
+                                     help='Compress the bodies of collected comments that are still '
+                                          'stored as plain text.')
+
+    argument_to_execute.add_argument('--rebuild-submission-catalog', action='store_true',
+                                     help='Build the submission catalog again from every comment '
+                                          'that is already collected.')
+
+    argument_to_execute.add_argument('--rebuild-author-index', action='store_true',
+                                     help='Build the author activity index again from every comment '
+                                          'that is already collected.')
+
+    # These go along with --collect, so they are not part of the group.
+    parser.add_argument('--compress-bodies', action='store_true',
+                        help='Store the bodies of newly collected comments compressed with the '
+                             'newest zstd dictionary.')
+
+    parser.add_argument('--posts-per-subreddit', type=int, default=200,
+                        help='The amount of posts that are collected of every subreddit.')
+
+    parser.add_argument('--subreddits-per-request', type=int, default=1,
+                        help='Request the posts of this many subreddits together, through '
+                             'reddit\'s combined "a+b+c" listing. Only saves requests when the '
+                             'posts of the subreddits fit in one request (100 posts), e.g. with '
+                             '--posts-per-subreddit 10.')
     return parser
 
 
 def add_sub_reddit_to_sub_file(parsed_command_line_arguments,
-                               path_to_sub_reddit_file=SUB_REDDIT_LIST, reddit=API_INSTANCE):
+                               path_to_sub_reddit_file=SUB_REDDIT_LIST, reddit=None):
     """Appends a sub_reddit to the end of the file that is given by the user.
 
     Arguments:\n
@@ -136,18 +259,101 @@ def sub_reddit_exists(sub_reddit_name):
     Returns:\n
         bool -- True if subreddit exists, False otherwise."""
 
+    # For getting the status code for a subreddit on reddit.com
+    import requests
+
+    # Every collector on this machine shares one rate limit for www.reddit.com, so running a
+    # few of them at once does not get us throttled.
+    from reddit_analysis.rate_limiter import WEB_BUCKET_NAME, SharedRateLimiter
+
     # The praw API Has NO way way of knowing if a subreddit exists or not.
     # I have tried insane amount of documentation on this.
     # Instead, we just get the status code of the website for the subreddit.
     # e.g. "reddit.com/r/<name_of_sub_reddit>/". If it is 404, then the subreddit
     # does not exist.
     sub_reddit_url = f'https://www.reddit.com/r/{sub_reddit_name}/'
-    sub_reddit_web_page = requests.get(url=sub_reddit_url)
+    web_rate_limiter = SharedRateLimiter(WEB_BUCKET_NAME, requests_per_second=WEB_REQUESTS_PER_SECOND)
+    sub_reddit_web_page = web_rate_limiter.send(lambda: requests.get(url=sub_reddit_url))
     return sub_reddit_web_page.status_code != 404
 
 
+def get_sub_reddit_listing(sub_reddit, sorted_by, number_of_posts, after_submission=None):
+    """Returns the listing of posts of a subreddit, which can also be a combined subreddit
+    like "a+b+c".
+
+    Arguments:\n
+        sub_reddit {Subreddit} -- The praw subreddit that we grab posts from.
+        sorted_by {str} -- Either 'hot', 'new', or 'top'.
+        number_of_posts {int} -- The max amount of posts in the listing.
+
+    Keyword Arguments:\n
+        after_submission {Submission} -- The listing starts right after this post, instead of at
+                                         the beginning. (default: {None})
+
+    Returns:\n
+        ListingGenerator -- The posts, which are only requested from reddit once iterated over."""
+
+    listing_parameters = {}
+    if after_submission is not None:
+        listing_parameters['after'] = after_submission.fullname
+
+    if sorted_by == 'hot':
+        return sub_reddit.hot(limit=number_of_posts, params=listing_parameters)
+    elif sorted_by == 'top':
+        return sub_reddit.top(limit=number_of_posts, params=listing_parameters)
+    elif sorted_by == 'new':
+        return sub_reddit.new(limit=number_of_posts, params=listing_parameters)
+    return []
+
+
+def get_combined_sub_reddit_submissions(sub_reddit_group, sorted_by, reddit_api, number_of_posts):
+    """Returns up to number_of_posts posts of every subreddit in a group, which are requested
+    together through reddit's combined "a+b+c" listing and then split back up by subreddit.
+
+    The combined listing is one request, so it holds at most MAX_POSTS_PER_LISTING_REQUEST posts.
+    A busy subreddit can push the posts of a quiet one out of it. Subreddits that did not get all
+    of their posts that way only request the posts they are missing on their own afterwards.
+
+    Arguments:\n
+        sub_reddit_group {list(str)} -- The names of the subreddits that we request together.
+        sorted_by {str} -- Either 'hot', 'new', or 'top'.
+        reddit_api {Reddit} -- API_INSTANCE used for the requests.
+        number_of_posts {int} -- The amount of posts that we want of every subreddit.
+
+    Returns:\n
+        list -- The posts of every subreddit of the group."""
+
+    submissions_of_sub_reddits = {sub_reddit.lower(): [] for sub_reddit in sub_reddit_group}
+    combined_listing_limit = min(number_of_posts * len(sub_reddit_group), MAX_POSTS_PER_LISTING_REQUEST)
+    number_of_posts_in_combined_listing = 0
+    for submission in get_sub_reddit_listing(reddit_api.subreddit('+'.join(sub_reddit_group)), sorted_by,
+                                             combined_listing_limit):
+        number_of_posts_in_combined_listing += 1
+        submissions_of_sub_reddit = \
+            submissions_of_sub_reddits.get(submission.subreddit.display_name.lower())
+        if submissions_of_sub_reddit is not None and len(submissions_of_sub_reddit) < number_of_posts:
+            submissions_of_sub_reddit.append(submission)
+
+    # If the combined listing ran out before its limit, every subreddit already gave all of its
+    # posts. Otherwise, the subreddits that came up short request the rest of their posts, starting
+    # after the last one that they got.
+    if number_of_posts_in_combined_listing == combined_listing_limit:
+        for sub_reddit in sub_reddit_group:
+            submissions_of_sub_reddit = submissions_of_sub_reddits[sub_reddit.lower()]
+            if len(submissions_of_sub_reddit) < number_of_posts:
+                last_submission = submissions_of_sub_reddit[-1] if submissions_of_sub_reddit else None
+                submissions_of_sub_reddit += \
+                    get_sub_reddit_listing(reddit_api.subreddit(sub_reddit), sorted_by,
+                                           number_of_posts - len(submissions_of_sub_reddit),
+                                           after_submission=last_submission)
+
+    return [submission for submissions_of_sub_reddit in submissions_of_sub_reddits.values()
+            for submission in submissions_of_sub_reddit]
+
+
 def get_collected_data_from_sub_reddits(list_of_sub_reddits, sorted_by,
-                                        reddit_api=API_INSTANCE, number_of_posts=200):
+                                        reddit_api=None, number_of_posts=200,
+                                        sub_reddits_per_request=1):
     """Given a list of sub-reddits from the user, we add all the comments
     made by reddit users to a list and then return it.
 
@@ -162,31 +368,51 @@ def get_collected_data_from_sub_reddits(list_of_sub_reddits, sorted_by,
                            grab post data from the hot category.
 
     Keyword Arguments:
-        reddit_api {Reddit} -- API_INSTANCE required to use the program
-                               (default: {API_INSTANCE})
+        reddit_api {Reddit} -- API_INSTANCE required to use the program. None means that we use
+                               the API_INSTANCE from our credentials. (default: {None})
+        number_of_posts {int} -- The amount of posts that we grab of every subreddit.
+                                 (default: {200})
+        sub_reddits_per_request {int} -- The amount of subreddits whose posts are requested
+                                         together, through reddit's combined "a+b+c" listing.
+                                         Reddit gives at most 100 posts per request, so groups
+                                         are made smaller until the posts of a group fit in one
+                                         request. (default: {1})
 
     Returns:\n
         {list(str)} -- List containing all comments from our the subreddits
                        that the user has in their sub reddit file."""
 
+    if reddit_api is None:
+        reddit_api = get_reddit_api_instance()
+
     # Cool, we can now load up a list of submissions from the subreddits that the
     # wants to collect data from. We grab as many posts from each as the user requests.
     # Hence the number_of_posts variable passed in.
-    sub_reddit_submissions = []
+    existing_sub_reddits = []
     for sub_reddit in list_of_sub_reddits:
         if sub_reddit_exists(sub_reddit):
-            if sorted_by == 'hot':
-                sub_reddit_submissions += \
-                    reddit_api.subreddit(sub_reddit).hot(limit=number_of_posts)
-            elif sorted_by == 'top':
-                sub_reddit_submissions += \
-                    reddit_api.subreddit(sub_reddit).top(limit=number_of_posts)
-            elif sorted_by == 'new':
-                sub_reddit_submissions += \
-                    reddit_api.subreddit(sub_reddit).new(limit=number_of_posts)
+            existing_sub_reddits.append(sub_reddit)
         else:
             print(f'Error: The subreddit "{sub_reddit}" does not exist. Skipping over it...\n')
 
+    # The posts of a group have to fit in one request, or the combined listing saves nothing.
+    max_sub_reddits_per_request = max(MAX_POSTS_PER_LISTING_REQUEST // max(number_of_posts, 1), 1)
+    if sub_reddits_per_request > max_sub_reddits_per_request:
+        print(f'Warning: {number_of_posts} posts of {sub_reddits_per_request} subreddits do not fit in '
+              f'one request, requesting {max_sub_reddits_per_request} subreddit(s) together instead.\n')
+        sub_reddits_per_request = max_sub_reddits_per_request
+
+    sub_reddit_submissions = []
+    if sub_reddits_per_request > 1:
+        for group_start in range(0, len(existing_sub_reddits), sub_reddits_per_request):
+            sub_reddit_submissions += get_combined_sub_reddit_submissions(
+                existing_sub_reddits[group_start: group_start + sub_reddits_per_request], sorted_by,
+                reddit_api, number_of_posts)
+    else:
+        for sub_reddit in existing_sub_reddits:
+            sub_reddit_submissions += \
+                get_sub_reddit_listing(reddit_api.subreddit(sub_reddit), sorted_by, number_of_posts)
+
     # Now we grab every single comment from every single post that we have grabbed.
     # This includes all comments that were replies to other comments.
     reddit_comments_from_given_sub_reddits = []
@@ -197,8 +423,57 @@ def get_collected_data_from_sub_reddits(list_of_sub_reddits, sorted_by,
     return reddit_comments_from_given_sub_reddits
 
 
+def get_comment_record(submission_comment, sorting_type):
+    """Return the record that a reddit comment is stored as in our mongo db database.
+
+    Arguments:\n
+        submission_comment {Comment} -- The praw comment that we are storing.
+        sorting_type {str} -- This is either 'hot', 'new', or 'top'.
+
+    Returns:\n
+        dict -- The comment record, with its body as plain text."""
+
+    # Potential exceptions to catch.
+    from prawcore.exceptions import NotFound
+
+    # This is a easier form to deal with when storing a comment into the database.
+    # Replies can later be looked up by their id, which is just so much easier.
+    replies = [comment.id for comment in submission_comment.replies]
+
+    try:
+        # Some of these comments do not have an author assignment to them
+        author_id = submission_comment.author.id \
+            if hasattr(submission_comment.author, 'id') else ""
+    except NotFound:
+        # The reddit fields can be really...really...really weird some times.
+        # This is a little safety net.
+        author_id = ""
+
+    return {
+        'author': author_id,
+        'body': submission_comment.body,
+        'created_at': submission_comment.created_utc,
+        'distinguished': submission_comment.distinguished,
+        'edited': submission_comment.edited,
+        '_id': submission_comment.id,
+        'is_submitter': submission_comment.is_submitter,
+        'link_id': submission_comment.link_id,
+        'parent_id': submission_comment.parent_id,
+        'replies': replies,
+        'score': submission_comment.score,
+        'stickied': submission_comment.stickied,
+        'submission': submission_comment.submission.id,
+        'subreddit_name': submission_comment.subreddit.display_name.lower(),
+        'subreddit_id': submission_comment.subreddit_id,
+
+        # This is the special custom field that I added for seeing what sorting type a sub reddit has.
+        'sorting_type': sorting_type
+    }
+
+
 def add_collected_data_to_database(reddit_submission_comments, sorting_type,
-                                   db_collection=DB_COLLECTION):
+                                   db_collection=None, author_index=None, body_codec=None,
+                                   near_duplicate_index=None, submission_catalog=None):
     """Put every reddit comment contained in "reddit_submission_comments" into
     the given mongo db database collection.
 
@@ -212,46 +487,59 @@ def add_collected_data_to_database(reddit_submission_comments, sorting_type,
 
     Keyword Arguments:\n
         db_collection {mongoDB Database} -- The database that we are putting
-                                            all of the reddit comments in.
-                                            (default: {DB_COLLECTION})"""
+                                            all of the reddit comments in. None means that we
+                                            use the DB_COLLECTION from our credentials.
+                                            (default: {None})
+        author_index {AuthorActivityIndex} -- Index that every newly added comment is added to.
+                                              None means that we do not index authors.
+                                              (default: {None})
+        body_codec {CommentBodyCodec} -- Compresses the body of every comment before it is stored.
+                                         None means that bodies are stored as plain text.
+                                         (default: {None})
+        near_duplicate_index {NearDuplicateIndex} -- Index that every newly added comment is added
+                                                     to, so that its near duplicates can be found.
+                                                     None means that we do not index them.
+                                                     (default: {None})
+        submission_catalog {SubmissionCatalog} -- Catalog that the submissions of the comments are
+                                                  added to. None means that we do not catalog them.
+                                                  (default: {None})"""
+
+    # Potential exceptions to catch.
+    from pymongo.errors import DuplicateKeyError
+
+    # Mongo collections can't be used as a bool, so we have to compare with None.
+    if db_collection is None:
+        db_collection = get_db_collection()
+
+    # Only comments that were not already in the database get indexed, otherwise an author
+    # would be counted again every time we collect the same submission.
+    newly_added_comment_records = []
+
+    # The catalog wants the time that each submission was made, not only its comments.
+    submission_created_times = {}
+
+    # Comments collected before the catalog existed are added to it first (once per subreddit),
+    # otherwise the catalog would only know the submissions collected from now on.
+    if submission_catalog:
+        submission_catalog.backfill_subreddits(
+            db_collection, {submission_comment.subreddit.display_name.lower()
+                            for submission_comment in reddit_submission_comments})
 
     for submission_comment in reddit_submission_comments:
-        # This is a easier form to deal with when storing a comment into the database.
-        # Replies can later be looked up by their id, which is just so much easier.
-        replies = [comment.id for comment in submission_comment.replies]
+        submission_created_times[submission_comment.submission.id] = \
+            submission_comment.submission.created_utc
 
-        try:
-            # Some of these comments do not have an author assignment to them
-            author_id = submission_comment.author.id \
-                if hasattr(submission_comment.author, 'id') else ""
-        except NotFound:
-            # The reddit fields can be really...really...really weird some times.
-            # This is a little safety net.
-            author_id = ""
-
-        submission_comment_record = {
-            'author': author_id,
-            'body': submission_comment.body,
-            'created_at': submission_comment.created_utc,
-            'distinguished': submission_comment.distinguished,
-            'edited': submission_comment.edited,
-            '_id': submission_comment.id,
-            'is_submitter': submission_comment.is_submitter,
-            'link_id': submission_comment.link_id,
-            'parent_id': submission_comment.parent_id,
-            'replies': replies,
-            'score': submission_comment.score,
-            'stickied': submission_comment.stickied,
-            'submission': submission_comment.submission.id,
-            'subreddit_name': submission_comment.subreddit.display_name.lower(),
-            'subreddit_id': submission_comment.subreddit_id,
-
-            # This is the special custom field that I added for seeing what sorting type a sub reddit has.
-            'sorting_type': sorting_type
-        }
+        submission_comment_record = get_comment_record(submission_comment, sorting_type)
+
+        # The author index is given the plain body, only the stored record is compressed.
+        stored_comment_record = submission_comment_record
+        if body_codec:
+            stored_comment_record = dict(submission_comment_record,
+                                         body=body_codec.compress_body(submission_comment.body))
 
         try:
-            db_collection.insert_one(submission_comment_record)
+            db_collection.insert_one(stored_comment_record)
+            newly_added_comment_records.append(submission_comment_record)
             print("Added Record:")
             print("__________________________________________________________")
             print(submission_comment_record)
@@ -259,6 +547,18 @@ def add_collected_data_to_database(reddit_submission_comments, sorting_type,
         except DuplicateKeyError:
             print("Duplicate record found, skipping over it...\n")
 
+    if author_index:
+        author_index.add_comments(newly_added_comment_records)
+
+    if near_duplicate_index:
+        number_of_near_duplicates = near_duplicate_index.add_comments(newly_added_comment_records)
+        print(f"{number_of_near_duplicates} of the added comments are near duplicates.")
+
+    if submission_catalog:
+        # Submissions with no new comments were still fetched again just now.
+        submission_catalog.mark_submissions_as_fetched(submission_created_times)
+        submission_catalog.add_comments(newly_added_comment_records, submission_created_times)
+
 
 def get_post_sorting_type_from_user():
     """Prompt the user to decide the sorting method that they will want to use to collect posts
@@ -290,6 +590,22 @@ def get_post_sorting_type_from_user():
         return 'top'
 
 
+def rebuild_index_from_collected_comments(parsed_command_line_arguments):
+    """Build the index that the user asked for (the submission catalog or the author activity
+    index) again from every comment that is already collected.
+
+    Arguments:\n
+        parsed_command_line_arguments {argparse.Namespace} -- The parsed command line arguments."""
+
+    if parsed_command_line_arguments.rebuild_submission_catalog:
+        number_of_submissions = \
+            get_submission_catalog().rebuild_from_comment_collection(get_db_collection())
+        print(f"{number_of_submissions} submissions have been added to the submission catalog.")
+    else:
+        number_of_comments = get_author_index().rebuild_from_comment_collection(get_db_collection())
+        print(f"{number_of_comments} comments have been added to the author activity index.")
+
+
 def main():
     # Argparse is used to grab the command line arguments that the user passed in.
     # Now that we have them, we can determine what they actually wanted to do
@@ -304,9 +620,34 @@ def main():
 
         print("\nCollecting data...")
         collected_data_from_subreddits = \
-            get_collected_data_from_sub_reddits(get_list_of_sub_reddits(), post_sorting_type)
-
-        add_collected_data_to_database(collected_data_from_subreddits, post_sorting_type)
+            get_collected_data_from_sub_reddits(get_list_of_sub_reddits(), post_sorting_type,
+                                                number_of_posts=\
+                                                    command_line_argument_parser.posts_per_subreddit,
+                                                sub_reddits_per_request=\
+                                                    command_line_argument_parser.subreddits_per_request)
+
+        # Per-author activity is indexed as comments are collected.
+        author_index = get_author_index()
+
+        # So are the MinHash signatures of comments, for finding bots and copypasta.
+        from reddit_analysis.near_duplicates import NEAR_DUPLICATE_COLLECTION_NAME, NearDuplicateIndex
+        near_duplicate_index = \
+            NearDuplicateIndex(get_db_collection().database[NEAR_DUPLICATE_COLLECTION_NAME])
+
+        # And the submissions that the comments belong to, so analysis never has to scan for them.
+        submission_catalog = get_submission_catalog()
+
+        body_codec = None
+        if command_line_argument_parser.compress_bodies:
+            body_codec = get_body_codec()
+            if body_codec.get_current_dictionary_version() is None:
+                print("No body dictionary has been trained yet (see --train-body-dictionary), "
+                      "bodies will be stored as plain text.")
+
+        add_collected_data_to_database(collected_data_from_subreddits, post_sorting_type,
+                                       author_index=author_index, body_codec=body_codec,
+                                       near_duplicate_index=near_duplicate_index,
+                                       submission_catalog=submission_catalog)
 
         print(f"\n{len(collected_data_from_subreddits)} comments have been collected.")
 
@@ -322,6 +663,23 @@ def main():
     elif command_line_argument_parser.remove:
         remove_sub_reddit_in_db_file(command_line_argument_parser)
 
+    # TRAIN a new dictionary for compressing comment bodies, or COMPRESS the bodies we already have.
+    elif command_line_argument_parser.train_body_dictionary or \
+            command_line_argument_parser.compress_existing_bodies:
+        body_codec = get_body_codec()
+
+        if command_line_argument_parser.train_body_dictionary:
+            version = body_codec.train_dictionary_from_comment_collection(get_db_collection())
+            print(f"Body dictionary version {version} has been trained.")
+        else:
+            number_of_bodies_compressed = body_codec.compress_comment_collection(get_db_collection())
+            print(f"{number_of_bodies_compressed} comment bodies have been compressed.")
+
+    # REBUILD the submission catalog or the author activity index from the comments we already have.
+    elif command_line_argument_parser.rebuild_submission_catalog or \
+            command_line_argument_parser.rebuild_author_index:
+        rebuild_index_from_collected_comments(command_line_argument_parser)
+
     # clearly the user entered something that was not valid or did not add a flag.
     else:
         arg_parser.print_help()
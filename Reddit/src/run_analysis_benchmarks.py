@@ -0,0 +1,184 @@
+"""
+@Author Eric Zair
+@File run_analysis_benchmarks.py
+@Description: Benchmarks the SubredditAnalyzer on synthetic reddit corpora of different sizes.
+              Every corpus is loaded into either a local mongod or mongomock (no production
+              database needed), and the time spent in every stage of the analysis (querying,
+              cursor iteration, preprocessing, scoring, and aggregating), as measured by
+              AnalysisStats, is written to a json file, so runs can be compared for regressions.
+
+@package docstring
+"""
+# For the command line flags of the benchmark.
+import argparse
+
+# For writing the machine readable results and describing the machine they came from.
+import datetime
+import json
+import platform
+import time
+
+from benchmarks.synthetic_corpus import load_synthetic_corpus
+from reddit_analysis.analysis_stats import ANALYSIS_STAGES, AnalysisStats
+from reddit_analysis.comment_analysis import SubredditAnalyzer
+
+
+"""Name of the database that the corpora are loaded into when a real mongod is used.
+It is dropped before every corpus is loaded, so never point this at real data."""
+BENCHMARK_DATABASE_NAME = 'reddit_benchmark'
+
+
+def get_argument_parser_containing_program_flag_information():
+    """Returns an argument_parser object with the flags of the benchmark.
+
+    Returns:\n
+        parser {argparse.ArgumentParser} -- The argument parser."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help='The amount of comments of each corpus that we benchmark on.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the synthetic corpus generator.')
+    parser.add_argument('--number-of-subreddits', type=int, default=5,
+                        help='The amount of subreddits that the comments are spread over.')
+    parser.add_argument('--max-submissions', type=int, default=20,
+                        help='The amount of submissions analyzed by the submission benchmark.')
+    parser.add_argument('--mongo-uri', default=None,
+                        help='URI of a local mongod to benchmark against. '
+                             'mongomock is used when this is not given.')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='Path of the json file that the results are written to.')
+    return parser
+
+
+def get_benchmark_collection(mongo_uri=None):
+    """Return an empty collection to load a corpus into.
+
+    Keyword Arguments:\n
+        mongo_uri {str} -- URI of a local mongod. None means mongomock is used. (default: {None})
+
+    Returns:\n
+        Collection -- The empty collection."""
+
+    if mongo_uri:
+        from pymongo import MongoClient
+        mongo_client = MongoClient(mongo_uri)
+    else:
+        # Only needed when no real database is given.
+        import mongomock
+        mongo_client = mongomock.MongoClient()
+
+    mongo_client.drop_database(BENCHMARK_DATABASE_NAME)
+    return mongo_client[BENCHMARK_DATABASE_NAME]['post_comment']
+
+
+def get_benchmark_results(benchmark_name, corpus_size, analysis_stats, total_time):
+    """Return the result records of one benchmark, one per stage of the analysis plus the total.
+
+    Arguments:\n
+        benchmark_name {str} -- The name of the benchmark, e.g. 'analyze_subreddit'.
+        corpus_size {int} -- The amount of comments in the corpus.
+        analysis_stats {AnalysisStats} -- The stats that the analysis filled in.
+        total_time {float} -- The amount of seconds that the full analysis took.
+
+    Returns:\n
+        list -- List of {'benchmark', 'corpus_size', 'stage', 'wall_time', 'cpu_time', 'items'} dicts."""
+
+    stage_totals = analysis_stats.get_stage_totals()
+
+    benchmark_results = [{'benchmark': benchmark_name, 'corpus_size': corpus_size, 'stage': stage_name,
+                          'wall_time': stage_totals[stage_name]['wall_time'],
+                          'cpu_time': stage_totals[stage_name]['cpu_time'],
+                          'items': stage_totals[stage_name]['items']}
+                         for stage_name in ANALYSIS_STAGES if stage_name in stage_totals]
+
+    benchmark_results.append({'benchmark': benchmark_name, 'corpus_size': corpus_size, 'stage': 'total',
+                              'wall_time': total_time,
+                              'cpu_time': sum(stage['cpu_time'] for stage in stage_totals.values()),
+                              'items': stage_totals.get('vader_scoring', {}).get('items', 0)})
+    return benchmark_results
+
+
+def run_benchmarks_on_corpus(reddit_collection, corpus_size, max_submissions):
+    """Run every benchmark on the corpus that is loaded in a collection.
+
+    Arguments:\n
+        reddit_collection {Collection} -- The collection holding the corpus.
+        corpus_size {int} -- The amount of comments in the corpus.
+        max_submissions {int} -- The amount of submissions analyzed by the submission benchmark.
+
+    Returns:\n
+        list -- The result records of every benchmark."""
+
+    analyzer = SubredditAnalyzer(reddit_collection)
+    subreddit_names = sorted(reddit_collection.distinct('subreddit_name'))
+    benchmark_results = []
+
+    # analyze_submission, on the submissions with the most comments.
+    biggest_submissions = reddit_collection.aggregate([
+        {'$group': {'_id': '$submission', 'comments': {'$sum': 1}}},
+        {'$sort': {'comments': -1}},
+        {'$limit': max_submissions}
+    ])
+    submission_ids = [submission['_id'] for submission in biggest_submissions]
+
+    analysis_stats = AnalysisStats()
+    start_time = time.perf_counter()
+    for submission_id in submission_ids:
+        analyzer.analyze_submission(submission_id, analysis_stats=analysis_stats)
+    benchmark_results += get_benchmark_results('analyze_submission', corpus_size, analysis_stats,
+                                               time.perf_counter() - start_time)
+
+    # analyze_subreddit, on the first subreddit.
+    analysis_stats = AnalysisStats()
+    start_time = time.perf_counter()
+    analyzer.analyze_subreddit(subreddit_names[0], analysis_stats=analysis_stats)
+    benchmark_results += get_benchmark_results('analyze_subreddit', corpus_size, analysis_stats,
+                                               time.perf_counter() - start_time)
+
+    # The ranking methods, over every subreddit.
+    for ranking_method_name in ['get_most_positive_subreddit_analysis_results',
+                                'get_most_negative_subreddit_analysis_results']:
+        analysis_stats = AnalysisStats()
+        start_time = time.perf_counter()
+        getattr(analyzer, ranking_method_name)(subreddit_names, analysis_stats=analysis_stats)
+        benchmark_results += get_benchmark_results(ranking_method_name, corpus_size, analysis_stats,
+                                                   time.perf_counter() - start_time)
+
+    return benchmark_results
+
+
+def main():
+    command_line_arguments = get_argument_parser_containing_program_flag_information().parse_args()
+
+    all_benchmark_results = []
+    for corpus_size in command_line_arguments.sizes:
+        reddit_collection = get_benchmark_collection(command_line_arguments.mongo_uri)
+
+        start_time = time.perf_counter()
+        number_of_comments = load_synthetic_corpus(reddit_collection, corpus_size,
+                                                   number_of_subreddits=\
+                                                       command_line_arguments.number_of_subreddits,
+                                                   seed=command_line_arguments.seed)
+        print(f'Loaded {number_of_comments} comments in {time.perf_counter() - start_time:.2f}s')
+
+        corpus_benchmark_results = run_benchmarks_on_corpus(reddit_collection, number_of_comments,
+                                                            command_line_arguments.max_submissions)
+        for result in corpus_benchmark_results:
+            print(f"{result['corpus_size']:>8} {result['benchmark']:<45} {result['stage']:<17} "
+                  f"{result['wall_time']:.4f}s wall {result['cpu_time']:.4f}s cpu")
+        all_benchmark_results += corpus_benchmark_results
+
+    with open(command_line_arguments.output, 'w') as results_file:
+        json.dump({'created_at': datetime.datetime.now().isoformat(),
+                   'python_version': platform.python_version(),
+                   'machine': platform.platform(),
+                   'backend': 'mongod' if command_line_arguments.mongo_uri else 'mongomock',
+                   'seed': command_line_arguments.seed,
+                   'results': all_benchmark_results}, results_file, indent=4)
+
+    print(f'\nResults written to {command_line_arguments.output}')
+
+
+if __name__ == '__main__':
+    main()
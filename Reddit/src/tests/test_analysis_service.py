@@ -0,0 +1,126 @@
+"""
+@Author Eric Zair
+@File test_analysis_service.py
+@Description: Tests for how the analysis service merges, batches, and checks requests, run against
+              a fake analyzer.
+
+@package docstring
+"""
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from analysis_service import AnalysisRequestBatcher, AnalysisRequestHandler
+
+
+class FakeAnalyzer():
+    """Records every call, and holds analyze_submissions() until it is released."""
+
+
+    def __init__(self):
+        self.analyze_submissions_calls = []
+        self.analyze_subreddit_calls = []
+        self.release = threading.Event()
+
+
+    def analyze_submissions(self, submission_ids, sorting_type=None):
+        self.release.wait(5)
+        self.analyze_submissions_calls.append((list(submission_ids), sorting_type))
+        return {submission_id: {'positive': 1.0, 'negative': 0.0} for submission_id in submission_ids}
+
+
+    def analyze_subreddit(self, subreddit_name, **keyword_arguments):
+        self.analyze_subreddit_calls.append(subreddit_name)
+        return {'positive': 0.5, 'negative': 0.5}
+
+
+class TestAnalysisRequestBatcher(unittest.TestCase):
+
+
+    def setUp(self):
+        self.analyzer = FakeAnalyzer()
+        self.request_batcher = AnalysisRequestBatcher(self.analyzer, batch_window_in_seconds=0.05)
+
+
+    def test_same_requests_are_merged(self):
+        first_future = self.request_batcher.submit('analyze_submission', {'submission_id': 'a'})
+        second_future = self.request_batcher.submit('analyze_submission', {'submission_id': 'a'})
+        self.analyzer.release.set()
+
+        self.assertIs(first_future, second_future)
+        self.assertEqual(first_future.result(5), {'positive': 1.0, 'negative': 0.0})
+        self.assertEqual(self.analyzer.analyze_submissions_calls, [(['a'], None)])
+
+
+    def test_submission_requests_that_come_in_together_are_batched(self):
+        submission_futures = [self.request_batcher.submit('analyze_submission',
+                                                          {'submission_id': submission_id,
+                                                           'sorting_type': 'top'})
+                              for submission_id in ['a', 'b', 'c']]
+        subreddit_future = self.request_batcher.submit('analyze_subreddit', {'subreddit_name': 'pics'})
+        self.analyzer.release.set()
+
+        for submission_future in submission_futures:
+            submission_future.result(5)
+        subreddit_future.result(5)
+
+        self.assertEqual(len(self.analyzer.analyze_submissions_calls), 1)
+        self.assertEqual(sorted(self.analyzer.analyze_submissions_calls[0][0]), ['a', 'b', 'c'])
+        self.assertEqual(self.analyzer.analyze_submissions_calls[0][1], 'top')
+        self.assertEqual(self.analyzer.analyze_subreddit_calls, ['pics'])
+
+
+    def test_a_bad_request_does_not_fail_the_rest_of_its_batch(self):
+        good_future = self.request_batcher.submit('analyze_submission', {'submission_id': 'a'})
+        bad_future = self.request_batcher.submit('analyze_submission', {'sorting_type': None})
+        self.analyzer.release.set()
+
+        self.assertEqual(good_future.result(5), {'positive': 1.0, 'negative': 0.0})
+        with self.assertRaises(ValueError):
+            bad_future.result(5)
+
+
+class TestAnalysisRequestHandler(unittest.TestCase):
+
+
+    def setUp(self):
+        self.analyzer = FakeAnalyzer()
+        self.analyzer.release.set()
+        AnalysisRequestHandler.request_batcher = AnalysisRequestBatcher(self.analyzer)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), AnalysisRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.service_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def get_status_and_content(self, path):
+        try:
+            with urlopen(self.service_url + path, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as error:
+            return error.code, json.loads(error.read())
+
+
+    def test_requests_are_answered(self):
+        self.assertEqual(self.get_status_and_content('/analyze_submission?submission_id=a'),
+                         (200, {'positive': 1.0, 'negative': 0.0}))
+
+
+    def test_bad_requests_are_rejected_before_they_are_analyzed(self):
+        for path in ['/analyze_submission?sorting_type=top', '/analyze_submission?submission=a',
+                     '/analyze_subreddit?max_number_of_comments_to_analyze=ten']:
+            self.assertEqual(self.get_status_and_content(path)[0], 400)
+        self.assertEqual(self.get_status_and_content('/analyze_everything')[0], 404)
+        self.assertEqual(self.analyzer.analyze_submissions_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
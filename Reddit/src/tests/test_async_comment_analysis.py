@@ -0,0 +1,154 @@
+"""
+@Author Eric Zair
+@File test_async_comment_analysis.py
+@Description: Tests that AsyncSubredditAnalyzer gives the same results as SubredditAnalyzer, run
+              against mongomock behind a fake async driver.
+
+@package docstring
+"""
+import asyncio
+import threading
+import unittest
+
+import mongomock
+
+from reddit_analysis.analysis_stats import AnalysisStats
+from reddit_analysis.async_comment_analysis import AsyncSubredditAnalyzer
+from reddit_analysis.comment_analysis import SubredditAnalyzer
+from reddit_analysis.near_duplicates import NEAR_DUPLICATE_COLLECTION_NAME, NearDuplicateIndex
+
+
+class FakeAsyncCursor():
+
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+
+    def sort(self, *sort_arguments):
+        self.cursor = self.cursor.sort(*sort_arguments)
+        return self
+
+
+    def limit(self, number_of_records):
+        self.cursor = self.cursor.limit(number_of_records)
+        return self
+
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class FakeAsyncDatabase():
+
+
+    def __init__(self, database):
+        self.database = database
+
+
+    def __getitem__(self, collection_name):
+        return FakeAsyncCollection(self.database[collection_name])
+
+
+class FakeAsyncCollection():
+    """The part of motor's collection interface that AsyncSubredditAnalyzer uses."""
+
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.database = FakeAsyncDatabase(collection.database)
+
+
+    def find(self, *find_arguments):
+        return FakeAsyncCursor(self.collection.find(*find_arguments))
+
+
+    async def find_one(self, *find_arguments):
+        return self.collection.find_one(*find_arguments)
+
+
+    async def distinct(self, field_name, query=None):
+        return self.collection.distinct(field_name, query)
+
+
+class FakeBodyCodec():
+    """Stores bodies as utf-8 bytes, and remembers the threads that bodies were read in."""
+
+
+    def __init__(self):
+        self.decompressing_threads = set()
+
+
+    def decompress_body(self, stored_body):
+        self.decompressing_threads.add(threading.current_thread())
+        return bytes(stored_body).decode('utf-8')
+
+
+class TestAsyncSubredditAnalyzer(unittest.TestCase):
+
+
+    def setUp(self):
+        database = mongomock.MongoClient().db
+        self.comment_collection = database.post_comment
+
+        comment_bodies_of_submissions = {
+            'a': ['I love this so much, thank you', 'I love this so much, thank you!', 'awful'],
+            'b': ['this is terrible and sad', 'great job everyone', 'great job everyone'],
+            'c': ['meh', 'what a wonderful day']
+        }
+        comment_records = [{'_id': f'{submission_id}{comment_number}', 'body': comment_body,
+                            'submission': submission_id, 'subreddit_name': 'pics',
+                            'sorting_type': 'hot'}
+                           for submission_id, comment_bodies in comment_bodies_of_submissions.items()
+                           for comment_number, comment_body in enumerate(comment_bodies)]
+        NearDuplicateIndex(database[NEAR_DUPLICATE_COLLECTION_NAME]).add_comments(comment_records)
+
+        # Bodies of the async collection are stored "compressed", the sync one reads plain text.
+        self.comment_collection.insert_many(comment_records)
+        self.async_comment_collection = database.async_post_comment
+        self.async_comment_collection.insert_many(
+            [dict(comment_record, body=comment_record['body'].encode('utf-8'))
+             for comment_record in comment_records])
+
+        self.body_codec = FakeBodyCodec()
+        self.analyzer = SubredditAnalyzer(self.comment_collection)
+        self.async_analyzer = AsyncSubredditAnalyzer(FakeAsyncCollection(self.async_comment_collection),
+                                                     body_codec=self.body_codec)
+
+
+    def test_results_match_the_sync_analyzer(self):
+        for duplicate_handling in [None, 'collapse', 'exclude']:
+            self.assertEqual(
+                asyncio.run(self.async_analyzer.analyze_subreddit(
+                    'pics', duplicate_handling=duplicate_handling)),
+                self.analyzer.analyze_subreddit('pics', duplicate_handling=duplicate_handling))
+            self.assertEqual(
+                asyncio.run(self.async_analyzer.analyze_submission(
+                    'a', duplicate_handling=duplicate_handling)),
+                self.analyzer.analyze_submission('a', duplicate_handling=duplicate_handling))
+
+        # Bodies are only decompressed in the executor, never on the event loop.
+        self.assertTrue(self.body_codec.decompressing_threads)
+        self.assertNotIn(threading.main_thread(), self.body_codec.decompressing_threads)
+
+
+    def test_stages_are_measured(self):
+        analysis_stats = AnalysisStats()
+        asyncio.run(self.async_analyzer.analyze_subreddit('pics', analysis_stats=analysis_stats,
+                                                          duplicate_handling='collapse'))
+
+        stage_totals = analysis_stats.get_stage_totals()
+        self.assertEqual(set(stage_totals), {'mongo_query', 'cursor_iteration', 'preprocessing',
+                                             'vader_scoring', 'aggregation'})
+        # One comment of each pair of near duplicates is left out.
+        self.assertEqual(stage_totals['vader_scoring']['items'], 6)
+        self.assertEqual(set(analysis_stats.get_submission_stage_totals()), {'a', 'b', 'c'})
+
+
+    def test_bad_duplicate_handling_is_rejected(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.async_analyzer.analyze_subreddit('pics', duplicate_handling='merge'))
+
+
+if __name__ == '__main__':
+    unittest.main()
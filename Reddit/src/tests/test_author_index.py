@@ -0,0 +1,81 @@
+"""
+@Author Eric Zair
+@File test_author_index.py
+@Description: Tests for how AuthorActivityIndex adds up the activity of authors, run against
+              mongomock.
+
+@package docstring
+"""
+import unittest
+
+import mongomock
+
+from reddit_analysis.author_index import SECONDS_PER_DAY, AuthorActivityIndex
+
+
+def get_comment_record(comment_id, author, comment_body, created_at, subreddit_name='pics'):
+    return {'_id': comment_id, 'author': author, 'body': comment_body, 'submission': 'a',
+            'subreddit_name': subreddit_name, 'created_at': created_at}
+
+
+class TestAuthorActivityIndex(unittest.TestCase):
+
+
+    def setUp(self):
+        database = mongomock.MongoClient().db
+        self.comment_collection = database.post_comment
+        self.author_collection = database.author_activity
+        self.author_index = AuthorActivityIndex(self.author_collection)
+
+        self.comment_records = [
+            get_comment_record('a', 'alice', 'I love this so much', 10),
+            get_comment_record('b', 'alice', 'this is awful and sad', 20),
+            get_comment_record('c', 'alice', 'great photo', SECONDS_PER_DAY + 5),
+            get_comment_record('d', 'bob', 'terrible, I hate it', 30),
+            get_comment_record('e', 'bob', 'I love it, so happy', 40, subreddit_name='aww'),
+            get_comment_record('f', '', 'I love it', 50)
+        ]
+        self.comment_collection.insert_many(self.comment_records)
+
+
+    def get_index_records(self):
+        return {(record['author'], record['subreddit_name'], record['day']):
+                {field_name: record[field_name]
+                 for field_name in ['comment_count', 'positive_count', 'negative_count',
+                                    'first_comment_at', 'last_comment_at']}
+                for record in self.author_collection.find()}
+
+
+    def test_batches_of_the_same_day_are_added_up(self):
+        self.assertEqual(self.author_index.add_comments(self.comment_records[: 1]), 1)
+        self.assertEqual(self.author_index.add_comments(self.comment_records[1:]), 4)
+
+        self.assertEqual(self.get_index_records(), {
+            ('alice', 'pics', 0): {'comment_count': 2, 'positive_count': 1, 'negative_count': 1,
+                                   'first_comment_at': 10, 'last_comment_at': 20},
+            ('alice', 'pics', 1): {'comment_count': 1, 'positive_count': 1, 'negative_count': 0,
+                                   'first_comment_at': SECONDS_PER_DAY + 5,
+                                   'last_comment_at': SECONDS_PER_DAY + 5},
+            ('bob', 'pics', 0): {'comment_count': 1, 'positive_count': 0, 'negative_count': 1,
+                                 'first_comment_at': 30, 'last_comment_at': 30},
+            ('bob', 'aww', 0): {'comment_count': 1, 'positive_count': 1, 'negative_count': 0,
+                                'first_comment_at': 40, 'last_comment_at': 40}
+        })
+
+        top_authors = self.author_index.get_top_authors(subreddit_name='pics', end_time=100)
+        self.assertEqual([(top_author['author'], top_author['comment_count'])
+                          for top_author in top_authors], [('alice', 2), ('bob', 1)])
+
+
+    def test_rebuilding_matches_adding_comments(self):
+        self.author_index.add_comments(self.comment_records)
+        index_records = self.get_index_records()
+
+        # Rebuilding throws the old records away, so nothing is counted twice.
+        self.assertEqual(self.author_index.rebuild_from_comment_collection(self.comment_collection,
+                                                                           batch_size=2), 5)
+        self.assertEqual(self.get_index_records(), index_records)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+@Author Eric Zair
+@File test_estimated_analysis.py
+@Description: Tests for the sampled estimates of SubredditAnalyzer, run against mongomock.
+
+@package docstring
+"""
+import unittest
+
+import mongomock
+
+from reddit_analysis.comment_analysis import SubredditAnalyzer
+
+
+class TestEstimatedAnalysis(unittest.TestCase):
+
+
+    def setUp(self):
+        self.comment_collection = mongomock.MongoClient().db.post_comment
+
+        comment_bodies_of_submissions = {'big': ['I love it', 'this is awful', 'great'] * 20,
+                                         'small': ['I hate this'],
+                                         'pair': ['I love it', 'terrible']}
+        self.comment_collection.insert_many(
+            [{'_id': f'{submission_id}{comment_number}', 'body': comment_body,
+              'submission': submission_id, 'subreddit_name': 'pics', 'sorting_type': 'hot'}
+             for submission_id, comment_bodies in comment_bodies_of_submissions.items()
+             for comment_number, comment_body in enumerate(comment_bodies)])
+
+        self.analyzer = SubredditAnalyzer(self.comment_collection)
+
+
+    def test_every_comment_of_a_subreddit_is_sampled_once(self):
+        estimated_results = self.analyzer.estimate_subreddit_analysis_results(
+            'pics', target_margin_of_error=0.0001, max_seconds_to_analyze=60, sample_batch_size=100)
+
+        self.assertEqual(estimated_results['number_of_comments_sampled'], 63)
+        self.assertEqual(estimated_results['number_of_comments_in_population'], 63)
+        self.assertEqual(estimated_results['margin_of_error'], 0)
+
+
+    def test_sampling_every_comment_of_a_submission_matches_analyzing_it(self):
+        estimated_results = self.analyzer.estimate_submission_analysis_results(
+            'big', target_margin_of_error=0.0001, max_seconds_to_analyze=60, sample_batch_size=100)
+        analysis_results = self.analyzer.analyze_submission('big')
+
+        self.assertEqual(estimated_results['number_of_comments_sampled'], 60)
+        self.assertAlmostEqual(estimated_results['positive'], analysis_results['positive'])
+        self.assertAlmostEqual(estimated_results['negative'], analysis_results['negative'])
+
+
+    def test_small_submissions_are_not_left_out_of_the_estimate(self):
+        uneven_comment_collection = mongomock.MongoClient().db.uneven_post_comment
+        uneven_comment_collection.insert_many(
+            [{'_id': f'big{comment_number}', 'body': 'I love it', 'submission': 'big',
+              'subreddit_name': 'pics'} for comment_number in range(600)] +
+            [{'_id': f'small{submission_number}_{comment_number}', 'body': 'I hate this',
+              'submission': f'small{submission_number}', 'subreddit_name': 'pics'}
+             for submission_number in range(60) for comment_number in range(10)])
+        analyzer = SubredditAnalyzer(uneven_comment_collection)
+
+        exact_results = analyzer.estimate_subreddit_analysis_results(
+            'pics', target_margin_of_error=0.0001, max_seconds_to_analyze=60, sample_batch_size=2000)
+        estimated_results = analyzer.estimate_subreddit_analysis_results(
+            'pics', target_margin_of_error=0.05, max_seconds_to_analyze=60, sample_batch_size=50)
+
+        # Every submission is sampled, and their comments are all alike, so nothing is left to guess.
+        self.assertEqual(exact_results['number_of_comments_sampled'], 1200)
+        self.assertLess(estimated_results['number_of_comments_sampled'], 1200)
+        self.assertAlmostEqual(estimated_results['positive'], exact_results['positive'])
+        self.assertAlmostEqual(estimated_results['margin_of_error'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
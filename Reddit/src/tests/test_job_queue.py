@@ -0,0 +1,119 @@
+"""
+@Author Eric Zair
+@File test_job_queue.py
+@Description: Tests for AnalysisJobQueue, run against mongomock, so no mongod is needed.
+              Run them from the src directory with "python -m pytest tests".
+
+@package docstring
+"""
+# Leases are made to run out by waiting a little longer than them.
+import time
+import unittest
+
+import mongomock
+
+from reddit_analysis.job_queue import DONE, FAILED, PENDING, RUNNING, AnalysisJobQueue
+
+
+class FakeAnalyzer():
+    """Stands in for SubredditAnalyzer, every submission is 100% positive."""
+
+
+    def __init__(self, submission_ids, number_of_failures=0):
+        self.submission_ids = list(submission_ids)
+        self.number_of_failures = number_of_failures
+
+
+    def get_subreddit_submission_ids(self, subreddit_name, sorting_type=None,
+                                     max_number_of_submissions=0):
+        if max_number_of_submissions:
+            return self.submission_ids[: max_number_of_submissions]
+        return list(self.submission_ids)
+
+
+    def analyze_submissions(self, submission_ids, sorting_type=None):
+        if self.number_of_failures:
+            self.number_of_failures -= 1
+            raise RuntimeError('mongo went away')
+        return {submission_id: {'positive': 1, 'negative': 0} for submission_id in submission_ids}
+
+
+class TestAnalysisJobQueue(unittest.TestCase):
+
+
+    def setUp(self):
+        database = mongomock.MongoClient().db
+        self.jobs_collection = database.analysis_jobs
+        self.results_collection = database.analysis_results
+        self.task = {'subreddit_name': 'battlestations'}
+
+
+    def get_job_queue(self, lease_in_seconds=120, max_attempts=3):
+        return AnalysisJobQueue(self.jobs_collection, self.results_collection,
+                                lease_in_seconds=lease_in_seconds, max_attempts=max_attempts)
+
+
+    def test_unit_with_expired_lease_is_claimed_again(self):
+        job_queue = self.get_job_queue(lease_in_seconds=0.05, max_attempts=2)
+        job_queue.submit_task(self.task, FakeAnalyzer(['a', 'b']), submissions_per_unit=2)
+
+        self.assertEqual(job_queue.claim_unit('dead-worker')['attempts'], 1)
+        self.assertIsNone(job_queue.claim_unit('other-worker'))
+
+        time.sleep(0.1)
+        unit = job_queue.claim_unit('other-worker')
+        self.assertEqual(unit['worker_id'], 'other-worker')
+        self.assertEqual(unit['attempts'], 2)
+
+
+    def test_unit_whose_lease_expires_on_last_attempt_is_failed(self):
+        job_queue = self.get_job_queue(lease_in_seconds=0.05, max_attempts=1)
+        task_id = job_queue.submit_task(self.task, FakeAnalyzer(['a', 'b', 'c']), submissions_per_unit=2)
+
+        self.assertTrue(job_queue.run_unit(job_queue.claim_unit('worker'), 'worker', FakeAnalyzer([])))
+        self.assertIsNotNone(job_queue.claim_unit('dead-worker'))
+        time.sleep(0.1)
+
+        self.assertIsNone(job_queue.claim_unit('other-worker'))
+        self.assertEqual(job_queue.get_status()[task_id][FAILED], 1)
+        self.assertEqual(job_queue.get_status()[task_id][RUNNING], 0)
+        self.assertEqual(job_queue.run_worker(FakeAnalyzer([]), poll_interval_in_seconds=0), 0)
+
+        task_result = job_queue.get_task_results()[0]
+        self.assertEqual(task_result['number_of_submissions'], 2)
+        self.assertEqual(task_result['number_of_failed_submissions'], 1)
+        self.assertEqual(task_result['positive'], 1)
+
+
+    def test_failed_unit_is_retried_until_out_of_attempts(self):
+        job_queue = self.get_job_queue(max_attempts=2)
+        task_id = job_queue.submit_task(self.task, FakeAnalyzer(['a']))
+
+        self.assertEqual(job_queue.run_worker(FakeAnalyzer([], number_of_failures=1),
+                                              poll_interval_in_seconds=0), 1)
+        self.assertEqual(job_queue.get_status()[task_id][DONE], 1)
+
+        task_id = job_queue.submit_task({'subreddit_name': 'pics'}, FakeAnalyzer(['b']))
+        self.assertEqual(job_queue.run_worker(FakeAnalyzer([], number_of_failures=2),
+                                              poll_interval_in_seconds=0), 0)
+        self.assertEqual(job_queue.get_status()[task_id][FAILED], 1)
+        self.assertIn("mongo went away", self.jobs_collection.find_one({'task_id': task_id})['error'])
+
+
+    def test_resubmitting_a_task_keeps_its_submissions(self):
+        job_queue = self.get_job_queue()
+        task_id = job_queue.submit_task(self.task, FakeAnalyzer(['c', 'b', 'a']), submissions_per_unit=2)
+        units_before = list(self.jobs_collection.find({'task_id': task_id}).sort('_id'))
+
+        # Newer submissions were collected in the meantime, and come first.
+        self.assertEqual(job_queue.submit_task(self.task, FakeAnalyzer(['e', 'd', 'c', 'b', 'a']),
+                                               submissions_per_unit=2), task_id)
+
+        units_after = list(self.jobs_collection.find({'task_id': task_id}).sort('_id'))
+        self.assertEqual(units_after, units_before)
+        self.assertEqual([unit['submission_ids'] for unit in units_after], [['c', 'b'], ['a']])
+        self.assertEqual(job_queue.get_status()[task_id][PENDING], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+@Author Eric Zair
+@File test_near_duplicates.py
+@Description: Tests for how NearDuplicateIndex clusters comments, and which comments it has the
+              analysis skip, run against mongomock.
+
+@package docstring
+"""
+import unittest
+
+import mongomock
+
+from reddit_analysis.near_duplicates import MINHASH_PRIME, NEAR_DUPLICATE_COLLECTION_NAME
+from reddit_analysis.near_duplicates import NearDuplicateIndex
+
+
+COPYPASTA = 'I sexually identify as an attack helicopter, ever since I was a boy I dreamed of soaring'
+
+
+def get_comment_record(comment_id, submission_id, comment_body, created_at):
+    return {'_id': comment_id, 'body': comment_body, 'submission': submission_id,
+            'subreddit_name': 'pics', 'created_at': created_at}
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+
+
+    def setUp(self):
+        database = mongomock.MongoClient().db
+        self.comment_collection = database.post_comment
+        self.signature_collection = database[NEAR_DUPLICATE_COLLECTION_NAME]
+        self.near_duplicate_index = NearDuplicateIndex(self.signature_collection)
+
+        self.comment_records = [
+            get_comment_record('a', 'first', COPYPASTA, 1),
+            get_comment_record('b', 'second', COPYPASTA + '!!', 2),
+            get_comment_record('c', 'first', COPYPASTA + ' lol', 3),
+            get_comment_record('d', 'first', 'the lighting in this photo is gorgeous', 4),
+            get_comment_record('e', 'second', 'does anyone know where this was taken', 5)
+        ]
+        self.comment_collection.insert_many(self.comment_records)
+
+
+    def get_clusters(self):
+        cluster_ids = self.signature_collection.distinct('cluster_id')
+        return sorted(sorted(record['_id'] for record in self.signature_collection.find(
+            {'cluster_id': cluster_id})) for cluster_id in cluster_ids)
+
+
+    def test_near_identical_comments_are_clustered(self):
+        self.assertEqual(self.near_duplicate_index.add_comments(self.comment_records[: 2]), 1)
+        self.assertEqual(self.near_duplicate_index.add_comments(self.comment_records[2:]), 1)
+
+        self.assertEqual(self.get_clusters(), [['a', 'b', 'c'], ['d'], ['e']])
+        self.assertEqual(sorted(self.near_duplicate_index.get_near_duplicates_of_comment('b')),
+                         ['a', 'b', 'c'])
+        self.assertEqual(self.near_duplicate_index.get_near_duplicates_of_comment('d'), ['d'])
+
+        largest_clusters = self.near_duplicate_index.get_largest_clusters()
+        self.assertEqual(largest_clusters[0]['cluster_id'], 'a')
+        self.assertEqual(largest_clusters[0]['number_of_comments'], 3)
+        self.assertEqual(largest_clusters[0]['number_of_submissions'], 2)
+        self.assertEqual(len(largest_clusters), 1)
+
+
+    def test_collapse_and_exclude_skip_the_right_comments(self):
+        self.near_duplicate_index.add_comments(self.comment_records)
+
+        self.assertEqual(self.near_duplicate_index.get_comment_ids_to_skip(['first', 'second']),
+                         {'b', 'c'})
+        self.assertEqual(self.near_duplicate_index.get_comment_ids_to_skip(['first'], 'exclude'),
+                         {'a', 'c'})
+        self.assertEqual(self.near_duplicate_index.get_comment_ids_to_skip(['second'], 'exclude'),
+                         {'b'})
+        with self.assertRaises(ValueError):
+            self.near_duplicate_index.get_comment_ids_to_skip(['first'], 'merge')
+
+
+    def test_rebuilding_matches_adding_comments(self):
+        # Comments added out of order make the newest one the representative.
+        self.near_duplicate_index.add_comments(reversed(self.comment_records))
+        self.assertEqual(self.near_duplicate_index.get_comment_ids_to_skip(['first']), {'a'})
+
+        self.assertEqual(
+            self.near_duplicate_index.rebuild_from_comment_collection(self.comment_collection,
+                                                                      batch_size=2), 2)
+        self.assertEqual(self.get_clusters(), [['a', 'b', 'c'], ['d'], ['e']])
+        self.assertEqual(self.near_duplicate_index.get_comment_ids_to_skip(['first', 'second']),
+                         {'b', 'c'})
+
+
+    def test_signature_values_are_not_wrapped(self):
+        signature = self.near_duplicate_index.get_signature(COPYPASTA)
+
+        self.assertEqual(len(signature), 64)
+        self.assertTrue((signature < MINHASH_PRIME).all())
+        self.assertIsNone(self.near_duplicate_index.get_signature('...'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+@Author Eric Zair
+@File test_reddit_post_collector.py
+@Description: Tests for requesting the posts of subreddit groups through combined "a+b+c" listings,
+              run against fake praw subreddits.
+
+@package docstring
+"""
+import unittest
+
+import praw
+
+from reddit_analysis.rate_limiter import RateLimitedRequestor
+from reddit_post_collector import get_argument_parser_containing_program_flag_information
+from reddit_post_collector import get_combined_sub_reddit_submissions
+from reddit_post_collector import get_rate_limited_reddit_api_instance
+
+
+class FakeSubreddit():
+
+
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+
+class FakeSubmission():
+
+
+    def __init__(self, sub_reddit_name, post_number):
+        self.subreddit = FakeSubreddit(sub_reddit_name)
+        self.fullname = f't3_{sub_reddit_name}{post_number}'
+
+
+class FakeRedditApi():
+    """Every subreddit has a fixed amount of posts. A combined listing lists the posts of its first
+    subreddit first, so it can push the posts of the others out of the listing."""
+
+
+    def __init__(self, number_of_posts_of_sub_reddits):
+        self.number_of_posts_of_sub_reddits = number_of_posts_of_sub_reddits
+        self.requests = []
+
+
+    def subreddit(self, display_name):
+        reddit_api = self
+
+        class FakeListingSubreddit():
+
+
+            def hot(self, limit, params):
+                reddit_api.requests.append((display_name.lower(), limit, params.get('after')))
+                submissions = [FakeSubmission(sub_reddit_name, post_number)
+                               for sub_reddit_name in display_name.lower().split('+')
+                               for post_number in range(reddit_api.number_of_posts_of_sub_reddits[
+                                   sub_reddit_name])]
+
+                if 'after' in params:
+                    fullnames = [submission.fullname for submission in submissions]
+                    submissions = submissions[fullnames.index(params['after']) + 1:]
+                return iter(submissions[: min(limit, 100)])
+
+        return FakeListingSubreddit()
+
+
+class TestCombinedSubredditListings(unittest.TestCase):
+
+
+    def test_posts_are_split_by_subreddit(self):
+        reddit_api = FakeRedditApi({'pics': 3, 'aww': 2})
+        submissions = get_combined_sub_reddit_submissions(['pics', 'Aww'], 'hot', reddit_api, 5)
+
+        self.assertEqual(sorted(submission.fullname for submission in submissions),
+                         ['t3_aww0', 't3_aww1', 't3_pics0', 't3_pics1', 't3_pics2'])
+
+        # The combined listing ran out before its limit, so nothing is missing.
+        self.assertEqual(reddit_api.requests, [('pics+aww', 10, None)])
+
+
+    def test_subreddits_that_come_up_short_only_request_their_missing_posts(self):
+        reddit_api = FakeRedditApi({'aww': 70, 'pics': 300, 'cats': 2})
+        submissions = get_combined_sub_reddit_submissions(['aww', 'pics', 'cats'], 'hot', reddit_api, 40)
+
+        self.assertEqual(reddit_api.requests, [('aww+pics+cats', 100, None),
+                                               ('pics', 10, 't3_pics29'),
+                                               ('cats', 40, None)])
+        self.assertEqual(len([submission for submission in submissions
+                              if submission.subreddit.display_name == 'pics']), 40)
+        self.assertEqual(len(submissions), 82)
+        self.assertEqual(len({submission.fullname for submission in submissions}), 82)
+
+
+    def test_posts_per_subreddit_can_be_set_from_the_command_line(self):
+        parsed_arguments = get_argument_parser_containing_program_flag_information().parse_args(
+            ['--collect', '--posts-per-subreddit', '10', '--subreddits-per-request', '10'])
+
+        self.assertEqual(parsed_arguments.posts_per_subreddit, 10)
+        self.assertEqual(parsed_arguments.subreddits_per_request, 10)
+
+
+    def test_author_index_can_be_rebuilt_from_the_command_line(self):
+        parsed_arguments = get_argument_parser_containing_program_flag_information().parse_args(
+            ['--rebuild-author-index'])
+
+        self.assertTrue(parsed_arguments.rebuild_author_index)
+        self.assertFalse(parsed_arguments.rebuild_submission_catalog)
+
+
+
+class TestRateLimitedRedditApi(unittest.TestCase):
+
+
+    def test_credentials_without_a_requestor_class_are_rate_limited(self):
+        reddit_api = praw.Reddit(client_id='client id', client_secret='client secret',
+                                 user_agent='my user agent')
+        rate_limited_reddit_api = get_rate_limited_reddit_api_instance(reddit_api)
+
+        self.assertIsInstance(rate_limited_reddit_api._core.requestor, RateLimitedRequestor)
+        self.assertEqual(rate_limited_reddit_api.config.client_id, 'client id')
+        self.assertEqual(rate_limited_reddit_api.config.client_secret, 'client secret')
+        self.assertEqual(rate_limited_reddit_api.config.user_agent, 'my user agent')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+@Author Eric Zair
+@File test_resource_cache.py
+@Description: Tests that the sentiment analyzer built from the cached vader lexicon scores
+              comments the same as one that parsed the lexicon files itself.
+
+@package docstring
+"""
+import tempfile
+import unittest
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from reddit_analysis import resource_cache
+
+
+COMMENTS = ['I love this so much :)', 'This is NOT good at all!!!', 'meh \U0001F602',
+            'the worst thing I have ever seen \U0001F621', 'kind of great, but also sort of awful']
+
+
+class TestSentimentAnalyzerCache(unittest.TestCase):
+
+
+    def setUp(self):
+        self.original_cache_directory = resource_cache.CACHE_DIRECTORY
+        self.cache_directory = tempfile.TemporaryDirectory()
+        resource_cache.CACHE_DIRECTORY = self.cache_directory.name
+        resource_cache._sentiment_analyzer = None
+
+
+    def tearDown(self):
+        resource_cache.CACHE_DIRECTORY = self.original_cache_directory
+        resource_cache._sentiment_analyzer = None
+        self.cache_directory.cleanup()
+
+
+    def get_scores(self, sentiment_analyzer):
+        return [sentiment_analyzer.polarity_scores(comment) for comment in COMMENTS]
+
+
+    def test_cache_hits_and_misses_score_the_same(self):
+        expected_scores = self.get_scores(SentimentIntensityAnalyzer())
+
+        # Nothing is cached yet, so the lexicon is parsed and written to the cache.
+        self.assertEqual(self.get_scores(resource_cache.get_sentiment_analyzer()), expected_scores)
+        self.assertIsNotNone(resource_cache._read_cache_file('vader_lexicon.pickle'))
+
+        resource_cache._sentiment_analyzer = None
+        cached_sentiment_analyzer = resource_cache.get_sentiment_analyzer()
+        self.assertIsInstance(cached_sentiment_analyzer, SentimentIntensityAnalyzer)
+        self.assertEqual(self.get_scores(cached_sentiment_analyzer), expected_scores)
+
+
+    def test_out_of_date_lexicons_are_not_used(self):
+        resource_cache._write_cache_file('vader_lexicon.pickle', {'version': 'old',
+                                                                  'lexicon': {'love': -4.0},
+                                                                  'emojis': {}})
+
+        self.assertEqual(self.get_scores(resource_cache.get_sentiment_analyzer()),
+                         self.get_scores(SentimentIntensityAnalyzer()))
+        self.assertEqual(resource_cache._read_cache_file('vader_lexicon.pickle')['version'],
+                         resource_cache._get_lexicon_version())
+        self.assertIn('emoji_utf8_lexicon.txt', resource_cache._get_lexicon_version())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+@Author Eric Zair
+@File test_submission_catalog.py
+@Description: Tests for SubmissionCatalog, and for how SubredditAnalyzer lists submissions from it,
+              run against mongomock.
+
+@package docstring
+"""
+import unittest
+
+import mongomock
+
+from reddit_analysis.comment_analysis import SubredditAnalyzer
+from reddit_analysis.submission_catalog import SUBMISSION_CATALOG_COLLECTION_NAME, SubmissionCatalog
+
+
+def get_comment_record(comment_id, submission_id, created_at, sorting_type='hot'):
+    return {'_id': comment_id, 'body': 'I love it', 'submission': submission_id,
+            'subreddit_name': 'pics', 'created_at': created_at, 'sorting_type': sorting_type}
+
+
+class TestSubmissionCatalog(unittest.TestCase):
+
+
+    def setUp(self):
+        self.database = mongomock.MongoClient().db
+        self.comment_collection = self.database.post_comment
+        self.submission_catalog = SubmissionCatalog(self.database[SUBMISSION_CATALOG_COLLECTION_NAME])
+        self.analyzer = SubredditAnalyzer(self.comment_collection)
+
+
+    def collect(self, comment_records):
+        """Store comments the way the collector does it."""
+
+        subreddit_names = {comment_record['subreddit_name'] for comment_record in comment_records}
+        self.submission_catalog.ensure_indexes()
+        self.submission_catalog.backfill_subreddits(self.comment_collection, subreddit_names)
+        self.comment_collection.insert_many(comment_records)
+        self.submission_catalog.add_comments(comment_records)
+
+
+    def test_submissions_collected_before_the_catalog_are_still_listed(self):
+        self.comment_collection.insert_many([get_comment_record('a', 'old', 100),
+                                             get_comment_record('b', 'old', 101)])
+        self.assertEqual(self.analyzer.get_subreddit_submission_ids('pics'), ['old'])
+
+        self.collect([get_comment_record('c', 'new', 200, sorting_type='top')])
+
+        self.assertTrue(self.submission_catalog.is_subreddit_backfilled('pics'))
+        self.assertEqual(self.analyzer.get_subreddit_submission_ids('pics'), ['new', 'old'])
+        self.assertEqual(self.analyzer.get_subreddit_submission_ids('pics', sorting_type='top'), ['new'])
+        self.assertEqual([record['comment_count'] for record in
+                          self.analyzer.get_subreddit_submissions('pics', sorted_by='comment_count')],
+                         [2, 1])
+
+
+    def test_only_writing_to_the_catalog_makes_its_indexes(self):
+        self.comment_collection.insert_many([get_comment_record('a', 'old', 100)])
+        self.assertEqual(self.analyzer.analyze_subreddit('pics'), {'positive': 1.0, 'negative': 0.0})
+        self.assertNotIn(SUBMISSION_CATALOG_COLLECTION_NAME, self.database.list_collection_names())
+
+        self.collect([get_comment_record('b', 'new', 200)])
+        self.assertEqual(len(self.database[SUBMISSION_CATALOG_COLLECTION_NAME].index_information()), 7)
+
+
+    def test_adding_comments_matches_rebuilding(self):
+        self.collect([get_comment_record('a', 'one', 100), get_comment_record('b', 'two', 300)])
+        self.collect([get_comment_record('c', 'one', 50, sorting_type='new')])
+        added_submissions = self.submission_catalog.get_submissions('pics')
+
+        self.submission_catalog.rebuild_from_comment_collection(self.comment_collection)
+        rebuilt_submissions = self.submission_catalog.get_submissions('pics')
+
+        for submissions in [added_submissions, rebuilt_submissions]:
+            self.assertEqual([(submission['_id'], submission['comment_count'], submission['created_at'],
+                               sorted(submission['sorting_types'])) for submission in submissions],
+                             [('two', 1, 300, ['hot']), ('one', 2, 50, ['hot', 'new'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+@Author Eric Zair
+@File test_tfidf_engine.py
+@Description: Tests for adding the comments of a subreddit to SubredditTfidfEngine more than once,
+              run against mongomock.
+
+@package docstring
+"""
+import unittest
+
+import mongomock
+
+from reddit_analysis.tfidf_engine import SubredditTfidfEngine
+
+
+def get_comment_record(comment_id, submission_id, subreddit_name, created_at, body):
+    return {'_id': comment_id, 'body': body, 'submission': submission_id,
+            'subreddit_name': subreddit_name, 'created_at': created_at, 'sorting_type': 'hot'}
+
+
+class TestSubredditTfidfEngine(unittest.TestCase):
+
+
+    def setUp(self):
+        self.comment_collection = mongomock.MongoClient().db.post_comment
+        self.comment_collection.insert_many([get_comment_record('a', 'one', 'aww', 100, 'puppy puppy'),
+                                             get_comment_record('b', 'two', 'soccer', 100, 'goal')])
+
+
+    def get_distinctive_terms_of_new_engine(self):
+        """Add every subreddit once to a new engine."""
+
+        tfidf_engine = SubredditTfidfEngine(self.comment_collection)
+        for subreddit_name in ['aww', 'soccer']:
+            tfidf_engine.add_subreddit(subreddit_name)
+        return tfidf_engine.get_distinctive_terms()
+
+
+    def test_adding_a_subreddit_again_only_adds_comments_that_are_new(self):
+        tfidf_engine = SubredditTfidfEngine(self.comment_collection, batch_size=1)
+        for subreddit_name in ['aww', 'soccer']:
+            tfidf_engine.add_subreddit(subreddit_name)
+
+        # Comments that show up later can be older than (or as old as) the ones we already added.
+        self.comment_collection.insert_many([get_comment_record('c', 'one', 'aww', 100, 'kitten'),
+                                             get_comment_record('d', 'three', 'aww', 50, 'kitten'),
+                                             get_comment_record('e', 'two', 'soccer', 10, 'messi')])
+        for subreddit_name in ['aww', 'soccer', 'aww']:
+            tfidf_engine.add_subreddit(subreddit_name)
+
+        self.assertEqual(tfidf_engine.get_distinctive_terms(),
+                         self.get_distinctive_terms_of_new_engine())
+        self.assertEqual(tfidf_engine.get_number_of_terms(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()